@@ -1,78 +1,137 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from langchain_core.tools import StructuredTool
-from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.messages import HumanMessage
+from langchain_core.runnables import RunnableConfig
 from langgraph.prebuilt import create_react_agent
 from loguru import logger
 
-from ..llm import create_llm
+from ..llm import get_llm, shared
 from .tools import get_page_content, run_playwright_code, GetPageContentToolInput, RunPlaywrightCodeToolInput
 from .prompts.automation import AUTOMATION_AGENT_SYSTEM_PROMPT
+from ..runtime.interface import NotebookSession
+
+
+class EscalateStep(Exception):
+    """Raised by the tools to stop a step that keeps failing, so it can be retried on a larger model."""
+
+
+def _run_context(config: RunnableConfig) -> Tuple[str, Optional[NotebookSession], Optional[List[str]]]:
+    """The task, session and recorded cells of the run a tool is called for."""
+    configurable = config.get("configurable", {})
+    return configurable["task_id"], configurable.get("session"), configurable.get("recorded_cells")
+
+
+async def _get_page_content_tool(
+    config: RunnableConfig, include_attributes: List[str] = None, max_length: int = 50000
+) -> str:
+    """
+    Get the current page content (DOM) as a simplified JSON tree.
+    """
+    task_id, session, _ = _run_context(config)
+    input_data = GetPageContentToolInput(
+        include_attributes=include_attributes or ["id", "name", "class", "role", "aria-label", "placeholder", "type", "href", "value", "data-testid"],
+        max_length=max_length
+    )
+    result = await get_page_content(input_data, task_id, session)
+    return result.model_dump_json()
+
+
+async def _run_playwright_code_tool(code: str, config: RunnableConfig) -> str:
+    """
+    Execute Python Playwright code.
+    Example: await page.click('#submit-btn')
+    """
+    task_id, session, recorded_cells = _run_context(config)
+    input_data = RunPlaywrightCodeToolInput(code=code)
+    result = await run_playwright_code(input_data, task_id, session)
+    if result.success and recorded_cells is not None:
+        recorded_cells.append(code)
+    configurable = config.get("configurable", {})
+    failed_runs = configurable.get("failed_runs")
+    if not result.success and failed_runs is not None:
+        failed_runs.append(code)
+        escalate_after = configurable.get("escalate_after") or 0
+        if escalate_after and len(failed_runs) >= escalate_after:
+            raise EscalateStep(f"{len(failed_runs)} code runs failed, the last with: {result.error}")
+    return result.model_dump_json()
+
+
+TOOLS = [
+    StructuredTool.from_function(
+        func=None,
+        coroutine=_get_page_content_tool,
+        name="get_page_content",
+        description="Extracts the current page DOM to understand the UI structure. Returns JSON.",
+        args_schema=GetPageContentToolInput
+    ),
+    StructuredTool.from_function(
+        func=None,
+        coroutine=_run_playwright_code_tool,
+        name="run_playwright_code",
+        description="Executes Playwright Python code to interact with the page. Returns execution result.",
+        args_schema=RunPlaywrightCodeToolInput
+    )
+]
+
+
+def automation_graph(model: Optional[str] = None):
+    """
+    The compiled ReAct graph of a model, built once and shared by every task.
+    The tools find the task, session, recorded cells and failed runs of a run
+    in the `configurable` of its config (see `AutomationAgent.config`).
+    """
+    llm = get_llm(model)
+    # We pass the system prompt as the 'prompt' argument
+    return shared(
+        ("automation_graph", id(llm)),
+        lambda: create_react_agent(model=llm, tools=TOOLS, prompt=AUTOMATION_AGENT_SYSTEM_PROMPT),
+    )
+
 
 class AutomationAgent:
-    def __init__(self, task_id: str):
+    def __init__(self, task_id: str, session: Optional[NotebookSession] = None, model: Optional[str] = None):
+        # Without a session, the tools use the API store's session of the task
         self.task_id = task_id
-        self.llm = create_llm()
-        self.tools = self._build_tools()
-        
-        # Create the ReAct agent using LangGraph
-        # We pass the system prompt as the 'prompt' argument
-        self.agent = create_react_agent(
-            model=self.llm, 
-            tools=self.tools, 
-            prompt=AUTOMATION_AGENT_SYSTEM_PROMPT
-        )
-
-    def _build_tools(self) -> List[StructuredTool]:
+        self.session = session
+        # Code of the run_playwright_code calls that succeeded, for replay recordings
+        self.recorded_cells: List[str] = []
+        # Code of the run_playwright_code calls of the last invocation that failed
+        self.failed_runs: List[str] = []
+        self.model = model
+        self.agent = automation_graph(model)
+
+    def config(self, escalate_after: int = 0) -> RunnableConfig:
+        """The config running the shared graph for this agent's task."""
+        return {"configurable": {
+            "task_id": self.task_id,
+            "session": self.session,
+            "recorded_cells": self.recorded_cells,
+            "failed_runs": self.failed_runs,
+            "escalate_after": escalate_after,
+        }}
+
+    async def ainvoke(
+        self, inputs: Dict[str, Any], model: Optional[str] = None, escalate_after: int = 0
+    ) -> Dict[str, Any]:
         """
-        Bind task_id to tools and wrap them as StructuredTool.
+        Run the graph of ``model`` (this agent's own by default) on ``inputs``
+        for this agent's task. With ``escalate_after``, `EscalateStep` is raised
+        once that many code runs have failed.
         """
-        async def _get_page_content_wrapper(include_attributes: List[str] = None, max_length: int = 50000) -> str:
-            """
-            Get the current page content (DOM) as a simplified JSON tree.
-            """
-            input_data = GetPageContentToolInput(
-                include_attributes=include_attributes or ["id", "name", "class", "role", "aria-label", "placeholder", "type", "href", "value", "data-testid"],
-                max_length=max_length
-            )
-            result = await get_page_content(input_data, self.task_id)
-            return result.model_dump_json()
-
-        async def _run_playwright_code_wrapper(code: str) -> str:
-            """
-            Execute Python Playwright code.
-            Example: await page.click('#submit-btn')
-            """
-            input_data = RunPlaywrightCodeToolInput(code=code)
-            result = await run_playwright_code(input_data, self.task_id)
-            return result.model_dump_json()
-
-        return [
-            StructuredTool.from_function(
-                func=None,
-                coroutine=_get_page_content_wrapper,
-                name="get_page_content",
-                description="Extracts the current page DOM to understand the UI structure. Returns JSON.",
-                args_schema=GetPageContentToolInput
-            ),
-            StructuredTool.from_function(
-                func=None,
-                coroutine=_run_playwright_code_wrapper,
-                name="run_playwright_code",
-                description="Executes Playwright Python code to interact with the page. Returns execution result.",
-                args_schema=RunPlaywrightCodeToolInput
-            )
-        ]
+        self.failed_runs = []
+        graph = self.agent if model is None or model == self.model else automation_graph(model)
+        return await graph.ainvoke(inputs, config=self.config(escalate_after))
 
     async def run_step(self, step: str) -> Dict[str, Any]:
         """
         Execute a single automation step.
         """
         logger.info(f"AutomationAgent [{self.task_id}] Received step: {step}")
-        
+
         # invoke the graph
         inputs = {"messages": [HumanMessage(content=step)]}
         # We use ainvoke for async execution
-        result = await self.agent.ainvoke(inputs)
-        
+        result = await self.ainvoke(inputs)
+
         logger.info(f"AutomationAgent [{self.task_id}] Step execution finished.")
         return result
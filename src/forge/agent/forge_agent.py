@@ -1,69 +1,122 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from langchain_core.caches import BaseCache
 from langchain_core.messages import HumanMessage
-from deepagents import CompiledSubAgent, create_deep_agent
 from loguru import logger
 
-from ..llm import create_llm
-from .automation_agent import AutomationAgent
+from ..llm_cache import llm_cache_scope
+from ..llm_limiter import LLMCallStats, llm_run_scope
+from .automation_agent import AutomationAgent, EscalateStep
+from .replay import ReplayCache
+from .routing import StepRoute
+from .verification import StepCheck
+from .tools import RunPlaywrightCodeToolInput, run_playwright_code, task_session
+from ..runtime.interface import NotebookSession
 
 class ForgeAgent:
-    def __init__(self, task_id: str):
+    def __init__(
+        self,
+        task_id: str,
+        session: Optional[NotebookSession] = None,
+        replay_cache: Optional[ReplayCache] = None,
+        llm_cache: Optional[BaseCache] = None,
+    ):
         """
         Initialize the ForgeAgent with a task_id.
-        This agent uses a Planner-Agent architecture (via deepagents) to execute test steps.
+        The agent runs the test steps one at a time through the AutomationAgent,
+        whose compiled graph and LLM client are shared with every other task.
+        Steps run in ``session``, or in the API store's session of the task if none is given.
+        With a ``replay_cache``, steps that ran before are replayed from their recorded cells.
+        With an ``llm_cache``, repeated LLM calls are answered from it.
         """
         self.task_id = task_id
-        self.llm = create_llm()
-        
+        self.session = session
+        self.replay_cache = replay_cache
+        # Indexes of the steps of the last run that were replayed without the LLM
+        self.replayed_steps: List[int] = []
+        # Indexes of the steps of the last run retried on a larger model
+        self.escalated_steps: List[int] = []
+        # Indexes of the verification steps of the last run settled by direct checks, without the LLM
+        self.checked_steps: List[int] = []
+        self.llm_cache = llm_cache
+        # LLM requests of the last run and their time queued in the rate limiter
+        self.llm_stats = LLMCallStats()
+
         # Initialize the specialized Automation SubAgent
-        self.automation_subagent = AutomationAgent(task_id)
-        
-        # Create the high-level Deep Agent (Planner + SubAgents)
-        # The Planner will break down the user's request (test steps) into tasks
-        # and delegate them to the appropriate subagent.
-        self.agent = create_deep_agent(
-            model=self.llm,
-            subagents=[
-                CompiledSubAgent(
-                    name="automation_expert",
-                    description="A specialized agent for executing browser automation steps on web pages. Capabilities include searching, clicking, typing, and extracting content.",
-                    runnable=self.automation_subagent.agent
-                )
-            ]
-        )
+        self.automation_subagent = AutomationAgent(task_id, session=session)
 
-    async def run(self, steps: List[str], step_callback=None) -> Dict[str, Any]:
+    async def run(
+        self,
+        steps: List[str],
+        step_callback=None,
+        replay_keys: Optional[List[Optional[str]]] = None,
+        routes: Optional[List[StepRoute]] = None,
+        checks: Optional[List[Optional[StepCheck]]] = None,
+    ) -> Dict[str, Any]:
         """
         Run the agent with a list of test steps.
         
         Args:
             steps: A list of natural language strings describing the test steps.
             step_callback: Async callback function(index, step_content) called before each step.
+            replay_keys: Replay cache key of each step (see `replay.step_keys`); steps
+                without one always go through the AutomationAgent.
+            routes: Model of each step (see `routing.route_steps`); by default
+                every step runs on OPENAI_MODEL_NAME.
+            checks: Direct checks of each verification step (see
+                `verification.step_checks`), run instead of the agent.
         """
-        # Since deepagents controls the loop, we can't easily hook into EXACT step boundaries 
-        # unless we customize the graph or the subagent.
-        # However, for this requirement, we can manually iterate steps and invoke the subagent directly
-        # or use a simplified approach where ForgeAgent manages the loop instead of delegating planning to DeepAgent.
-        # Given the requirement "ForgeAgent accepts steps and calls subagent", and we want explicit control over screenshots per step:
-        
-        # Let's iterate manually for precise control over screenshots and status updates
+        # Steps are iterated here rather than planned by an agent, for precise
+        # control over screenshots and status updates at step boundaries
+        self.llm_stats = LLMCallStats()
+        with llm_cache_scope(self.llm_cache), llm_run_scope(self.task_id, self.llm_stats):
+            return await self._run(steps, step_callback, replay_keys, routes, checks)
+
+    async def _run(
+        self,
+        steps: List[str],
+        step_callback=None,
+        replay_keys: Optional[List[Optional[str]]] = None,
+        routes: Optional[List[StepRoute]] = None,
+        checks: Optional[List[Optional[StepCheck]]] = None,
+    ) -> Dict[str, Any]:
         logger.info(f"ForgeAgent [{self.task_id}] Starting Manual Execution Loop for {len(steps)} steps.")
         
         final_result = {}
+        self.replayed_steps = []
+        self.escalated_steps = []
+        self.checked_steps = []
+        # Cells are tagged with the step they belong to, for exports
+        session = task_session(self.task_id, self.session)
         
         for i, step in enumerate(steps):
             logger.info(f"ForgeAgent [{self.task_id}] Executing Step {i+1}: {step}")
+            if session is not None:
+                session.current_step = i
             
             # Notify start of step
             if step_callback:
                 await step_callback(i, "running")
             
+            key = replay_keys[i] if self.replay_cache and replay_keys and i < len(replay_keys) else None
+            check = checks[i] if checks and i < len(checks) else None
             try:
-                # Direct invocation of subagent for the step
-                # We wrap the step in a message
-                step_input = {"messages": [HumanMessage(content=f"Execute this step: {step}")]}
-                result = await self.automation_subagent.agent.ainvoke(step_input)
-                final_result = result
+                checked = await self._check(i, check) if check else False
+                replayed = await self._replay(i, key) if key and not checked else []
+                if checked:
+                    self.checked_steps.append(i)
+                elif replayed is None:
+                    self.replayed_steps.append(i)
+                else:
+                    # Direct invocation of subagent for the step
+                    # We wrap the step in a message
+                    self.automation_subagent.recorded_cells = []
+                    step_input = {"messages": [HumanMessage(content=f"Execute this step: {step}")]}
+                    route = routes[i] if routes and i < len(routes) else StepRoute()
+                    result = await self._run_step(i, step_input, route)
+                    final_result = result
+                    cells = replayed + self.automation_subagent.recorded_cells
+                    if key and cells:
+                        self.replay_cache.put(key, cells, step)
                 
                 # Notify completion of step
                 if step_callback:
@@ -71,9 +124,76 @@ class ForgeAgent:
                     
             except Exception as e:
                 logger.error(f"ForgeAgent [{self.task_id}] Step {i+1} failed: {e}")
+                if key:
+                    self.replay_cache.discard(key)
                 if step_callback:
                     await step_callback(i, "error")
+                if session is not None:
+                    session.current_step = None
                 raise e
 
+        if session is not None:
+            session.current_step = None
         logger.info(f"ForgeAgent [{self.task_id}] Execution finished.")
         return final_result
+
+    async def _check(self, index: int, check: StepCheck) -> bool:
+        """
+        Run a verification step's direct checks. Returns False if checks read
+        from the step's content fail, for the agent to judge the step instead;
+        checks of an `assert:` block failing fail the step.
+        """
+        result = await run_playwright_code(RunPlaywrightCodeToolInput(code=check.code), self.task_id, self.session)
+        kinds = ", ".join(c.kind.value for c in check.checks)
+        if result.success:
+            logger.info(f"ForgeAgent [{self.task_id}] Step {index+1} verified directly ({kinds}).")
+            return True
+        if check.explicit:
+            raise AssertionError(f"Step {index+1} assertion failed ({kinds}): {result.error}")
+        logger.info(
+            f"ForgeAgent [{self.task_id}] Direct check of step {index+1} ({kinds}) failed, "
+            f"falling back to the agent: {result.error}"
+        )
+        return False
+
+    async def _run_step(self, index: int, step_input: Dict[str, Any], route: StepRoute) -> Dict[str, Any]:
+        """Run a step on its model, retrying it on the escalation model if its code keeps failing."""
+        model_name = route.model or "the default model"
+        logger.info(f"ForgeAgent [{self.task_id}] Step {index+1} runs on {model_name}.")
+        try:
+            return await self.automation_subagent.ainvoke(
+                step_input, model=route.model, escalate_after=route.escalate_after
+            )
+        except EscalateStep as e:
+            logger.info(
+                f"ForgeAgent [{self.task_id}] Escalating step {index+1} from {model_name} "
+                f"to {route.escalate_to or 'the default model'}: {e}"
+            )
+            self.escalated_steps.append(index)
+            # The failed attempt may have changed the page, so the retry starts by looking at it
+            content = step_input["messages"][0].content
+            retry_input = {"messages": [HumanMessage(
+                content=f"{content}\n\nAn earlier attempt at this step failed ({e}). "
+                        "Check the current page before continuing."
+            )]}
+            return await self.automation_subagent.ainvoke(retry_input, model=route.escalate_to)
+
+    async def _replay(self, index: int, key: str) -> Optional[List[str]]:
+        """
+        Replay the recorded cells of a step. Returns None if the whole step was
+        replayed, otherwise the cells that ran before one failed (or none if
+        there is no recording), which the AutomationAgent then carries on from.
+        """
+        cells = self.replay_cache.get(key)
+        if not cells:
+            return []
+        for n, code in enumerate(cells):
+            result = await run_playwright_code(RunPlaywrightCodeToolInput(code=code), self.task_id, self.session)
+            if not result.success:
+                logger.info(
+                    f"ForgeAgent [{self.task_id}] Replay of step {index+1} failed at cell {n+1}, "
+                    f"falling back to the agent: {result.error}"
+                )
+                return cells[:n]
+        logger.info(f"ForgeAgent [{self.task_id}] Replayed step {index+1} from {len(cells)} recorded cells.")
+        return None
@@ -0,0 +1,97 @@
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from ..model.testcase import StepType, TestEnv
+
+
+class ReplaySettings(BaseSettings):
+    """
+    Step replay cache configuration settings.
+    Reads from environment variables or .env file.
+    Prefix: REPLAY_
+    """
+    # Off unless opted into: a recording made against an earlier version of a
+    # site can pass a step the agent would now fail
+    replay_enabled: bool = False
+    replay_cache_dir: str = os.path.join("storage", "replay")
+
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        env_file_encoding="utf-8",
+        extra="ignore"
+    )
+
+
+def step_keys(testcase: Dict[str, Any], env: TestEnv) -> List[Optional[str]]:
+    """
+    Replay cache keys of a testcase's steps. A step's key covers the test-env
+    and the content of every step up to it, as those determine the page the
+    step starts from. Verification steps get None: they are always judged by
+    the agent.
+    """
+    digest = hashlib.sha256(env.model_dump_json().encode())
+    keys: List[Optional[str]] = []
+    for step in testcase.get("steps", []):
+        content = step.get("content") if isinstance(step, dict) else str(step)
+        digest.update(b"\0" + str(content).encode())
+        is_verification = isinstance(step, dict) and step.get("type") == StepType.VERIFICATION.value
+        keys.append(None if is_verification else digest.hexdigest())
+    return keys
+
+
+class ReplayCache:
+    """
+    The Playwright cells that carried out a step successfully, stored as one
+    JSON file per step key so every process running tasks shares them.
+    Replaying them runs the step without asking the LLM.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings: Optional[ReplaySettings] = None) -> Optional["ReplayCache"]:
+        """Create the cache, or return None if replay is disabled."""
+        settings = settings or ReplaySettings()
+        if not settings.replay_enabled:
+            return None
+        return cls(settings.replay_cache_dir)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[List[str]]:
+        """The recorded cells of a step, or None if there is no recording."""
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return json.load(f)["cells"]
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable replay recording {key}: {e}")
+            return None
+
+    def put(self, key: str, cells: List[str], step: str = "") -> None:
+        record = {"step": step, "cells": cells, "recorded_at": datetime.now().isoformat()}
+        path = self._path(key)
+        # Write then rename, so readers never see a partial recording
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with self._lock:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(record, f, ensure_ascii=False)
+            os.replace(tmp, path)
+
+    def discard(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,63 @@
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from ..model.testcase import StepType
+
+SMALL = "small"
+LARGE = "large"
+
+
+class ModelRoutingSettings(BaseSettings):
+    """
+    Which model runs each step.
+    Reads from environment variables or .env file.
+    Prefix: LLM_ROUTING_
+
+    Steps run on the small or the large tier by type, unless they name a
+    tier or a model with `model:`. A model left unset is OPENAI_MODEL_NAME,
+    so by default every step runs on it.
+    """
+    llm_routing_small_model: Optional[str] = None
+    llm_routing_large_model: Optional[str] = None
+    llm_routing_action_tier: str = LARGE
+    llm_routing_verification_tier: str = SMALL
+    # Failed code runs of a step before it is retried on the large model; 0 never escalates
+    llm_routing_escalate_after: int = 3
+
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        env_file_encoding="utf-8",
+        extra="ignore"
+    )
+
+
+class StepRoute(BaseModel):
+    model: Optional[str] = None  # None for OPENAI_MODEL_NAME
+    escalate_to: Optional[str] = None  # Model to retry the step on if it keeps failing
+    escalate_after: int = 0  # Failed code runs before escalating
+
+
+def route_steps(testcase: Dict[str, Any], settings: Optional[ModelRoutingSettings] = None) -> List[StepRoute]:
+    """The model each step of a parsed testcase runs on, and where it escalates to."""
+    settings = settings or ModelRoutingSettings()
+    # Empty settings (`LLM_ROUTING_SMALL_MODEL=`) mean OPENAI_MODEL_NAME as well
+    tiers = {SMALL: settings.llm_routing_small_model or None, LARGE: settings.llm_routing_large_model or None}
+    by_type = {
+        StepType.ACTION.value: settings.llm_routing_action_tier,
+        StepType.VERIFICATION.value: settings.llm_routing_verification_tier,
+    }
+    large = tiers[LARGE]
+    routes: List[StepRoute] = []
+    for step in testcase.get("steps", []):
+        step = step if isinstance(step, dict) else {}
+        choice = step.get("model") or by_type.get(step.get("type"), settings.llm_routing_action_tier)
+        model = tiers[choice] if choice in tiers else choice
+        escalates = settings.llm_routing_escalate_after > 0 and model != large
+        routes.append(StepRoute(
+            model=model,
+            escalate_to=large if escalates else None,
+            escalate_after=settings.llm_routing_escalate_after if escalates else 0,
+        ))
+    return routes
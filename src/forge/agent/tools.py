@@ -5,7 +5,16 @@ import base64
 import os
 from datetime import datetime
 
-from ..api.store import store
+from ..runtime.interface import NotebookSession
+
+
+def task_session(task_id: str, session: Optional[NotebookSession]) -> Optional[NotebookSession]:
+    """The session to run in: the one given, or the API store's session of the task."""
+    if session is not None:
+        return session
+    # Imported here so agents running outside the API don't create its store
+    from ..api.store import store
+    return store.get_session(task_id)
 
 
 class ToolResult(BaseModel):
@@ -35,12 +44,13 @@ class GetPageContentToolInput(BaseModel):
 
 async def get_page_content(
     input_data: GetPageContentToolInput,
-    task_id: str
+    task_id: str,
+    session: Optional[NotebookSession] = None
 ) -> ToolResult:
     """
     Extracts a simplified, LLM-friendly representation of the current page's DOM.
     """
-    session = store.get_session(task_id)
+    session = task_session(task_id, session)
     if not session:
         return ToolResult(success=False, error=f"No active session found for task {task_id}")
 
@@ -132,7 +142,8 @@ async def extract_dom():
 await extract_dom()
 """ % (json.dumps(input_data.include_attributes))
 
-    result = await session.add_cell(script)
+    # The DOM dump is only needed by the agent, the notebook keeps a summary
+    result = await session.add_cell(script, internal=True)
     
     if not result.is_success:
         return ToolResult(
@@ -171,12 +182,13 @@ class RunPlaywrightCodeToolInput(BaseModel):
 
 async def run_playwright_code(
     input_data: RunPlaywrightCodeToolInput,
-    task_id: str
+    task_id: str,
+    session: Optional[NotebookSession] = None
 ) -> ToolResult:
     """
     Executes raw Playwright/Python code in the agent's session.
     """
-    session = store.get_session(task_id)
+    session = task_session(task_id, session)
     if not session:
         return ToolResult(success=False, error=f"No active session found for task {task_id}")
 
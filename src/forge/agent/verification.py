@@ -0,0 +1,161 @@
+import re
+from enum import Enum
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+from ..model.testcase import StepType
+
+
+class CheckKind(str, Enum):
+    TITLE_CONTAINS = "title_contains"
+    TITLE_EQUALS = "title_equals"
+    URL_CONTAINS = "url_contains"
+    URL_EQUALS = "url_equals"
+    VISIBLE = "visible"  # An element matching a selector is visible
+    TEXT = "text"  # The text is shown on the page
+    COUNT = "count"  # Elements matching a selector, exactly
+    COUNT_AT_LEAST = "count_at_least"
+
+
+class Check(BaseModel):
+    kind: CheckKind
+    value: Optional[str] = None  # Text, title or url
+    selector: Optional[str] = None
+    count: Optional[int] = None
+
+
+class StepCheck(BaseModel):
+    """The checks verifying a step, and the Playwright code running them."""
+    checks: List[Check]
+    code: str
+    # From the step's `assert:` block, whose result is final; checks read from
+    # the step's content fall back to the agent when they fail
+    explicit: bool = False
+
+
+def parse_assert_block(block: Any) -> List[Check]:
+    """
+    Read a step's `assert:` block: a mapping, or a list of them, of check
+    kinds to values, e.g. ``{title_contains: Playwright}`` or
+    ``{count: {selector: .result, equals: 10}}``.
+    """
+    items = block if isinstance(block, list) else [block]
+    checks: List[Check] = []
+    for item in items:
+        if not isinstance(item, dict):
+            raise ValueError(f"Invalid assert entry: {item!r}")
+        for key, value in item.items():
+            if key == "count":
+                if not isinstance(value, dict) or "selector" not in value:
+                    raise ValueError("An assert count needs a selector and `equals` or `at_least`")
+                if "at_least" in value:
+                    checks.append(Check(kind=CheckKind.COUNT_AT_LEAST, selector=value["selector"], count=_count(value["at_least"], 1)))
+                elif "equals" in value:
+                    checks.append(Check(kind=CheckKind.COUNT, selector=value["selector"], count=_count(value["equals"], 0)))
+                else:
+                    raise ValueError("An assert count needs `equals` or `at_least`")
+            elif key == CheckKind.VISIBLE.value:
+                checks.append(Check(kind=CheckKind.VISIBLE, selector=str(value)))
+            elif key in {kind.value for kind in CheckKind}:
+                checks.append(Check(kind=CheckKind(key), value=str(value)))
+            else:
+                raise ValueError(f"Unknown assert check: {key}")
+    return checks
+
+
+def _count(value: Any, minimum: int) -> int:
+    if isinstance(value, bool) or not isinstance(value, int) or value < minimum:
+        raise ValueError(f"An assert count must be an integer of at least {minimum}, got {value!r}")
+    return value
+
+
+_QUOTED = r"""['"‘“「『](?P<value>[^'"’”」』]+)['"’”」』]"""
+_TITLE = r"(?:page\s+)?(?:title|标题)"
+_URL = r"(?:url|网址|链接|地址)"
+_CONTAINS = r"(?:should\s+)?(?:contains?|includes?|包含|含有)"
+_EQUALS = r"(?:should\s+)?(?:is|be|equals?|为|是|等于)"
+
+# Tried in order; the first matching pattern is used
+PATTERNS = [
+    (CheckKind.TITLE_CONTAINS, rf"{_TITLE}\s*{_CONTAINS}\s*{_QUOTED}"),
+    (CheckKind.TITLE_EQUALS, rf"{_TITLE}\s*{_EQUALS}\s*{_QUOTED}"),
+    (CheckKind.URL_CONTAINS, rf"{_URL}\s*{_CONTAINS}\s*{_QUOTED}"),
+    (CheckKind.URL_EQUALS, rf"{_URL}\s*{_EQUALS}\s*{_QUOTED}"),
+    (CheckKind.VISIBLE, rf"(?:element|元素)\s*{_QUOTED}\s*(?:is\s+|should\s+be\s+)?(?:visible|可见|已显示)"),
+    (CheckKind.COUNT_AT_LEAST, rf"(?:at\s+least|至少有?)\s*(?P<count>\d+)\s*个?\s*{_QUOTED}\s*(?:elements?|元素)?"),
+    (CheckKind.COUNT, rf"(?:there\s+are\s+|有\s*)?(?P<count>\d+)\s*个?\s*{_QUOTED}\s*(?:elements?|元素)"),
+    (CheckKind.TEXT, rf"(?:contains?|shows?|displays?|has)\s+(?:the\s+)?text\s*{_QUOTED}"),
+    (CheckKind.TEXT, rf"(?:包含|显示|出现)(?:文本|文字)?\s*{_QUOTED}"),
+]
+
+# Words that may surround a recognized check without changing its meaning
+FILLER = re.compile(
+    r"\b(?:verify|check|assert|ensure|confirm|that|the|page)\b|'s|"
+    r"检测|检查|验证|确认|断言|页面|当前|的|关键字|关键词|字样|"
+    r"[\s,.!:;，。！：；]",
+    re.IGNORECASE,
+)
+
+
+def match_step(content: str) -> List[Check]:
+    """
+    The check a verification step's content asks for, if it is a common one
+    such as "the title contains 'Playwright'". Returns no checks when the
+    step says anything more, which only the agent can judge.
+    """
+    for kind, pattern in PATTERNS:
+        match = re.search(pattern, content, re.IGNORECASE)
+        if match is None:
+            continue
+        rest = content[:match.start()] + " " + content[match.end():]
+        if FILLER.sub("", rest):
+            return []
+        value = match.group("value").strip()
+        if kind == CheckKind.VISIBLE:
+            return [Check(kind=kind, selector=value)]
+        if kind in (CheckKind.COUNT, CheckKind.COUNT_AT_LEAST):
+            return [Check(kind=kind, selector=value, count=int(match.group("count")))]
+        return [Check(kind=kind, value=value)]
+    return []
+
+
+def check_code(checks: List[Check]) -> str:
+    """Playwright code asserting the checks on `page`, waiting for them like `expect` does."""
+    lines = ["import re", "from playwright.async_api import expect", ""]
+    for check in checks:
+        if check.kind == CheckKind.TITLE_CONTAINS:
+            lines.append(f"await expect(page).to_have_title(re.compile(re.escape({check.value!r})))")
+        elif check.kind == CheckKind.TITLE_EQUALS:
+            lines.append(f"await expect(page).to_have_title({check.value!r})")
+        elif check.kind == CheckKind.URL_CONTAINS:
+            lines.append(f"await expect(page).to_have_url(re.compile(re.escape({check.value!r})))")
+        elif check.kind == CheckKind.URL_EQUALS:
+            lines.append(f"await expect(page).to_have_url({check.value!r})")
+        elif check.kind == CheckKind.VISIBLE:
+            lines.append(f"await expect(page.locator({check.selector!r}).first).to_be_visible()")
+        elif check.kind == CheckKind.TEXT:
+            lines.append(f"await expect(page.get_by_text({check.value!r}).first).to_be_visible()")
+        elif check.kind == CheckKind.COUNT:
+            lines.append(f"await expect(page.locator({check.selector!r})).to_have_count({check.count})")
+        elif check.kind == CheckKind.COUNT_AT_LEAST and check.count > 0:
+            # The n-th match exists when there are at least n; at least 0 always holds
+            lines.append(f"await expect(page.locator({check.selector!r}).nth({check.count - 1})).to_be_attached()")
+    return "\n".join(lines)
+
+
+def step_checks(testcase: Dict[str, Any]) -> List[Optional[StepCheck]]:
+    """
+    The deterministic checks of each step of a parsed testcase: those of its
+    `assert:` block, or those its content reads as. None for action steps and
+    verifications left to the agent.
+    """
+    result: List[Optional[StepCheck]] = []
+    for step in testcase.get("steps", []):
+        if not isinstance(step, dict) or step.get("type") != StepType.VERIFICATION.value:
+            result.append(None)
+            continue
+        explicit = step.get("assert") is not None
+        checks = parse_assert_block(step["assert"]) if explicit else match_step(str(step.get("content", "")))
+        result.append(StepCheck(checks=checks, code=check_code(checks), explicit=explicit) if checks else None)
+    return result
@@ -0,0 +1,121 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from .models import TaskEvent, TaskEventType
+
+
+class TaskEventBus:
+    """
+    Per-task event history that clients can follow as a stream.
+
+    Each task keeps its last ``history`` events, numbered from 1. A client
+    resuming from an event id older than the retained history gets a RESYNC
+    event first, telling it to refetch the full state. Events may be published
+    from any thread; waiters are woken on their own event loop.
+
+    ``retention`` seconds after a run's END, its history is trimmed to that
+    last event: clients following it late resync from the stored state.
+    """
+
+    def __init__(self, history: int = 1000, retention: float = 300.0):
+        self.history = history
+        self.retention = retention
+        self._events: Dict[str, Deque[TaskEvent]] = {}
+        self._last_id: Dict[str, int] = {}
+        # Tasks whose run ended, by the time it did, oldest first
+        self._ended: "OrderedDict[str, float]" = OrderedDict()
+        self._waiters: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]]] = {}
+        self._lock = threading.Lock()
+
+    def publish(self, task_id: str, event_type: TaskEventType, data: Optional[Dict[str, Any]] = None) -> TaskEvent:
+        with self._lock:
+            event_id = self._last_id.get(task_id, 0) + 1
+            self._last_id[task_id] = event_id
+            event = TaskEvent(id=event_id, type=event_type, timestamp=datetime.now(), data=data or {})
+            self._events.setdefault(task_id, deque(maxlen=self.history)).append(event)
+            self._ended.pop(task_id, None)
+            if event_type == TaskEventType.END:
+                self._ended[task_id] = time.monotonic()
+            self._trim()
+            waiters = self._waiters.pop(task_id, [])
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_wake, future)
+        return event
+
+    def _trim(self) -> None:
+        """Cut the histories of runs that ended over ``retention`` seconds ago down to their END."""
+        expired = time.monotonic() - self.retention
+        while self._ended:
+            task_id, ended_at = next(iter(self._ended.items()))
+            if ended_at > expired:
+                return
+            del self._ended[task_id]
+            events = self._events.get(task_id)
+            if events and len(events) > 1:
+                self._events[task_id] = deque([events[-1]], maxlen=self.history)
+
+    def last_event_id(self, task_id: str) -> int:
+        return self._last_id.get(task_id, 0)
+
+    def events_since(self, task_id: str, after: int = 0) -> List[TaskEvent]:
+        """Return the retained events with an id greater than ``after``."""
+        with self._lock:
+            events = self._events.get(task_id)
+            if not events or events[-1].id <= after:
+                return []
+            first = events[0].id
+            result = [e for e in events if e.id > after] if after >= first else list(events)
+        if after < first - 1:
+            # Events between `after` and the oldest retained one are gone
+            gap = TaskEvent(id=first - 1, type=TaskEventType.RESYNC, timestamp=datetime.now())
+            result.insert(0, gap)
+        return result
+
+    async def wait(self, task_id: str, after: int = 0, timeout: Optional[float] = None) -> List[TaskEvent]:
+        """
+        Wait until there are events after ``after`` and return them.
+        Returns an empty list if none arrived within ``timeout`` seconds.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._last_id.get(task_id, 0) <= after:
+                future = loop.create_future()
+                self._waiters.setdefault(task_id, []).append((loop, future))
+            else:
+                future = None
+        if future is not None:
+            try:
+                await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                return []
+            finally:
+                self._discard_waiter(task_id, (loop, future))
+        return self.events_since(task_id, after)
+
+    def _discard_waiter(self, task_id: str, waiter: Tuple[asyncio.AbstractEventLoop, asyncio.Future]) -> None:
+        # A timed out or cancelled waiter would otherwise linger until the next publish
+        with self._lock:
+            waiters = self._waiters.get(task_id)
+            if waiters and waiter in waiters:
+                waiters.remove(waiter)
+                if not waiters:
+                    del self._waiters[task_id]
+
+    def clear(self, task_id: str) -> None:
+        """Drop a task's history, e.g. when the task is deleted."""
+        with self._lock:
+            self._events.pop(task_id, None)
+            self._last_id.pop(task_id, None)
+            self._ended.pop(task_id, None)
+            waiters = self._waiters.pop(task_id, [])
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_wake, future)
+
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
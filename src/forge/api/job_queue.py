@@ -0,0 +1,194 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from pydantic import BaseModel
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from .models import QueueInfo, TaskPriority
+from .scheduler import PRIORITY_ORDER, SchedulerSettings, site_of
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    task_id TEXT NOT NULL,
+    priority TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    submitter TEXT NOT NULL,
+    site TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    worker_id TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    enqueued_at REAL NOT NULL,
+    claimed_at REAL,
+    heartbeat_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_queued ON jobs (status, rank, id);
+CREATE INDEX IF NOT EXISTS idx_jobs_task ON jobs (task_id);
+"""
+
+
+class WorkerSettings(BaseSettings):
+    """
+    Worker and job queue configuration settings.
+    Reads from environment variables or .env file.
+    Prefix: WORKER_
+    """
+    worker_queue_enabled: bool = False  # Run tasks in `forge worker` processes
+    worker_queue_path: str = os.path.join("storage", "jobs.db")
+    worker_concurrency: int = 1  # Runs per worker process
+    worker_poll_interval: float = 1.0
+    worker_lease_timeout: float = 60.0  # Seconds without a heartbeat before a claim is given up
+    worker_max_attempts: int = 3
+
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        env_file_encoding="utf-8",
+        extra="ignore"
+    )
+
+
+class Job(BaseModel):
+    id: int
+    task_id: str
+    priority: TaskPriority
+    submitter: str
+    attempts: int  # Claims so far, including this one
+    wait_seconds: float  # Time spent queued before this claim
+
+
+class JobQueue:
+    """
+    A durable queue of task runs in a SQLite database, shared by the API and
+    any number of worker processes on the machine.
+
+    Workers claim the next job by priority, preferring submitters with fewer
+    claimed jobs, and skipping sites that already have ``max_per_base_url``
+    claimed jobs. Claims are held by heartbeats; a claim whose worker stopped
+    heartbeating for ``lease_timeout`` seconds goes back to the queue.
+    """
+
+    def __init__(self, path: str, lease_timeout: float = 60.0, max_per_base_url: int = 0):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.lease_timeout = lease_timeout
+        self.max_per_base_url = max_per_base_url
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings: Optional[WorkerSettings] = None) -> Optional["JobQueue"]:
+        """Create the queue, or return None when tasks run in the API process."""
+        settings = settings or WorkerSettings()
+        if not settings.worker_queue_enabled:
+            return None
+        return cls(
+            settings.worker_queue_path,
+            lease_timeout=settings.worker_lease_timeout,
+            max_per_base_url=SchedulerSettings().scheduler_max_per_base_url,
+        )
+
+    def enqueue(
+        self,
+        task_id: str,
+        base_url: str,
+        priority: TaskPriority = TaskPriority.NORMAL,
+        submitter: str = "anonymous",
+    ) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (task_id, priority, rank, submitter, site, enqueued_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (task_id, priority.value, PRIORITY_ORDER.index(priority), submitter, site_of(base_url), time.time()),
+            )
+            return cursor.lastrowid
+
+    def claim(self, worker_id: str) -> Optional[Job]:
+        """Claim the next runnable job, or return None if there is none."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Give up the claims of workers that went away
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'queued', worker_id = NULL, claimed_at = NULL WHERE status = 'claimed' AND heartbeat_at < ?",
+                    (now - self.lease_timeout,),
+                )
+                row = self._conn.execute(
+                    """
+                    SELECT * FROM jobs AS j
+                    WHERE status = 'queued'
+                      AND (? <= 0 OR (SELECT COUNT(*) FROM jobs c WHERE c.status = 'claimed' AND c.site = j.site) < ?)
+                    ORDER BY rank,
+                             (SELECT COUNT(*) FROM jobs c WHERE c.status = 'claimed' AND c.submitter = j.submitter),
+                             id
+                    LIMIT 1
+                    """,
+                    (self.max_per_base_url, self.max_per_base_url),
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'claimed', worker_id = ?, attempts = attempts + 1, "
+                        "claimed_at = ?, heartbeat_at = ? WHERE id = ?",
+                        (worker_id, now, now, row["id"]),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        return Job(
+            id=row["id"],
+            task_id=row["task_id"],
+            priority=row["priority"],
+            submitter=row["submitter"],
+            attempts=row["attempts"] + 1,
+            wait_seconds=now - row["enqueued_at"],
+        )
+
+    def heartbeat(self, job_id: int) -> None:
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ?", (time.time(), job_id))
+
+    def complete(self, job_id: int) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def cancel(self, task_id: str) -> bool:
+        """Drop a queued job; claimed jobs are not affected."""
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM jobs WHERE task_id = ? AND status = 'queued'", (task_id,)
+            ).rowcount > 0
+
+    def is_scheduled(self, task_id: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM jobs WHERE task_id = ?", (task_id,)).fetchone() is not None
+
+    def info(self, task_id: str) -> QueueInfo:
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            row = self._conn.execute("SELECT * FROM jobs WHERE task_id = ? ORDER BY id DESC LIMIT 1", (task_id,)).fetchone()
+            position = None
+            if row is not None and row["status"] == "queued":
+                # Ahead by priority and age; fair sharing between submitters may reorder
+                position = self._conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND (rank < ? OR (rank = ? AND id <= ?))",
+                    (row["rank"], row["rank"], row["id"]),
+                ).fetchone()[0]
+        info = QueueInfo(task_id=task_id, running=counts.get("claimed", 0), queued=counts.get("queued", 0))
+        if row is not None:
+            info.priority = TaskPriority(row["priority"])
+            info.submitter = row["submitter"]
+            info.position = position
+            info.wait_seconds = round((row["claimed_at"] or time.time()) - row["enqueued_at"], 3)
+        return info
+
+    def close(self) -> None:
+        self._conn.close()
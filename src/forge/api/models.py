@@ -2,21 +2,33 @@ from datetime import datetime
 from enum import Enum
 from typing import Optional, List, Any, Dict
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from ..runtime.interface import KernelBackend
 
 
 class TaskStatus(str, Enum):
     PENDING = "pending"
+    QUEUED = "queued"  # Started, waiting for the scheduler to admit it
     RUNNING = "running"
     COMPLETED = "completed"
     FAILED = "failed"
     ERROR = "error"
 
 
+class TaskPriority(str, Enum):
+    HIGH = "high"
+    NORMAL = "normal"
+    LOW = "low"
+
+
 class TaskBase(BaseModel):
     name: str
     description: Optional[str] = None
     yaml_content: Optional[str] = None  # The raw YAML content of the test case
+    backend: KernelBackend = KernelBackend.JUPYTER  # Where the task's cells are executed
+    # Answer repeated LLM calls from the response cache; None follows the testcase's `llm-cache`
+    llm_cache: Optional[bool] = None
 
 
 class TaskCreate(TaskBase):
@@ -44,6 +56,8 @@ class Task(TaskBase):
     created_at: datetime
     updated_at: datetime
     
+    testcase_file: Optional[str] = None  # The stored testcase the task was created from
+    suite_id: Optional[str] = None  # The suite the task was created for, if any
     # Execution info could be added here later
     execution_id: Optional[str] = None
     steps: List[StepState] = []
@@ -52,6 +66,78 @@ class Task(TaskBase):
         from_attributes = True
 
 
+class TaskStart(BaseModel):
+    priority: TaskPriority = TaskPriority.NORMAL
+    submitter: str = "anonymous"  # Runs are shared fairly between submitters
+
+
+class QueueInfo(BaseModel):
+    task_id: str
+    priority: Optional[TaskPriority] = None
+    submitter: Optional[str] = None
+    position: Optional[int] = None  # Place in the queue, None once admitted
+    wait_seconds: Optional[float] = None  # Time spent queued so far
+    running: int = 0  # Runs executing on the server
+    queued: int = 0  # Runs waiting on the server
+
+
+class SuiteMode(str, Enum):
+    RUN_ALL = "run_all"
+    FAIL_FAST = "fail_fast"  # Start no more tasks once one fails
+
+
+class SuiteStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    PASSED = "passed"
+    FAILED = "failed"
+
+
+class SuiteCreate(BaseModel):
+    """
+    A batch of testcases to run as one suite. Testcases are collected from
+    all of `directory`, `pattern`, `testcase_files` and `yaml_contents`, in
+    that order; paths are relative to the testcase storage.
+    """
+    name: str
+    description: Optional[str] = None
+    directory: Optional[str] = None  # Every testcase under the directory, recursively
+    pattern: Optional[str] = None  # A glob, e.g. `nightly/**/*.yaml`
+    testcase_files: List[str] = []
+    yaml_contents: List[str] = []
+    parallelism: int = Field(4, ge=1)  # Tasks of the suite running at once
+    mode: SuiteMode = SuiteMode.RUN_ALL
+    backend: KernelBackend = KernelBackend.JUPYTER
+    llm_cache: Optional[bool] = None
+    priority: TaskPriority = TaskPriority.NORMAL
+    submitter: str = "anonymous"
+
+
+class SuiteCounts(BaseModel):
+    total: int = 0
+    pending: int = 0  # Not started yet, or skipped after a fail-fast stop
+    queued: int = 0
+    running: int = 0
+    completed: int = 0
+    failed: int = 0  # Failed or errored
+
+
+class Suite(BaseModel):
+    id: str
+    name: str
+    description: Optional[str] = None
+    status: SuiteStatus
+    mode: SuiteMode
+    parallelism: int
+    task_ids: List[str] = []
+    counts: SuiteCounts = SuiteCounts()
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    duration_seconds: Optional[float] = None  # Run time so far, or in total once finished
+    stopped: bool = False  # A failure stopped a fail-fast suite early
+
+
 class TaskSummary(BaseModel):
     id: str
     name: str
@@ -60,6 +146,7 @@ class TaskSummary(BaseModel):
 
 
 class ExecutionLog(BaseModel):
+    seq: int = 0  # Position in the task's log, starting at 1
     timestamp: datetime
     level: str
     message: str
@@ -77,3 +164,30 @@ class ExecutionState(BaseModel):
     status: TaskStatus
     logs: List[ExecutionLog] = []
     cells: List[CellExecutionState] = []
+    # Pass back as `since_cell_version` to only receive cells changed after this state
+    cursor: Optional[int] = None
+    # Pass back as `since_log_seq` to only receive newer log entries
+    log_seq: int = 0
+    # True when `limit` cut a list short; poll again from the returned cursors
+    has_more: bool = False
+    # Last task event reflected in this state, to follow the event stream from
+    last_event_id: int = 0
+
+
+class TaskEventType(str, Enum):
+    LOG = "log"
+    TASK_STATUS = "task_status"
+    CELL_STARTED = "cell_started"
+    CELL_OUTPUT = "cell_output"
+    CELL_FINISHED = "cell_finished"
+    STEP_STATUS = "step_status"
+    SCREENSHOT = "screenshot"
+    END = "end"  # The run finished and its cleanup is done
+    RESYNC = "resync"  # Events were dropped from history; refetch the full state
+
+
+class TaskEvent(BaseModel):
+    id: int  # Sequence number within the task, usable as Last-Event-ID
+    type: TaskEventType
+    timestamp: datetime
+    data: Dict[str, Any] = {}
@@ -0,0 +1,301 @@
+import bisect
+import heapq
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Protocol, Tuple, runtime_checkable
+
+from pydantic import BaseModel, field_validator
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from .models import StepState, StepStatus, Task, TaskStatus
+
+# Keyset position in the task listing: (created_at, id) of the last task seen
+TaskCursor = Tuple[datetime, str]
+
+
+def local_naive(value: datetime) -> datetime:
+    """Convert an aware datetime to the naive local time `created_at` is stored in."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone().replace(tzinfo=None)
+
+
+class TaskFilter(BaseModel):
+    """Criteria a listed task must meet; unset fields match everything."""
+    statuses: Optional[List[TaskStatus]] = None
+    name_prefix: Optional[str] = None
+    created_after: Optional[datetime] = None  # Inclusive
+    created_before: Optional[datetime] = None  # Exclusive
+    testcase_file: Optional[str] = None
+    suite_id: Optional[str] = None
+
+    @field_validator("created_after", "created_before")
+    @classmethod
+    def _local_naive(cls, value: Optional[datetime]) -> Optional[datetime]:
+        return None if value is None else local_naive(value)
+
+    def matches(self, task: Task) -> bool:
+        return (
+            (self.statuses is None or task.status in self.statuses)
+            and (self.name_prefix is None or task.name.startswith(self.name_prefix))
+            and (self.created_after is None or task.created_at >= self.created_after)
+            and (self.created_before is None or task.created_at < self.created_before)
+            and (self.testcase_file is None or task.testcase_file == self.testcase_file)
+            and (self.suite_id is None or task.suite_id == self.suite_id)
+        )
+
+
+class RepositorySettings(BaseSettings):
+    """
+    Task repository configuration settings.
+    Reads from environment variables or .env file.
+    Prefix: STORE_
+    """
+    store_backend: str = "memory"  # memory or sqlite
+    store_sqlite_path: str = "storage/forge.db"
+    store_log_batch_size: int = 200
+    store_log_flush_interval: float = 0.2
+
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        env_file_encoding="utf-8",
+        extra="ignore"
+    )
+
+
+@runtime_checkable
+class TaskRepository(Protocol):
+    """
+    Persistence for tasks, their steps, logs and cell summaries.
+    Tasks are listed newest first, ordered by (created_at, id).
+    """
+
+    def create_task(self, task: Task) -> Task:
+        ...
+
+    def get_task(self, task_id: str) -> Optional[Task]:
+        ...
+
+    def list_tasks(
+        self, limit: int = 100, skip: int = 0, after: Optional[TaskCursor] = None, filters: Optional[TaskFilter] = None
+    ) -> List[Task]:
+        """List tasks newest first, starting after the ``after`` cursor if given."""
+        ...
+
+    def count_tasks(self, filters: Optional[TaskFilter] = None) -> int:
+        ...
+
+    def delete_task(self, task_id: str) -> bool:
+        ...
+
+    def update_status(self, task_id: str, status: TaskStatus) -> None:
+        ...
+
+    def update_step(
+        self, task_id: str, index: int, status: Optional[StepStatus] = None, screenshot: Optional[str] = None
+    ) -> Optional[StepState]:
+        """Update a step, returning it, or None if there is no such step."""
+        ...
+
+    def append_log(self, task_id: str, level: str, message: str) -> Optional[Dict[str, Any]]:
+        """Append a log entry numbered after the task's last one, returning it."""
+        ...
+
+    def get_logs(self, task_id: str, since_seq: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Return log entries with a seq greater than ``since_seq``, oldest first."""
+        ...
+
+    def last_log_seq(self, task_id: str) -> int:
+        ...
+
+    def detach(self, task_id: str) -> None:
+        """
+        Write out anything buffered for the task and forget cached state about
+        it, so another process can update it next.
+        """
+        ...
+
+    def update_cells(self, task_id: str, cells: List[Dict[str, Any]]) -> None:
+        """Replace the stored cell summaries of a task."""
+        ...
+
+    def update_cell(self, task_id: str, cell: Dict[str, Any]) -> None:
+        """Replace the stored summary of one cell, matched by id, or append it."""
+        ...
+
+    def get_cells(self, task_id: str) -> List[Dict[str, Any]]:
+        ...
+
+    def close(self) -> None:
+        ...
+
+
+class InMemoryTaskRepository(TaskRepository):
+    """
+    Keeps everything in process memory; nothing survives a restart.
+    Tasks are indexed by (created_at, id), overall and per status, so listings
+    walk the index instead of sorting every task.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[str, Task] = {}
+        self._logs: Dict[str, List[Dict[str, Any]]] = {}
+        self._cells: Dict[str, List[Dict[str, Any]]] = {}
+        # Ascending (created_at, id) keys
+        self._order: List[TaskCursor] = []
+        self._by_status: Dict[TaskStatus, List[TaskCursor]] = {}
+
+    def create_task(self, task: Task) -> Task:
+        self._tasks[task.id] = task
+        self._logs[task.id] = []
+        self._cells[task.id] = []
+        key = (task.created_at, task.id)
+        bisect.insort(self._order, key)
+        bisect.insort(self._by_status.setdefault(task.status, []), key)
+        return task
+
+    def get_task(self, task_id: str) -> Optional[Task]:
+        return self._tasks.get(task_id)
+
+    def list_tasks(
+        self, limit: int = 100, skip: int = 0, after: Optional[TaskCursor] = None, filters: Optional[TaskFilter] = None
+    ) -> List[Task]:
+        tasks = []
+        for task in self._scan(after, filters):
+            if skip:
+                skip -= 1
+                continue
+            if len(tasks) >= limit:
+                break
+            tasks.append(task)
+        return tasks
+
+    def count_tasks(self, filters: Optional[TaskFilter] = None) -> int:
+        return sum(1 for _ in self._scan(None, filters))
+
+    def _scan(self, after: Optional[TaskCursor], filters: Optional[TaskFilter]) -> Iterator[Task]:
+        """Yield matching tasks newest first, narrowing the walk with the indexes."""
+        filters = filters or TaskFilter()
+        if filters.statuses is None:
+            indexes = [self._order]
+        else:
+            indexes = [self._by_status.get(status, []) for status in set(filters.statuses)]
+
+        # Bound the walk by the cursor and the date range
+        upper = after
+        if filters.created_before is not None and (upper is None or (filters.created_before, "") < upper):
+            upper = (filters.created_before, "")
+        lower = (filters.created_after, "") if filters.created_after is not None else None
+
+        def walk(keys: List[TaskCursor]) -> Iterator[TaskCursor]:
+            end = len(keys) if upper is None else bisect.bisect_left(keys, upper)
+            start = 0 if lower is None else bisect.bisect_left(keys, lower)
+            for i in range(end - 1, start - 1, -1):
+                yield keys[i]
+
+        for _, task_id in heapq.merge(*(walk(keys) for keys in indexes), reverse=True):
+            task = self._tasks[task_id]
+            if filters.matches(task):
+                yield task
+
+    def delete_task(self, task_id: str) -> bool:
+        if task_id not in self._tasks:
+            return False
+        task = self._tasks.pop(task_id)
+        key = (task.created_at, task.id)
+        _remove_key(self._order, key)
+        _remove_key(self._by_status[task.status], key)
+        self._logs.pop(task_id, None)
+        self._cells.pop(task_id, None)
+        return True
+
+    def update_status(self, task_id: str, status: TaskStatus) -> None:
+        task = self._tasks.get(task_id)
+        if task is None:
+            return
+        if task.status != status:
+            key = (task.created_at, task.id)
+            _remove_key(self._by_status[task.status], key)
+            bisect.insort(self._by_status.setdefault(status, []), key)
+        task.status = status
+        task.updated_at = datetime.now()
+
+    def update_step(
+        self, task_id: str, index: int, status: Optional[StepStatus] = None, screenshot: Optional[str] = None
+    ) -> Optional[StepState]:
+        task = self._tasks.get(task_id)
+        if task is None or index >= len(task.steps):
+            return None
+        step = task.steps[index]
+        if status is not None:
+            step.status = status
+        if screenshot is not None:
+            step.screenshot = screenshot
+        task.updated_at = datetime.now()
+        return step
+
+    def append_log(self, task_id: str, level: str, message: str) -> Optional[Dict[str, Any]]:
+        logs = self._logs.get(task_id)
+        if logs is None:
+            return None
+        log = {
+            "seq": len(logs) + 1,
+            "timestamp": datetime.now(),
+            "level": level,
+            "message": message
+        }
+        logs.append(log)
+        return log
+
+    def get_logs(self, task_id: str, since_seq: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        # Log entries are numbered from 1, so seq n sits at index n - 1
+        logs = self._logs.get(task_id, [])[since_seq:]
+        return logs if limit is None else logs[:limit]
+
+    def last_log_seq(self, task_id: str) -> int:
+        return len(self._logs.get(task_id, []))
+
+    def detach(self, task_id: str) -> None:
+        pass
+
+    def update_cells(self, task_id: str, cells: List[Dict[str, Any]]) -> None:
+        if task_id in self._cells:
+            self._cells[task_id] = cells
+            self._tasks[task_id].updated_at = datetime.now()
+
+    def update_cell(self, task_id: str, cell: Dict[str, Any]) -> None:
+        cells = self._cells.get(task_id)
+        if cells is None:
+            return
+        index = next((i for i in range(len(cells) - 1, -1, -1) if cells[i]["id"] == cell["id"]), None)
+        if index is None:
+            cells.append(cell)
+        else:
+            cells[index] = cell
+        self._tasks[task_id].updated_at = datetime.now()
+
+    def get_cells(self, task_id: str) -> List[Dict[str, Any]]:
+        return self._cells.get(task_id, [])
+
+    def close(self) -> None:
+        pass
+
+
+def _remove_key(keys: List[TaskCursor], key: TaskCursor) -> None:
+    i = bisect.bisect_left(keys, key)
+    if i < len(keys) and keys[i] == key:
+        del keys[i]
+
+
+def create_repository(settings: Optional[RepositorySettings] = None) -> TaskRepository:
+    """Create the task repository selected by the STORE_ settings."""
+    settings = settings or RepositorySettings()
+    if settings.store_backend == "sqlite":
+        from .sqlite_repository import SQLiteTaskRepository
+        return SQLiteTaskRepository(
+            settings.store_sqlite_path,
+            log_batch_size=settings.store_log_batch_size,
+            log_flush_interval=settings.store_log_flush_interval,
+        )
+    if settings.store_backend != "memory":
+        raise ValueError(f"Unknown task store backend: {settings.store_backend}")
+    return InMemoryTaskRepository()
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, status
+
+from ..store import store
+from ...llm_cache import CacheStats
+
+router = APIRouter(tags=["llm-cache"])
+
+
+@router.get("/llm-cache", response_model=CacheStats)
+async def get_llm_cache_stats():
+    """
+    Hit and miss counts and the size of the LLM response cache, across every
+    process sharing it.
+    """
+    return store.llm_cache.stats()
+
+
+@router.delete("/llm-cache", status_code=status.HTTP_204_NO_CONTENT)
+async def clear_llm_cache():
+    """Drop every cached LLM response and reset the counts."""
+    store.llm_cache.clear()
@@ -0,0 +1,91 @@
+import os
+import uuid
+from datetime import datetime
+from typing import List
+
+import yaml
+from fastapi import APIRouter, BackgroundTasks, HTTPException, status
+
+from ..models import Suite, SuiteCreate, SuiteStatus, TaskCreate, TaskStart
+from ..store import store
+from ..storage import find_testcases
+from ..suites import refresh_suite, run_suite
+from .tasks import build_task
+
+router = APIRouter(tags=["suites"])
+
+
+def _testcase_name(yaml_content: str, default: str) -> str:
+    try:
+        testcase = yaml.safe_load(yaml_content)
+        name = testcase.get("name") if isinstance(testcase, dict) else None
+        return str(name) if name else default
+    except Exception:
+        return default
+
+
+@router.post("/suites", response_model=Suite, status_code=status.HTTP_202_ACCEPTED)
+async def create_suite(suite_in: SuiteCreate, background_tasks: BackgroundTasks):
+    """
+    Create a task for each testcase of a suite and start running them,
+    `parallelism` at a time. Follow the suite with `GET /suites/{suite_id}`
+    and its tasks with `GET /tasks?suite_id=...`.
+    """
+    suite_id = str(uuid.uuid4())
+
+    files: List[str] = []
+    if suite_in.directory is not None:
+        files += find_testcases(os.path.join(suite_in.directory, "**", "*"))
+    if suite_in.pattern is not None:
+        files += find_testcases(suite_in.pattern)
+    files += suite_in.testcase_files
+    # A testcase matched more than once runs once
+    files = list(dict.fromkeys(files))
+    if not files and not suite_in.yaml_contents:
+        raise HTTPException(status_code=400, detail="The suite has no testcases")
+
+    # Build every task first so a bad testcase fails the request before anything is created
+    options = {"backend": suite_in.backend, "llm_cache": suite_in.llm_cache}
+    tasks = [build_task(TaskCreate(name=path, testcase_file=path, **options), suite_id=suite_id) for path in files]
+    for i, content in enumerate(suite_in.yaml_contents):
+        name = _testcase_name(content, f"{suite_in.name} #{i + 1}")
+        tasks.append(build_task(TaskCreate(name=name, yaml_content=content, **options), suite_id=suite_id))
+    for task in tasks:
+        store.create_task(task)
+
+    suite = Suite(
+        id=suite_id,
+        name=suite_in.name,
+        description=suite_in.description,
+        status=SuiteStatus.PENDING,
+        mode=suite_in.mode,
+        parallelism=suite_in.parallelism,
+        task_ids=[task.id for task in tasks],
+        created_at=datetime.now(),
+    )
+    store.suites[suite_id] = suite
+    refresh_suite(suite)
+
+    start = TaskStart(priority=suite_in.priority, submitter=suite_in.submitter)
+    background_tasks.add_task(run_suite, suite, start)
+    return suite
+
+
+@router.get("/suites", response_model=List[Suite])
+async def list_suites():
+    """
+    List suites, newest first.
+    """
+    suites = sorted(store.suites.values(), key=lambda s: s.created_at, reverse=True)
+    return [refresh_suite(suite) for suite in suites]
+
+
+@router.get("/suites/{suite_id}", response_model=Suite)
+async def get_suite(suite_id: str):
+    """
+    Get a suite with the aggregate status and duration of its tasks.
+    """
+    suite = store.suites.get(suite_id)
+    if not suite:
+        raise HTTPException(status_code=404, detail="Suite not found")
+    return refresh_suite(suite)
@@ -1,26 +1,70 @@
 import uuid
 import asyncio
+import hashlib
 import yaml
 import os
+from collections import OrderedDict
 from datetime import datetime
-from typing import List
+from typing import Any, Dict, List, Optional
 
-from fastapi import APIRouter, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, HTTPException, status, BackgroundTasks, Header, Query, Request
+from fastapi.responses import Response, StreamingResponse
 
-from ..models import Task, TaskCreate, TaskSummary, ExecutionState, TaskStatus, CellExecutionState, ExecutionLog, StepState, StepStatus
-from ..store import store
+from ..models import Task, TaskCreate, TaskSummary, ExecutionState, TaskStatus, CellExecutionState, ExecutionLog, StepState, StepStatus, TaskEventType, TaskStart, QueueInfo
+from ..repository import TaskFilter, local_naive
+from ..store import cell_summary, store
 from ..storage import get_testcase_content, save_testcase
-from ...agent.forge_agent import ForgeAgent
+from ..runner import is_scheduled, queue_task, run_scheduled
+from ...export import export_pytest, script_filename
 
 router = APIRouter(tags=["tasks"])
 
 
+def _parse_cursor(after: str):
+    """Parse a `<created_at>,<id>` listing cursor."""
+    created_at, sep, task_id = after.partition(",")
+    try:
+        if not sep or not task_id:
+            raise ValueError
+        return local_naive(datetime.fromisoformat(created_at)), task_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor, expected '<created_at>,<id>'")
+
+
 @router.get("/tasks", response_model=List[TaskSummary])
-async def list_tasks(skip: int = 0, limit: int = 100):
+async def list_tasks(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    after: Optional[str] = None,
+    status_filter: Optional[List[TaskStatus]] = Query(None, alias="status"),
+    name_prefix: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    testcase_file: Optional[str] = None,
+    suite_id: Optional[str] = None,
+    include_total: bool = False,
+):
     """
-    List all tasks.
+    List tasks, newest first.
+    Pass the `X-Next-Cursor` header of a page as `after` to get the next one;
+    `skip` still works but gets slower the deeper it goes. With `include_total`,
+    the number of matching tasks is returned in `X-Total-Count`.
     """
-    tasks = store.list_tasks(skip, limit)
+    filters = TaskFilter(
+        statuses=status_filter,
+        name_prefix=name_prefix,
+        created_after=created_after,
+        created_before=created_before,
+        testcase_file=testcase_file,
+        suite_id=suite_id,
+    )
+    tasks = store.list_tasks(skip, limit, after=_parse_cursor(after) if after else None, filters=filters)
+    if len(tasks) == limit:
+        last = tasks[-1]
+        response.headers["X-Next-Cursor"] = f"{last.created_at.isoformat()},{last.id}"
+    if include_total:
+        response.headers["X-Total-Count"] = str(store.count_tasks(filters))
     return [
         TaskSummary(
             id=t.id,
@@ -36,6 +80,13 @@ async def create_task(task_in: TaskCreate):
     """
     Create a new task with YAML test case definition.
     """
+    task = build_task(task_in)
+    store.create_task(task)
+    return task
+
+
+def build_task(task_in: TaskCreate, suite_id: Optional[str] = None) -> Task:
+    """Build a pending task from its definition, loading its testcase and steps."""
     task_id = str(uuid.uuid4())
     now = datetime.now()
     
@@ -77,13 +128,15 @@ async def create_task(task_in: TaskCreate):
         name=task_in.name,
         description=task_in.description,
         yaml_content=yaml_content,
+        backend=task_in.backend,
+        llm_cache=task_in.llm_cache,
+        testcase_file=task_in.testcase_file,
+        suite_id=suite_id,
         status=TaskStatus.PENDING,
         created_at=now,
         updated_at=now,
         steps=steps
     )
-    
-    store.create_task(task)
     return task
 
 
@@ -107,199 +160,214 @@ async def delete_task(task_id: str):
         raise HTTPException(status_code=404, detail="Task not found")
 
 
-async def _run_task_background(task_id: str):
+@router.post("/tasks/{task_id}/start", status_code=status.HTTP_202_ACCEPTED)
+async def start_task(task_id: str, background_tasks: BackgroundTasks, start: Optional[TaskStart] = None):
     """
-    Background task to execute ForgeAgent.
+    Start task execution.
+    The run is queued until the scheduler admits it, by priority and fairly
+    between submitters; see `GET /tasks/{task_id}/queue`. With the worker queue
+    enabled, the run is executed by a `forge worker` process instead.
     """
-    store.update_status(task_id, TaskStatus.RUNNING)
-    store.append_log(task_id, "INFO", "Starting ForgeAgent session...")
-    
-    # 1. Initialize Session
-    try:
-        session = store.create_session(task_id)
-        store.append_log(task_id, "INFO", "Jupyter session started.")
-    except Exception as e:
-        store.append_log(task_id, "ERROR", f"Failed to start session: {e}")
-        store.update_status(task_id, TaskStatus.FAILED)
-        return
-
-    # 2. Parse Testcase
     task = store.get_task(task_id)
-    if not task.yaml_content:
-         store.append_log(task_id, "ERROR", "No YAML content found.")
-         store.update_status(task_id, TaskStatus.FAILED)
-         return
-         
-    try:
-        testcase = yaml.safe_load(task.yaml_content)
-        steps = [step["content"] for step in testcase.get("steps", [])]
-        
-        # Inject context if available
-        if steps:
-            context_str = f"Context: {testcase.get('description', '')}\n"
-            steps[0] = f"{context_str}Step 1: {steps[0]}"
-            
-        store.append_log(task_id, "INFO", f"Loaded {len(steps)} steps from testcase.")
-    except Exception as e:
-        store.append_log(task_id, "ERROR", f"Failed to parse YAML: {e}")
-        store.update_status(task_id, TaskStatus.FAILED)
-        return
-
-    # 3. Initialize Browser (based on env)
-    env = testcase.get("test-env", {})
-    base_url = env.get("base_url", "https://www.baidu.com")
-    headless = env.get("headless", False)
-    
-    init_code = f"""
-from playwright.async_api import async_playwright
-playwright = await async_playwright().start()
-browser = await playwright.chromium.launch(headless={headless})
-context = await browser.new_context(base_url="{base_url}")
-page = await context.new_page()
-await page.goto("{base_url}")
-"""
-    try:
-        store.append_log(task_id, "INFO", "Initializing browser environment...")
-        await session.add_cell(init_code)
-        store.append_log(task_id, "INFO", "Browser initialized.")
-    except Exception as e:
-        store.append_log(task_id, "ERROR", f"Failed to initialize browser: {e}")
-        store.update_status(task_id, TaskStatus.FAILED)
-        return
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    if is_scheduled(task_id):
+        raise HTTPException(status_code=409, detail="Task is already queued or running")
 
-    # 4. Run Agent with Callbacks for Steps & Screenshots
-    
-    async def step_callback(index: int, status_val: str):
-        # Update step status in store
-        # Since store uses in-memory objects, we can modify them directly if we retrieve them
-        current_task = store.get_task(task_id)
-        if current_task and index < len(current_task.steps):
-            step = current_task.steps[index]
-            
-            if status_val == "running":
-                step.status = StepStatus.RUNNING
-                
-            elif status_val == "completed":
-                step.status = StepStatus.COMPLETED
-                
-                # Take Screenshot
-                try:
-                    # Create task directory for screenshots
-                    screenshots_dir = os.path.join(os.getcwd(), "screenshots", task_id)
-                    os.makedirs(screenshots_dir, exist_ok=True)
-                    
-                    screenshot_filename = f"step_{index}.png"
-                    screenshot_path = os.path.join(screenshots_dir, screenshot_filename)
-                    
-                    screenshot_code = f"""
-await page.screenshot(path="{screenshot_path}")
-"""
-                    await session.add_cell(screenshot_code)
-                    
-                    # Update screenshot URL (relative path for frontend)
-                    step.screenshot = f"/screenshots/{task_id}/{screenshot_filename}"
-                    
-                except Exception as ex:
-                    store.append_log(task_id, "WARNING", f"Failed to take screenshot for step {index}: {ex}")
-                    
-            elif status_val == "error":
-                step.status = StepStatus.ERROR
+    start = start or TaskStart()
+    queue_task(task, start)
+    if store.job_queue is None:
+        background_tasks.add_task(run_scheduled, task, start)
+    return {"status": "accepted"}
 
-    try:
-        store.append_log(task_id, "INFO", "Launching ForgeAgent...")
-        agent = ForgeAgent(task_id)
-        
-        # We need to pass the raw steps list corresponding to task.steps
-        # However, earlier we modified steps[0] with context. 
-        # The agent logic iterates over the passed steps.
-        # We must ensure the length matches task.steps for the index to align.
-        
-        await agent.run(steps, step_callback=step_callback)
-        
-        store.append_log(task_id, "INFO", "Agent execution completed successfully.")
-        store.update_status(task_id, TaskStatus.COMPLETED)
-    except Exception as e:
-        store.append_log(task_id, "ERROR", f"Agent execution failed: {e}")
-        store.update_status(task_id, TaskStatus.FAILED)
-    finally:
-        # Cleanup
-        try:
-            store.append_log(task_id, "INFO", "Cleaning up resources...")
-            
-            # Close browser context/page if possible via a cell
-            # This ensures Playwright resources are released properly
-            cleanup_code = """
-try:
-    if 'browser' in locals():
-        await browser.close()
-    if 'playwright' in locals():
-        await playwright.stop()
-except Exception:
-    pass
-"""
-            # We try to run cleanup code, but don't fail if session is already dead
-            try:
-                if session:
-                    await session.add_cell(cleanup_code)
-            except Exception:
-                pass
-
-            # Stop the session (kernel)
-            if session:
-                session.stop()
-                store.append_log(task_id, "INFO", "Session stopped.")
-                
-            # Optionally remove session from store to free memory
-            # store.remove_session(task_id) 
-            
-        except Exception as e:
-            store.append_log(task_id, "WARNING", f"Cleanup failed: {e}")
 
+@router.get("/tasks/{task_id}/queue", response_model=QueueInfo)
+async def get_task_queue(task_id: str):
+    """
+    Get the scheduling state of a task: its place in the queue and how long it
+    has waited, along with the server's running and queued run counts.
+    """
+    if not store.get_task(task_id):
+        raise HTTPException(status_code=404, detail="Task not found")
+    if store.job_queue is not None:
+        return store.job_queue.info(task_id)
+    return store.scheduler.info(task_id)
 
-@router.post("/tasks/{task_id}/start", status_code=status.HTTP_202_ACCEPTED)
-async def start_task(task_id: str, background_tasks: BackgroundTasks):
+
+# Seconds between keep-alive comments on an idle event stream
+EVENT_HEARTBEAT = 15.0
+
+
+@router.get("/tasks/{task_id}/events")
+async def stream_task_events(
+    task_id: str,
+    request: Request,
+    last_event_id: Optional[int] = None,
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID"),
+):
     """
-    Start task execution.
+    Stream task updates as Server-Sent Events: logs, task and step status,
+    cell progress and screenshots. Resumes after `last_event_id` (or the
+    `Last-Event-ID` header sent by reconnecting clients), e.g. the
+    `last_event_id` of the execution state. The stream ends
+    after the `end` event of the latest run.
+    """
+    if not store.get_task(task_id):
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    # Reconnecting clients send the header, which is newer than the URL's query
+    after = last_event_id
+    if last_event_id_header and last_event_id_header.isdigit():
+        after = int(last_event_id_header)
+
+    async def event_stream():
+        cursor = after or 0
+        while True:
+            # Nothing more will be published for a finished task the client is caught up on
+            task = store.get_task(task_id)
+            if not task:
+                return
+            if task.status not in (TaskStatus.QUEUED, TaskStatus.RUNNING) and cursor >= store.events.last_event_id(task_id):
+                return
+            events = await store.events.wait(task_id, after=cursor, timeout=EVENT_HEARTBEAT)
+            if await request.is_disconnected() or not store.get_task(task_id):
+                return
+            if not events:
+                yield ": keep-alive\n\n"
+                continue
+            for event in events:
+                cursor = event.id
+                yield f"id: {event.id}\nevent: {event.type.value}\ndata: {event.model_dump_json()}\n\n"
+                # An `end` left over from an earlier run doesn't end the stream of a rerun
+                if event.type == TaskEventType.END and store.get_task(task_id).status not in (TaskStatus.QUEUED, TaskStatus.RUNNING):
+                    return
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/tasks/{task_id}/cells/{cell_id}/outputs")
+async def get_cell_outputs(task_id: str, cell_id: str) -> List[Dict[str, Any]]:
+    """
+    Get the full outputs of a cell, including those truncated in the execution state.
+    """
+    session = store.get_session(task_id)
+    outputs = session.get_cell_outputs(cell_id) if session else None
+    if outputs is None:
+        raise HTTPException(status_code=404, detail="Cell not found")
+    return outputs
+
+
+@router.get("/tasks/{task_id}/export")
+async def export_task(task_id: str):
+    """
+    Export a completed run as a standalone pytest file that replays the
+    successful cells of each step with Playwright, without a kernel or the LLM.
     """
     task = store.get_task(task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
-        
-    background_tasks.add_task(_run_task_background, task_id)
-    return {"status": "accepted"}
+    if task.status != TaskStatus.COMPLETED:
+        raise HTTPException(status_code=409, detail="Only completed tasks can be exported")
+    session = store.get_session(task_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="The notebook of the task's run is no longer available")
+    try:
+        source = export_pytest(session.notebook, task.yaml_content, name=task.name)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return Response(
+        content=source,
+        media_type="text/x-python",
+        headers={"Content-Disposition": f'attachment; filename="{script_filename(task.name)}"'},
+    )
+
+
+# Serialized execution states, keyed by ETag; a finished task is only serialized once
+EXECUTION_CACHE_SIZE = 256
+_execution_cache: "OrderedDict[str, bytes]" = OrderedDict()
 
 
 @router.get("/tasks/{task_id}/execution", response_model=ExecutionState)
-async def get_task_execution(task_id: str):
+async def get_task_execution(
+    task_id: str,
+    since_cell_version: Optional[int] = None,
+    since_log_seq: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+    since: Optional[int] = None,
+    if_none_match: Optional[str] = Header(None),
+):
     """
     Get current execution state (logs, cells) for a task.
+    With `since_cell_version` (the `cursor` of a previous response), only cells
+    that changed after that state are returned; with `since_log_seq` (the
+    `log_seq` of a previous response), only newer log entries. `limit` caps each
+    list, setting `has_more` when more remain. Responses carry an ETag, and a
+    matching `If-None-Match` gets a 304. `since` is an alias of `since_cell_version`.
     """
     task = store.get_task(task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
-        
-    exec_state = store.get_execution_state(task_id) or {}
-    
+
+    if since_cell_version is None:
+        since_cell_version = since
+    version = store.execution_version(task_id)
+    key = f"{task_id}:{version}:{since_cell_version}:{since_log_seq}:{limit}"
+    etag = f'W/"{hashlib.sha1(key.encode()).hexdigest()[:20]}"'
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    body = _execution_cache.get(etag)
+    if body is None:
+        state = _build_execution_state(task, since_cell_version, since_log_seq, limit)
+        body = state.model_dump_json().encode()
+        _execution_cache[etag] = body
+        while len(_execution_cache) > EXECUTION_CACHE_SIZE:
+            _execution_cache.popitem(last=False)
+    else:
+        _execution_cache.move_to_end(etag)
+    # Browsers revalidate with the ETag on every poll rather than reusing a stale copy
+    return Response(content=body, media_type="application/json", headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+
+def _build_execution_state(task: Task, since_cell_version: Optional[int], since_log_seq: int, limit: Optional[int]) -> ExecutionState:
+    task_id = task.id
+    last_event_id = store.events.last_event_id(task_id)
+    has_more = False
+
+    # Fetch one more entry than asked for to tell whether more remain
+    logs = store.get_logs(task_id, since_seq=since_log_seq, limit=None if limit is None else limit + 1)
+    if limit is not None and len(logs) > limit:
+        logs, has_more = logs[:limit], True
+    log_seq = logs[-1]["seq"] if logs else since_log_seq
+
     # Get live cells from session if available
     session = store.get_session(task_id)
     cells = []
+    cursor = None
     if session:
-        notebook_state = session.get_state()
-        cells = [
-            CellExecutionState(
-                id=c.id,
-                status=c.status,
-                code=c.source,
-                output=str(c.outputs) if c.outputs else None
-            ) for c in notebook_state.cells
-        ]
+        notebook_state = session.get_state(since=since_cell_version)
+        cursor = notebook_state.version
+        changed = notebook_state.cells
+        if limit is not None and len(changed) > limit:
+            # Return the oldest changes first so the cursor can resume after them
+            changed = sorted(changed, key=lambda c: c.revision)[:limit]
+            cursor, has_more = changed[-1].revision, True
+        cells = [CellExecutionState(**cell_summary(c)) for c in changed]
     else:
-        # Fallback to stored execution state (e.g. if session closed)
-        cells = [CellExecutionState(**cell) for cell in exec_state.get("cells", [])]
+        # Fallback to the stored cell summaries (e.g. if session closed)
+        cells = [CellExecutionState(**cell) for cell in store.repository.get_cells(task_id)]
 
     return ExecutionState(
         task_id=task_id,
         status=task.status,
-        logs=[ExecutionLog(**log) for log in exec_state.get("logs", [])],
-        cells=cells
+        logs=[ExecutionLog(**log) for log in logs],
+        cells=cells,
+        cursor=cursor,
+        log_seq=log_seq,
+        has_more=has_more,
+        last_event_id=last_event_id
     )
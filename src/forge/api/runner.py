@@ -0,0 +1,238 @@
+import asyncio
+import os
+from typing import Optional
+
+import yaml
+
+from .models import StepStatus, Task, TaskEventType, TaskStart, TaskStatus
+from .store import store
+from ..agent.forge_agent import ForgeAgent
+from ..agent.replay import step_keys
+from ..agent.routing import route_steps
+from ..agent.verification import step_checks
+from ..llm_cache import ScopedLLMCache, use_llm_cache
+from ..model.testcase import DEFAULT_BASE_URL, TestEnv, agent_steps
+from ..runtime.profile import BROWSER_CLEANUP_CODE, build_browser_init_code
+
+
+def testcase_base_url(yaml_content: Optional[str]) -> str:
+    """The base_url a testcase runs against, for per-site scheduling limits."""
+    try:
+        env = (yaml.safe_load(yaml_content or "") or {}).get("test-env") or {}
+        return env.get("base_url") or DEFAULT_BASE_URL
+    except Exception:
+        return DEFAULT_BASE_URL
+
+
+def is_scheduled(task_id: str) -> bool:
+    """Whether a run of the task is queued or executing."""
+    if store.job_queue is not None:
+        return store.job_queue.is_scheduled(task_id)
+    return store.scheduler.is_scheduled(task_id)
+
+
+def queue_task(task: Task, start: TaskStart) -> None:
+    """
+    Mark a task queued. With the worker queue enabled, the run is handed to a
+    `forge worker` process here; otherwise call `run_scheduled` to execute it.
+    Either way `is_scheduled` holds from here on.
+    """
+    if store.job_queue is None:
+        store.scheduler.reserve(task.id)
+    store.update_status(task.id, TaskStatus.QUEUED)
+    store.append_log(task.id, "INFO", f"Queued with {start.priority.value} priority.")
+    if store.job_queue is not None:
+        # A worker process picks the run up from here
+        store.repository.detach(task.id)
+        store.job_queue.enqueue(
+            task.id, testcase_base_url(task.yaml_content), priority=start.priority, submitter=start.submitter
+        )
+
+
+async def run_scheduled(task: Task, start: TaskStart) -> bool:
+    """
+    Run a queued task in this process once the scheduler admits it.
+    Returns False if the run was cancelled while queued.
+    """
+    def on_start(waited: float):
+        store.append_log(task.id, "INFO", f"Admitted after {waited:.1f}s in queue.")
+
+    return await store.scheduler.run(
+        task.id,
+        lambda: run_task(task.id),
+        base_url=testcase_base_url(task.yaml_content),
+        priority=start.priority,
+        submitter=start.submitter,
+        on_start=on_start,
+    )
+
+
+async def run_task(task_id: str):
+    """
+    Execute a task: start its session, run ForgeAgent over its steps and
+    record progress in the store.
+    """
+    store.update_status(task_id, TaskStatus.RUNNING)
+    store.append_log(task_id, "INFO", "Starting ForgeAgent session...")
+    
+    # 1. Initialize Session
+    task = store.get_task(task_id)
+    try:
+        session = store.create_session(task_id, backend=task.backend)
+        store.append_log(task_id, "INFO", f"Session started ({task.backend.value} backend).")
+    except Exception as e:
+        store.append_log(task_id, "ERROR", f"Failed to start session: {e}")
+        store.update_status(task_id, TaskStatus.FAILED)
+        return
+
+    # 2. Parse Testcase
+    if not task.yaml_content:
+         store.append_log(task_id, "ERROR", "No YAML content found.")
+         store.update_status(task_id, TaskStatus.FAILED)
+         return
+         
+    try:
+        testcase = yaml.safe_load(task.yaml_content)
+        session.notebook.metadata["testcase"] = task.yaml_content
+        steps = agent_steps(testcase)
+        store.append_log(task_id, "INFO", f"Loaded {len(steps)} steps from testcase.")
+    except Exception as e:
+        store.append_log(task_id, "ERROR", f"Failed to parse YAML: {e}")
+        store.update_status(task_id, TaskStatus.FAILED)
+        return
+
+    # 3. Initialize Browser (based on env)
+    # The kernel may already have a browser launched by its profile,
+    # in which case only a fresh context and page are created.
+    try:
+        env = TestEnv(**{"base_url": DEFAULT_BASE_URL, **testcase.get("test-env", {})})
+    except Exception as e:
+        store.append_log(task_id, "ERROR", f"Invalid test-env: {e}")
+        store.update_status(task_id, TaskStatus.FAILED)
+        return
+
+    # Cells that outlive the test-env timeout are interrupted
+    session.cell_timeout = env.timeout / 1000
+
+    # With a browser pool, attach to a shared browser server instead of launching one
+    browser_lease = None
+    try:
+        store.append_log(task_id, "INFO", "Initializing browser environment...")
+        if store.browser_pool:
+            # The first lease of a browser type launches its servers, off the event loop
+            browser_lease = await asyncio.to_thread(store.browser_pool.acquire, env.browser)
+            store.append_log(task_id, "INFO", f"Attached to browser server {browser_lease.server_id}.")
+        init_code = build_browser_init_code(env, ws_endpoint=browser_lease.ws_endpoint if browser_lease else None)
+        await session.add_cell(init_code)
+        store.append_log(task_id, "INFO", "Browser initialized.")
+    except Exception as e:
+        store.append_log(task_id, "ERROR", f"Failed to initialize browser: {e}")
+        store.update_status(task_id, TaskStatus.FAILED)
+        if browser_lease:
+            store.browser_pool.release(browser_lease)
+        return
+
+    # 4. Run Agent with Callbacks for Steps & Screenshots
+    llm_cache = ScopedLLMCache(store.llm_cache) if use_llm_cache(task.llm_cache, testcase) else None
+    agent: Optional[ForgeAgent] = None
+    
+    async def step_callback(index: int, status_val: str):
+        # Update step status in store; subscribers are notified of each change
+        current_task = store.get_task(task_id)
+        if current_task and index < len(current_task.steps):
+            if status_val == "running":
+                store.update_step(task_id, index, status=StepStatus.RUNNING)
+                
+            elif status_val == "completed":
+                store.update_step(task_id, index, status=StepStatus.COMPLETED)
+                
+                # Take Screenshot
+                try:
+                    # Create task directory for screenshots
+                    screenshots_dir = os.path.join(os.getcwd(), "screenshots", task_id)
+                    os.makedirs(screenshots_dir, exist_ok=True)
+                    
+                    screenshot_filename = f"step_{index}.png"
+                    screenshot_path = os.path.join(screenshots_dir, screenshot_filename)
+                    
+                    screenshot_code = f"""
+await page.screenshot(path="{screenshot_path}")
+"""
+                    await session.add_cell(screenshot_code, internal=True)
+                    
+                    # Update screenshot URL (relative path for frontend)
+                    store.update_step(task_id, index, screenshot=f"/screenshots/{task_id}/{screenshot_filename}")
+                    
+                except Exception as ex:
+                    store.append_log(task_id, "WARNING", f"Failed to take screenshot for step {index}: {ex}")
+                    
+            elif status_val == "error":
+                store.update_step(task_id, index, status=StepStatus.ERROR)
+
+    try:
+        store.append_log(task_id, "INFO", "Launching ForgeAgent...")
+        agent = ForgeAgent(task_id, replay_cache=store.replay_cache, llm_cache=llm_cache)
+        
+        # We need to pass the raw steps list corresponding to task.steps
+        # However, earlier we modified steps[0] with context. 
+        # The agent logic iterates over the passed steps.
+        # We must ensure the length matches task.steps for the index to align.
+        
+        await agent.run(
+            steps,
+            step_callback=step_callback,
+            replay_keys=step_keys(testcase, env),
+            routes=route_steps(testcase),
+            checks=step_checks(testcase),
+        )
+        if agent.replayed_steps:
+            store.append_log(task_id, "INFO", f"Replayed {len(agent.replayed_steps)} of {len(steps)} steps from recorded cells.")
+        if agent.checked_steps:
+            store.append_log(task_id, "INFO", f"Verified {len(agent.checked_steps)} step(s) with direct checks, without the LLM.")
+        
+        store.append_log(task_id, "INFO", "Agent execution completed successfully.")
+        store.update_status(task_id, TaskStatus.COMPLETED)
+    except Exception as e:
+        store.append_log(task_id, "ERROR", f"Agent execution failed: {e}")
+        store.update_status(task_id, TaskStatus.FAILED)
+    finally:
+        if agent is not None and agent.escalated_steps:
+            escalated = ", ".join(str(i + 1) for i in agent.escalated_steps)
+            store.append_log(task_id, "INFO", f"Escalated step(s) {escalated} to the large model.")
+        stats = agent.llm_stats if agent is not None else None
+        if stats is not None and stats.calls:
+            store.append_log(
+                task_id, "INFO",
+                f"LLM: {stats.calls} requests, {stats.retries} retries, {stats.wait_seconds:.1f}s queued "
+                f"(longest {stats.max_wait_seconds:.1f}s).",
+            )
+        if llm_cache is not None:
+            store.append_log(task_id, "INFO", f"LLM cache: {llm_cache.hits} hits, {llm_cache.misses} misses.")
+        # Cleanup
+        try:
+            store.append_log(task_id, "INFO", "Cleaning up resources...")
+            
+            # Close browser context/page if possible via a cell
+            # This ensures Playwright resources are released properly
+            # We try to run cleanup code, but don't fail if session is already dead
+            try:
+                if session:
+                    await session.add_cell(BROWSER_CLEANUP_CODE, internal=True)
+            except Exception:
+                pass
+
+            # Return the session's kernel to the pool
+            if session:
+                store.stop_session(task_id)
+                store.append_log(task_id, "INFO", "Session stopped.")
+
+            if browser_lease:
+                store.browser_pool.release(browser_lease)
+                
+            # Optionally remove session from store to free memory
+            # store.remove_session(task_id) 
+            
+        except Exception as e:
+            store.append_log(task_id, "WARNING", f"Cleanup failed: {e}")
+        finally:
+            store.events.publish(task_id, TaskEventType.END)
@@ -0,0 +1,216 @@
+import asyncio
+import itertools
+import time
+from collections import Counter
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+from urllib.parse import urlsplit
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from .models import QueueInfo, TaskPriority
+
+# Dispatch order of the priority levels
+PRIORITY_ORDER = [TaskPriority.HIGH, TaskPriority.NORMAL, TaskPriority.LOW]
+
+
+class SchedulerSettings(BaseSettings):
+    """
+    Task scheduler configuration settings.
+    Reads from environment variables or .env file.
+    Prefix: SCHEDULER_
+    """
+    scheduler_max_concurrency: int = 4
+    scheduler_max_per_base_url: int = 2  # 0 = no per-site limit
+
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        env_file_encoding="utf-8",
+        extra="ignore"
+    )
+
+
+def site_of(base_url: str) -> str:
+    """The scheme and host a base_url limit applies to."""
+    parts = urlsplit(base_url)
+    return f"{parts.scheme}://{parts.netloc}".lower() if parts.netloc else base_url.lower()
+
+
+class _QueueEntry:
+    def __init__(self, task_id: str, priority: TaskPriority, submitter: str, site: str, seq: int):
+        self.task_id = task_id
+        self.priority = priority
+        self.submitter = submitter
+        self.site = site
+        self.seq = seq
+        self.queued_at = time.time()
+        self.started_at: Optional[float] = None
+        self.admitted: Optional[asyncio.Future] = None
+        self.dropped = False
+
+    @property
+    def wait_seconds(self) -> float:
+        return (self.started_at or time.time()) - self.queued_at
+
+
+class TaskScheduler:
+    """
+    Admission control for task runs.
+
+    At most ``max_concurrency`` runs execute at once, and at most
+    ``max_per_base_url`` against the same site, so a burst of starts queues up
+    instead of launching a kernel and a browser for each. Queued runs are
+    admitted by priority; within a priority, the submitter with the fewest
+    running tasks goes first, then the one served least recently (round robin),
+    then the oldest run. A run blocked by its site's
+    limit doesn't hold up runs for other sites.
+    """
+
+    def __init__(self, max_concurrency: int = 4, max_per_base_url: int = 2):
+        if max_concurrency < 1:
+            raise ValueError("Scheduler requires max_concurrency >= 1.")
+        self.max_concurrency = max_concurrency
+        self.max_per_base_url = max_per_base_url
+        self._queue: List[_QueueEntry] = []
+        self._running: Dict[str, _QueueEntry] = {}
+        # Runs reserved before `run` queues them, e.g. from a background task started after the response
+        self._starting: Set[str] = set()
+        self._seq = itertools.count()
+        # When each submitter last had a run admitted, for round robin
+        self._admissions = itertools.count(1)
+        self._last_admitted: Dict[str, int] = {}
+
+    @classmethod
+    def from_settings(cls, settings: Optional[SchedulerSettings] = None) -> "TaskScheduler":
+        settings = settings or SchedulerSettings()
+        return cls(
+            max_concurrency=settings.scheduler_max_concurrency,
+            max_per_base_url=settings.scheduler_max_per_base_url,
+        )
+
+    def is_scheduled(self, task_id: str) -> bool:
+        return (
+            task_id in self._starting
+            or task_id in self._running
+            or any(e.task_id == task_id for e in self._queue)
+        )
+
+    def reserve(self, task_id: str) -> None:
+        """Count a run as scheduled from now until `run` queues it."""
+        self._starting.add(task_id)
+
+    async def run(
+        self,
+        task_id: str,
+        job: Callable[[], Awaitable[None]],
+        base_url: str,
+        priority: TaskPriority = TaskPriority.NORMAL,
+        submitter: str = "anonymous",
+        on_start: Optional[Callable[[float], None]] = None,
+    ) -> bool:
+        """
+        Queue a run and execute ``job`` once it is admitted.
+        ``on_start`` is called with the seconds spent waiting. Returns False if
+        the run was cancelled while queued.
+        """
+        entry = _QueueEntry(task_id, priority, submitter, site_of(base_url), next(self._seq))
+        entry.admitted = asyncio.get_running_loop().create_future()
+        self._queue.append(entry)
+        self._starting.discard(task_id)
+        self._dispatch()
+        try:
+            await entry.admitted
+        except asyncio.CancelledError:
+            if entry in self._queue:
+                self._queue.remove(entry)
+            if entry.dropped:
+                return False
+            # The waiting coroutine itself was cancelled; give back a slot it may have got
+            self._finish(entry)
+            raise
+
+        try:
+            if on_start:
+                on_start(entry.wait_seconds)
+            await job()
+        finally:
+            self._finish(entry)
+        return True
+
+    def cancel(self, task_id: str) -> bool:
+        """Drop a queued run; runs already executing are not affected."""
+        self._starting.discard(task_id)
+        for entry in self._queue:
+            if entry.task_id == task_id:
+                self._queue.remove(entry)
+                entry.dropped = True
+                entry.admitted.cancel()
+                return True
+        return False
+
+    def _finish(self, entry: _QueueEntry) -> None:
+        if self._running.get(entry.task_id) is entry:
+            del self._running[entry.task_id]
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Admit queued runs while there is capacity."""
+        while len(self._running) < self.max_concurrency:
+            entry = self._next(Counter(e.submitter for e in self._running.values()), self._last_admitted, check_sites=True)
+            if entry is None:
+                return
+            self._queue.remove(entry)
+            if entry.admitted.done():
+                # Its waiter was cancelled and is about to clean up
+                continue
+            entry.started_at = time.time()
+            self._last_admitted[entry.submitter] = next(self._admissions)
+            self._running[entry.task_id] = entry
+            entry.admitted.set_result(None)
+
+    def _next(
+        self,
+        running_by_submitter: Counter,
+        last_admitted: Dict[str, int],
+        check_sites: bool,
+        queue: Optional[List[_QueueEntry]] = None,
+    ) -> Optional[_QueueEntry]:
+        queue = self._queue if queue is None else queue
+        if check_sites and self.max_per_base_url > 0:
+            busy = Counter(e.site for e in self._running.values())
+            queue = [e for e in queue if busy[e.site] < self.max_per_base_url]
+        for priority in PRIORITY_ORDER:
+            candidates = [e for e in queue if e.priority == priority]
+            if candidates:
+                return min(candidates, key=lambda e: (
+                    running_by_submitter[e.submitter], last_admitted.get(e.submitter, 0), e.seq
+                ))
+        return None
+
+    def position(self, task_id: str) -> Optional[int]:
+        """
+        The 1-based place of a queued run in admission order, assuming no site
+        limit holds it back. None if the run isn't queued.
+        """
+        if not any(e.task_id == task_id for e in self._queue):
+            return None
+        running = Counter(e.submitter for e in self._running.values())
+        last_admitted = dict(self._last_admitted)
+        admissions = itertools.count(max(last_admitted.values(), default=0) + 1)
+        remaining = list(self._queue)
+        for place in itertools.count(1):
+            entry = self._next(running, last_admitted, check_sites=False, queue=remaining)
+            if entry.task_id == task_id:
+                return place
+            remaining.remove(entry)
+            running[entry.submitter] += 1
+            last_admitted[entry.submitter] = next(admissions)
+
+    def info(self, task_id: str) -> QueueInfo:
+        entry = self._running.get(task_id) or next((e for e in self._queue if e.task_id == task_id), None)
+        info = QueueInfo(task_id=task_id, running=len(self._running), queued=len(self._queue))
+        if entry is not None:
+            info.priority = entry.priority
+            info.submitter = entry.submitter
+            info.position = self.position(task_id)
+            info.wait_seconds = round(entry.wait_seconds, 3)
+        return info
@@ -1,14 +1,34 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 import os
 
-from .routes import tasks
+from .routes import llm_cache, suites, tasks
+from .store import store
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up kernels in the background so tasks don't pay the kernel boot;
+    # with a job queue tasks run in `forge worker` processes, which warm their own
+    if store.job_queue is None:
+        store.kernel_pool.start()
+        if store.browser_pool:
+            store.browser_pool.start()
+    yield
+    store.kernel_pool.close()
+    store.tenant_kernels.close()
+    if store.browser_pool:
+        store.browser_pool.close()
+    store.close()
+
 
 app = FastAPI(
     title="TestForge API",
     description="API for TestForge Autonomous Testing Agent",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # Configure CORS
@@ -18,10 +38,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "X-Total-Count"],
 )
 
 # Include routers
 app.include_router(tasks.router, prefix="/api/v1")
+app.include_router(suites.router, prefix="/api/v1")
+app.include_router(llm_cache.router, prefix="/api/v1")
 
 # Mount screenshots directory
 screenshots_dir = os.path.join(os.getcwd(), "screenshots")
@@ -0,0 +1,438 @@
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from .models import StepState, StepStatus, Task, TaskStatus
+from .repository import TaskCursor, TaskFilter, TaskRepository
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    description TEXT,
+    yaml_content TEXT,
+    backend TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    execution_id TEXT,
+    testcase_file TEXT,
+    suite_id TEXT,
+    llm_cache INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_created ON tasks (created_at, id);
+CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_tasks_name ON tasks (name);
+
+CREATE TABLE IF NOT EXISTS steps (
+    task_id TEXT NOT NULL REFERENCES tasks (id) ON DELETE CASCADE,
+    idx INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    status TEXT NOT NULL,
+    screenshot TEXT,
+    PRIMARY KEY (task_id, idx)
+);
+
+CREATE TABLE IF NOT EXISTS logs (
+    task_id TEXT NOT NULL REFERENCES tasks (id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    timestamp TEXT NOT NULL,
+    level TEXT NOT NULL,
+    message TEXT NOT NULL,
+    PRIMARY KEY (task_id, seq)
+);
+
+CREATE TABLE IF NOT EXISTS cells (
+    task_id TEXT NOT NULL REFERENCES tasks (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    code TEXT NOT NULL,
+    output TEXT,
+    PRIMARY KEY (task_id, position)
+);
+
+CREATE INDEX IF NOT EXISTS cells_by_id ON cells (task_id, id);
+"""
+
+TASK_COLUMNS = "id, name, description, yaml_content, backend, status, created_at, updated_at, execution_id, testcase_file, suite_id, llm_cache"
+
+# Columns added after the first release, created on databases that predate them
+MIGRATIONS = {
+    "testcase_file": [
+        "ALTER TABLE tasks ADD COLUMN testcase_file TEXT",
+    ],
+    "suite_id": [
+        "ALTER TABLE tasks ADD COLUMN suite_id TEXT",
+    ],
+    "llm_cache": [
+        "ALTER TABLE tasks ADD COLUMN llm_cache INTEGER",
+    ],
+}
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_tasks_testcase ON tasks (testcase_file, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_tasks_suite ON tasks (suite_id, status);
+"""
+
+
+class SQLiteTaskRepository(TaskRepository):
+    """
+    Task repository in a SQLite database running in WAL mode.
+
+    Log entries are numbered and buffered in memory, then written in batches
+    by a background thread every ``log_flush_interval`` seconds (or as soon as
+    ``log_batch_size`` are pending), so appending a log never waits on disk.
+    Reads see buffered entries too.
+    """
+
+    def __init__(self, path: str, log_batch_size: int = 200, log_flush_interval: float = 0.2):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.log_batch_size = log_batch_size
+        self.log_flush_interval = log_flush_interval
+
+        self._conn = self._connect()
+        self._conn.executescript(SCHEMA)
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(tasks)")}
+        for column, statements in MIGRATIONS.items():
+            if column not in columns:
+                for statement in statements:
+                    self._conn.execute(statement)
+        self._conn.executescript(INDEXES)
+        self._lock = threading.Lock()
+
+        # Logs not yet committed: waiting for the writer, and being written by it
+        self._pending: List[Dict[str, Any]] = []
+        self._flushing: List[Dict[str, Any]] = []
+        self._last_seq: Dict[str, int] = {}
+        self._wakeup = threading.Condition(self._lock)
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_logs, name="task-log-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    # Tasks
+
+    def create_task(self, task: Task) -> Task:
+        with self._lock, self._transaction():
+            self._conn.execute(
+                f"INSERT INTO tasks ({TASK_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    task.id, task.name, task.description, task.yaml_content, task.backend.value,
+                    task.status.value, _timestamp(task.created_at), _timestamp(task.updated_at), task.execution_id,
+                    task.testcase_file, task.suite_id, task.llm_cache,
+                ),
+            )
+            self._conn.executemany(
+                "INSERT INTO steps (task_id, idx, content, status, screenshot) VALUES (?, ?, ?, ?, ?)",
+                [(task.id, s.index, s.content, s.status.value, s.screenshot) for s in task.steps],
+            )
+            self._last_seq[task.id] = 0
+        return task
+
+    def get_task(self, task_id: str) -> Optional[Task]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT {TASK_COLUMNS} FROM tasks WHERE id = ?", (task_id,)).fetchone()
+            if row is None:
+                return None
+            return self._load_tasks([row])[0]
+
+    def list_tasks(
+        self, limit: int = 100, skip: int = 0, after: Optional[TaskCursor] = None, filters: Optional[TaskFilter] = None
+    ) -> List[Task]:
+        where, params = _where(filters)
+        if after is not None:
+            where.append("(created_at, id) < (?, ?)")
+            params += [_timestamp(after[0]), after[1]]
+        query = f"SELECT {TASK_COLUMNS} FROM tasks"
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        query += " ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?"
+        params += [limit, skip]
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+            return self._load_tasks(rows)
+
+    def count_tasks(self, filters: Optional[TaskFilter] = None) -> int:
+        where, params = _where(filters)
+        query = "SELECT COUNT(*) FROM tasks"
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        with self._lock:
+            return self._conn.execute(query, params).fetchone()[0]
+
+    def _load_tasks(self, rows: List[sqlite3.Row]) -> List[Task]:
+        """Build tasks from their rows, fetching the steps of all of them at once."""
+        if not rows:
+            return []
+        ids = [row["id"] for row in rows]
+        steps: Dict[str, List[StepState]] = {task_id: [] for task_id in ids}
+        placeholders = ", ".join("?" * len(ids))
+        for step in self._conn.execute(
+            f"SELECT task_id, idx, content, status, screenshot FROM steps WHERE task_id IN ({placeholders}) ORDER BY task_id, idx",
+            ids,
+        ):
+            steps[step["task_id"]].append(StepState(
+                index=step["idx"], content=step["content"], status=step["status"], screenshot=step["screenshot"]
+            ))
+        return [
+            Task(
+                id=row["id"],
+                name=row["name"],
+                description=row["description"],
+                yaml_content=row["yaml_content"],
+                backend=row["backend"],
+                status=row["status"],
+                created_at=datetime.fromisoformat(row["created_at"]),
+                updated_at=datetime.fromisoformat(row["updated_at"]),
+                execution_id=row["execution_id"],
+                testcase_file=row["testcase_file"],
+                suite_id=row["suite_id"],
+                llm_cache=None if row["llm_cache"] is None else bool(row["llm_cache"]),
+                steps=steps[row["id"]],
+            ) for row in rows
+        ]
+
+    def delete_task(self, task_id: str) -> bool:
+        with self._lock, self._transaction():
+            deleted = self._conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,)).rowcount > 0
+            self._pending = [log for log in self._pending if log["task_id"] != task_id]
+            self._last_seq.pop(task_id, None)
+        return deleted
+
+    def update_status(self, task_id: str, status: TaskStatus) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE tasks SET status = ?, updated_at = ? WHERE id = ?",
+                (status.value, _timestamp(datetime.now()), task_id),
+            )
+
+    def update_step(
+        self, task_id: str, index: int, status: Optional[StepStatus] = None, screenshot: Optional[str] = None
+    ) -> Optional[StepState]:
+        with self._lock, self._transaction():
+            if status is not None:
+                self._conn.execute(
+                    "UPDATE steps SET status = ? WHERE task_id = ? AND idx = ?", (status.value, task_id, index)
+                )
+            if screenshot is not None:
+                self._conn.execute(
+                    "UPDATE steps SET screenshot = ? WHERE task_id = ? AND idx = ?", (screenshot, task_id, index)
+                )
+            row = self._conn.execute(
+                "SELECT idx, content, status, screenshot FROM steps WHERE task_id = ? AND idx = ?", (task_id, index)
+            ).fetchone()
+            if row is not None:
+                self._touch(task_id)
+        if row is None:
+            return None
+        return StepState(index=row["idx"], content=row["content"], status=row["status"], screenshot=row["screenshot"])
+
+    # Logs
+
+    def append_log(self, task_id: str, level: str, message: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            seq = self._last_seq.get(task_id)
+            if seq is None:
+                if self._conn.execute("SELECT 1 FROM tasks WHERE id = ?", (task_id,)).fetchone() is None:
+                    return None
+                row = self._conn.execute("SELECT MAX(seq) FROM logs WHERE task_id = ?", (task_id,)).fetchone()
+                seq = row[0] or 0
+            log = {
+                "seq": seq + 1,
+                "timestamp": datetime.now(),
+                "level": level,
+                "message": message
+            }
+            self._last_seq[task_id] = log["seq"]
+            self._pending.append({"task_id": task_id, **log})
+            if len(self._pending) >= self.log_batch_size:
+                self._wakeup.notify()
+        return log
+
+    def get_logs(self, task_id: str, since_seq: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            # Snapshot the buffers before querying: a batch committed in between
+            # then shows up twice rather than not at all
+            buffered = [log for log in self._pending + self._flushing if log["task_id"] == task_id and log["seq"] > since_seq]
+            query = "SELECT seq, timestamp, level, message FROM logs WHERE task_id = ? AND seq > ? ORDER BY seq"
+            params: List[Any] = [task_id, since_seq]
+            if limit is not None:
+                query += " LIMIT ?"
+                params.append(limit)
+            rows = self._conn.execute(query, params).fetchall()
+
+        logs = {
+            row["seq"]: {
+                "seq": row["seq"],
+                "timestamp": datetime.fromisoformat(row["timestamp"]),
+                "level": row["level"],
+                "message": row["message"],
+            } for row in rows
+        }
+        for log in buffered:
+            logs.setdefault(log["seq"], {k: v for k, v in log.items() if k != "task_id"})
+        result = [logs[seq] for seq in sorted(logs)]
+        return result if limit is None else result[:limit]
+
+    def last_log_seq(self, task_id: str) -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT MAX(seq) FROM logs WHERE task_id = ?", (task_id,)).fetchone()
+            return max(row[0] or 0, self._last_seq.get(task_id, 0))
+
+    def detach(self, task_id: str) -> None:
+        self.flush()
+        with self._lock:
+            self._last_seq.pop(task_id, None)
+
+    def _touch(self, task_id: str) -> None:
+        self._conn.execute("UPDATE tasks SET updated_at = ? WHERE id = ?", (_timestamp(datetime.now()), task_id))
+
+    def _write_logs(self) -> None:
+        conn = self._connect()
+        try:
+            while True:
+                with self._lock:
+                    # Let appends accumulate into a batch
+                    if len(self._pending) < self.log_batch_size and not self._closed:
+                        self._wakeup.wait(self.log_flush_interval)
+                    if not self._pending:
+                        if self._closed:
+                            return
+                        continue
+                    self._flushing, self._pending = self._pending, []
+                try:
+                    with _Transaction(conn):
+                        # Entries of a task deleted meanwhile are dropped
+                        conn.executemany(
+                            "INSERT OR IGNORE INTO logs (task_id, seq, timestamp, level, message) "
+                            "SELECT ?, ?, ?, ?, ? WHERE EXISTS (SELECT 1 FROM tasks WHERE id = ?)",
+                            [
+                                (log["task_id"], log["seq"], _timestamp(log["timestamp"]), log["level"], log["message"], log["task_id"])
+                                for log in self._flushing
+                            ],
+                        )
+                except sqlite3.Error as e:
+                    logger.error(f"Failed to write {len(self._flushing)} task logs: {e}")
+                with self._lock:
+                    self._flushing = []
+        finally:
+            conn.close()
+
+    def flush(self) -> None:
+        """Wait until every buffered log entry is written."""
+        while True:
+            with self._lock:
+                if not self._pending and not self._flushing:
+                    return
+                self._wakeup.notify()
+            time.sleep(0.01)
+
+    # Cells
+
+    def update_cells(self, task_id: str, cells: List[Dict[str, Any]]) -> None:
+        with self._lock, self._transaction():
+            self._conn.execute("DELETE FROM cells WHERE task_id = ?", (task_id,))
+            self._touch(task_id)
+            self._conn.executemany(
+                "INSERT INTO cells (task_id, position, id, status, code, output) "
+                "SELECT ?, ?, ?, ?, ?, ? WHERE EXISTS (SELECT 1 FROM tasks WHERE id = ?)",
+                [
+                    (task_id, i, cell["id"], cell["status"], cell["code"], cell.get("output"), task_id)
+                    for i, cell in enumerate(cells)
+                ],
+            )
+
+    def update_cell(self, task_id: str, cell: Dict[str, Any]) -> None:
+        values = (cell["status"], cell["code"], cell.get("output"))
+        with self._lock, self._transaction():
+            updated = self._conn.execute(
+                "UPDATE cells SET status = ?, code = ?, output = ? WHERE task_id = ? AND id = ?",
+                (*values, task_id, cell["id"]),
+            ).rowcount
+            if not updated:
+                self._conn.execute(
+                    "INSERT INTO cells (task_id, position, id, status, code, output) "
+                    "SELECT ?, (SELECT COALESCE(MAX(position) + 1, 0) FROM cells WHERE task_id = ?), ?, ?, ?, ? "
+                    "WHERE EXISTS (SELECT 1 FROM tasks WHERE id = ?)",
+                    (task_id, task_id, cell["id"], *values, task_id),
+                )
+            self._touch(task_id)
+
+    def get_cells(self, task_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, status, code, output FROM cells WHERE task_id = ? ORDER BY position", (task_id,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._wakeup.notify()
+        self._writer.join()
+        self._conn.close()
+
+    def _transaction(self):
+        """Run the statements of a ``with`` block in one transaction."""
+        return _Transaction(self._conn)
+
+
+def _where(filters: Optional[TaskFilter]) -> Tuple[List[str], List[Any]]:
+    """Translate a filter into SQL conditions and their parameters."""
+    where: List[str] = []
+    params: List[Any] = []
+    if filters is None:
+        return where, params
+    if filters.statuses is not None:
+        where.append(f"status IN ({', '.join('?' * len(filters.statuses))})")
+        params += [status.value for status in filters.statuses]
+    if filters.name_prefix:
+        # A range rather than LIKE, so the name index is used
+        prefix = filters.name_prefix
+        where.append("name >= ? AND name < ?")
+        params += [prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)]
+    if filters.created_after is not None:
+        where.append("created_at >= ?")
+        params.append(_timestamp(filters.created_after))
+    if filters.created_before is not None:
+        where.append("created_at < ?")
+        params.append(_timestamp(filters.created_before))
+    if filters.testcase_file is not None:
+        where.append("testcase_file = ?")
+        params.append(filters.testcase_file)
+    if filters.suite_id is not None:
+        where.append("suite_id = ?")
+        params.append(filters.suite_id)
+    return where, params
+
+
+def _timestamp(value: datetime) -> str:
+    # A fixed precision keeps stored timestamps ordered as text
+    return value.isoformat(timespec="microseconds")
+
+
+class _Transaction:
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN")
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
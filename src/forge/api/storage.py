@@ -1,3 +1,4 @@
+import glob
 import os
 import yaml
 from typing import List, Dict, Optional
@@ -10,6 +11,17 @@ def list_testcases() -> List[str]:
         return []
     return [f for f in os.listdir(STORAGE_DIR) if f.endswith('.yaml') or f.endswith('.yml')]
 
+def find_testcases(pattern: str) -> List[str]:
+    """List the testcase files matching a glob, as paths relative to the storage."""
+    root = os.path.realpath(STORAGE_DIR)
+    matches = []
+    for path in glob.glob(os.path.join(root, pattern), recursive=True):
+        path = os.path.realpath(path)
+        # Don't let `..` in the pattern reach outside the storage
+        if path.startswith(root + os.sep) and os.path.isfile(path) and path.endswith(('.yaml', '.yml')):
+            matches.append(os.path.relpath(path, root))
+    return sorted(matches)
+
 def get_testcase_content(filename: str) -> Optional[str]:
     """Read content of a testcase file."""
     path = os.path.join(STORAGE_DIR, filename)
@@ -1,83 +1,205 @@
-from typing import Dict, Optional, List, Any
+from typing import Dict, Optional, List, Any, Tuple
 import asyncio
-from datetime import datetime
+import os
+
+from loguru import logger
+
+from .events import TaskEventBus
+from .job_queue import JobQueue
+from .models import Suite, Task, TaskStatus, StepStatus, TaskEventType
+from .repository import InMemoryTaskRepository, TaskCursor, TaskFilter, TaskRepository, create_repository
+from .scheduler import TaskScheduler
+from ..agent.replay import ReplayCache
+from ..llm_cache import LLMResponseCache
+from ..runtime.browser_pool import BrowserPool
+from ..runtime.inprocess import InProcessKernel
+from ..runtime.interface import Cell, Kernel, KernelBackend
+from ..runtime.multitenant import MultiTenantKernelManager
+from ..runtime.pool import KernelPool
+from ..runtime.cell_log import CellLog
+from ..runtime.session import JupyterNotebookSession, NotebookSettings
+
+def cell_summary(cell: Cell) -> Dict[str, Any]:
+    """The form a notebook cell is reported and stored in."""
+    return {
+        "id": cell.id,
+        "status": cell.status.value,
+        "code": cell.source,
+        "output": str(cell.outputs) if cell.outputs else None,
+    }
 
-from .models import Task, TaskStatus
-from ..runtime.session import JupyterNotebookSession
 
 class TaskStore:
-    def __init__(self):
-        self._tasks: Dict[str, Task] = {}
+    def __init__(
+        self,
+        kernel_pool: Optional[KernelPool] = None,
+        browser_pool: Optional[BrowserPool] = None,
+        repository: Optional[TaskRepository] = None,
+    ):
+        # Tasks, logs and cell summaries; in memory or in a database
+        self.repository = repository or create_repository()
         # Stores the runtime session/state associated with a task
-        self._executions: Dict[str, dict] = {} 
         self._sessions: Dict[str, JupyterNotebookSession] = {}
+        # Session kernels until the session is stopped, and whether they came from the pool
+        self._kernels: Dict[str, Tuple[Kernel, bool]] = {}
+        self.kernel_pool = kernel_pool or KernelPool.from_settings()
+        self.notebook_settings = NotebookSettings()
+        # Jupyter kernels hosting several sessions each, for the shared backend
+        self.tenant_kernels = MultiTenantKernelManager.from_settings()
+        # Shared browser servers; None when every kernel launches its own browser
+        self.browser_pool = browser_pool or BrowserPool.from_settings()
+        # Live updates pushed to clients following a task
+        self.events = TaskEventBus()
+        # Bounds how many tasks run at once
+        self.scheduler = TaskScheduler.from_settings()
+        # Recorded step cells replayed instead of asking the LLM; None when disabled
+        self.replay_cache = ReplayCache.from_settings()
+        # LLM responses answering repeated calls of tasks opted into the cache
+        self.llm_cache = LLMResponseCache.from_settings()
+        # Suites run from this process, by id
+        self.suites: Dict[str, Suite] = {}
+        # Runs handed to `forge worker` processes; None when they run in this process
+        self.job_queue = JobQueue.from_settings()
+        if self.job_queue is not None and isinstance(self.repository, InMemoryTaskRepository):
+            raise ValueError("Running tasks in workers requires a shared task store (STORE_BACKEND=sqlite).")
 
-    def create_session(self, task_id: str) -> JupyterNotebookSession:
-        """Create or retrieve a session for the task."""
-        if task_id not in self._sessions:
-            session = JupyterNotebookSession(name=f"session_{task_id}")
+    def create_session(self, task_id: str, backend: KernelBackend = KernelBackend.JUPYTER) -> JupyterNotebookSession:
+        """
+        Create or retrieve a session for the task. A stopped session, kept for
+        inspection after its kernel was released, is replaced by a new one.
+        """
+        if task_id not in self._kernels:
+            pooled = backend == KernelBackend.JUPYTER
+            if backend == KernelBackend.SHARED:
+                kernel = self.tenant_kernels.acquire(task_id)
+            elif backend == KernelBackend.INPROCESS:
+                kernel = InProcessKernel()
+            else:
+                kernel = self.kernel_pool.acquire()
+            settings = self.notebook_settings
+            session = JupyterNotebookSession(
+                name=f"session_{task_id}",
+                kernel=kernel,
+                cell_output_budget=settings.notebook_cell_output_budget,
+                session_output_budget=settings.notebook_session_output_budget,
+                cell_log=CellLog(os.path.join(settings.notebook_cell_log_dir, f"{task_id}.jsonl")),
+                on_event=lambda event_type, data: self._on_session_event(task_id, event_type, data),
+            )
             session.start()
+            self._kernels[task_id] = (kernel, pooled)
             self._sessions[task_id] = session
         return self._sessions[task_id]
 
+    def _on_session_event(self, task_id: str, event_type: str, data: Dict[str, Any]):
+        self.events.publish(task_id, TaskEventType(event_type), data)
+        if event_type == TaskEventType.CELL_FINISHED and self.job_queue is not None:
+            # Keep the stored summaries current for readers in other processes
+            session = self._sessions.get(task_id)
+            cell = session.get_cell(data["cell_id"]) if session is not None else None
+            if cell is not None:
+                self.repository.update_cell(task_id, cell_summary(cell))
+
     def get_session(self, task_id: str) -> Optional[JupyterNotebookSession]:
         return self._sessions.get(task_id)
 
-    def close_session(self, task_id: str):
-        if task_id in self._sessions:
-            session = self._sessions[task_id]
+    def stop_session(self, task_id: str):
+        """
+        Return the session's kernel to the pool (or stop it if it isn't pooled).
+        The session itself is kept so its notebook can still be inspected, and
+        a summary of its cells is stored with the task.
+        """
+        entry = self._kernels.pop(task_id, None)
+        if entry is not None:
+            kernel, pooled = entry
             try:
-                session.stop()
+                if pooled:
+                    self.kernel_pool.release(kernel)
+                else:
+                    kernel.stop()
             except Exception as e:
-                print(f"Error closing session {task_id}: {e}")
+                logger.warning(f"Error stopping session {task_id}: {e}")
+            session = self._sessions.get(task_id)
+            if session is not None:
+                self.update_cells(task_id, [cell_summary(c) for c in session.get_state().cells])
+
+    def close_session(self, task_id: str):
+        if task_id in self._sessions:
+            self.stop_session(task_id)
             del self._sessions[task_id]
 
+    def close(self):
+        self.repository.close()
+        self.llm_cache.close()
+        if self.job_queue is not None:
+            self.job_queue.close()
+
     def create_task(self, task: Task) -> Task:
-        self._tasks[task.id] = task
-        self._executions[task.id] = {
-            "logs": [],
-            "cells": [],
-            "status": TaskStatus.PENDING
-        }
-        return task
+        return self.repository.create_task(task)
 
     def get_task(self, task_id: str) -> Optional[Task]:
-        return self._tasks.get(task_id)
+        return self.repository.get_task(task_id)
+
+    def list_tasks(
+        self, skip: int = 0, limit: int = 100, after: Optional[TaskCursor] = None, filters: Optional[TaskFilter] = None
+    ) -> List[Task]:
+        return self.repository.list_tasks(limit=limit, skip=skip, after=after, filters=filters)
 
-    def list_tasks(self, skip: int = 0, limit: int = 100) -> List[Task]:
-        tasks = list(self._tasks.values())
-        # Sort by created_at desc
-        tasks.sort(key=lambda x: x.created_at, reverse=True)
-        return tasks[skip : skip + limit]
+    def count_tasks(self, filters: Optional[TaskFilter] = None) -> int:
+        return self.repository.count_tasks(filters)
 
     def delete_task(self, task_id: str) -> bool:
-        if task_id in self._tasks:
-            del self._tasks[task_id]
-            if task_id in self._executions:
-                del self._executions[task_id]
+        if self.repository.delete_task(task_id):
+            self.scheduler.cancel(task_id)
+            if self.job_queue is not None:
+                self.job_queue.cancel(task_id)
             self.close_session(task_id)
+            self.events.clear(task_id)
             return True
         return False
 
     def update_status(self, task_id: str, status: TaskStatus):
-        if task_id in self._tasks:
-            self._tasks[task_id].status = status
-            self._tasks[task_id].updated_at = datetime.now()
+        self.repository.update_status(task_id, status)
+        self.events.publish(task_id, TaskEventType.TASK_STATUS, {"status": status})
+
+    def update_step(self, task_id: str, index: int, status: Optional[StepStatus] = None, screenshot: Optional[str] = None):
+        if self.repository.update_step(task_id, index, status=status, screenshot=screenshot) is None:
+            return
+        if status is not None:
+            self.events.publish(task_id, TaskEventType.STEP_STATUS, {"index": index, "status": status})
+        if screenshot is not None:
+            self.events.publish(task_id, TaskEventType.SCREENSHOT, {"index": index, "url": screenshot})
 
     def get_execution_state(self, task_id: str) -> Optional[dict]:
-        return self._executions.get(task_id)
+        task = self.repository.get_task(task_id)
+        if task is None:
+            return None
+        return {
+            "logs": self.repository.get_logs(task_id),
+            "cells": self.repository.get_cells(task_id),
+            "status": task.status
+        }
+
+    def execution_version(self, task_id: str) -> str:
+        """An identifier that changes whenever the task's execution state does."""
+        session = self._sessions.get(task_id)
+        version = f"{self.events.last_event_id(task_id)}.{session.version if session else 0}"
+        if self.job_queue is None:
+            return version
+        # Tasks run by workers change in the repository without events here
+        task = self.repository.get_task(task_id)
+        updated_at = task.updated_at.timestamp() if task else 0
+        return f"{version}.{updated_at}.{self.repository.last_log_seq(task_id)}"
 
     def append_log(self, task_id: str, level: str, message: str):
-        if task_id in self._executions:
-            self._executions[task_id]["logs"].append({
-                "timestamp": datetime.now(),
-                "level": level,
-                "message": message
-            })
+        log = self.repository.append_log(task_id, level, message)
+        if log is not None:
+            self.events.publish(task_id, TaskEventType.LOG, log)
+
+    def get_logs(self, task_id: str, since_seq: int = 0, limit: Optional[int] = None) -> List[dict]:
+        return self.repository.get_logs(task_id, since_seq=since_seq, limit=limit)
 
     def update_cells(self, task_id: str, cells: List[dict]):
-        if task_id in self._executions:
-            self._executions[task_id]["cells"] = cells
+        self.repository.update_cells(task_id, cells)
 
 # Global instance
 store = TaskStore()
@@ -0,0 +1,101 @@
+import asyncio
+from datetime import datetime
+from typing import Set
+
+from loguru import logger
+
+from .models import Suite, SuiteCounts, SuiteMode, SuiteStatus, TaskStart, TaskStatus
+from .repository import TaskFilter
+from .runner import queue_task, run_scheduled
+from .store import store
+
+# Seconds between checks on a suite task run by a worker
+QUEUE_POLL_INTERVAL = 1.0
+
+# Task statuses each suite count covers
+COUNTED_STATUSES = {
+    "pending": [TaskStatus.PENDING],
+    "queued": [TaskStatus.QUEUED],
+    "running": [TaskStatus.RUNNING],
+    "completed": [TaskStatus.COMPLETED],
+    "failed": [TaskStatus.FAILED, TaskStatus.ERROR],
+}
+
+
+def refresh_suite(suite: Suite) -> Suite:
+    """Update the task counts and duration of a suite from its tasks."""
+    counts = {
+        name: store.count_tasks(TaskFilter(suite_id=suite.id, statuses=statuses))
+        for name, statuses in COUNTED_STATUSES.items()
+    }
+    suite.counts = SuiteCounts(total=sum(counts.values()), **counts)
+    if suite.started_at is not None:
+        suite.duration_seconds = round(((suite.finished_at or datetime.now()) - suite.started_at).total_seconds(), 3)
+    return suite
+
+
+async def run_suite(suite: Suite, start: TaskStart) -> None:
+    """
+    Run the tasks of a suite in order, at most ``suite.parallelism`` at a time.
+    Each run still goes through the scheduler (or the worker queue), so the
+    server-wide limits apply on top. In fail-fast mode, the first task that
+    doesn't complete stops the suite: no more tasks are started and the
+    suite's runs still waiting in the queue are dropped.
+    """
+    suite.status = SuiteStatus.RUNNING
+    suite.started_at = datetime.now()
+    pending = iter(suite.task_ids)
+    active: Set[str] = set()
+
+    async def lane():
+        for task_id in pending:
+            if suite.stopped:
+                return
+            task = store.get_task(task_id)
+            if task is None:
+                # Deleted since the suite was created
+                continue
+            active.add(task_id)
+            try:
+                status = await _run_suite_task(task_id, start)
+            finally:
+                active.discard(task_id)
+            if status != TaskStatus.COMPLETED and suite.mode == SuiteMode.FAIL_FAST and not suite.stopped:
+                suite.stopped = True
+                logger.info(f"Suite {suite.id} stopped after task {task_id} ended {status.value}.")
+                for other in list(active):
+                    _skip_queued(other)
+
+    try:
+        await asyncio.gather(*(lane() for _ in range(min(suite.parallelism, len(suite.task_ids)))))
+    finally:
+        suite.finished_at = datetime.now()
+        refresh_suite(suite)
+        passed = suite.counts.completed == suite.counts.total
+        suite.status = SuiteStatus.PASSED if passed else SuiteStatus.FAILED
+
+
+async def _run_suite_task(task_id: str, start: TaskStart) -> TaskStatus:
+    """Start a task of a suite and wait for its run to end, returning its status."""
+    try:
+        task = store.get_task(task_id)
+        queue_task(task, start)
+        if store.job_queue is None:
+            await run_scheduled(task, start)
+        else:
+            while store.job_queue.is_scheduled(task_id):
+                await asyncio.sleep(QUEUE_POLL_INTERVAL)
+    except Exception as e:
+        logger.exception(f"Failed to run suite task {task_id}: {e}")
+        store.append_log(task_id, "ERROR", f"Failed to run task: {e}")
+        store.update_status(task_id, TaskStatus.ERROR)
+    task = store.get_task(task_id)
+    return task.status if task else TaskStatus.ERROR
+
+
+def _skip_queued(task_id: str) -> None:
+    """Drop a suite task's run if it hasn't been admitted yet."""
+    dropped = store.job_queue.cancel(task_id) if store.job_queue is not None else store.scheduler.cancel(task_id)
+    if dropped:
+        store.update_status(task_id, TaskStatus.PENDING)
+        store.append_log(task_id, "INFO", "Skipped: the suite stopped after a failure.")
@@ -0,0 +1,358 @@
+import asyncio
+import json
+import os
+import socket
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional
+
+import yaml
+from loguru import logger
+from pydantic import BaseModel
+
+from .agent.forge_agent import ForgeAgent
+from .agent.replay import ReplayCache, step_keys
+from .agent.routing import route_steps
+from .agent.verification import step_checks
+from .llm_cache import LLMResponseCache, ScopedLLMCache, use_llm_cache
+from .model.testcase import DEFAULT_BASE_URL, TestEnv, agent_steps
+from .runtime.inprocess import InProcessKernel
+from .runtime.interface import Kernel, KernelBackend
+from .runtime.pool import KernelPool, KernelPoolSettings
+from .runtime.profile import BROWSER_CLEANUP_CODE, build_browser_init_code
+from .runtime.session import JupyterNotebookSession
+
+TESTCASE_EXTENSIONS = (".yaml", ".yml")
+
+
+class CaseOutcome(str, Enum):
+    PASSED = "passed"
+    FAILED = "failed"  # A step failed
+    ERROR = "error"  # The testcase couldn't be run: bad YAML, no kernel or browser, ...
+
+
+class StepResult(BaseModel):
+    index: int
+    content: str
+    status: str = "pending"  # pending, running, completed, error
+    replayed: bool = False  # Run from recorded cells, without the LLM
+    escalated: bool = False  # Retried on the large model after failing on its own
+    checked: bool = False  # Verified by direct checks, without the LLM
+
+
+class CaseResult(BaseModel):
+    path: str
+    name: str
+    outcome: CaseOutcome
+    duration: float  # Seconds
+    message: Optional[str] = None
+    steps: List[StepResult] = []
+    notebook: Optional[str] = None  # Saved notebook of the run, if any
+    llm_cache_hits: Optional[int] = None  # LLM calls answered from the cache, if it was used
+    llm_cache_misses: Optional[int] = None
+
+
+def collect_testcases(paths: List[str]) -> List[str]:
+    """Expand directories into the testcase files under them, keeping the order given."""
+    found: List[str] = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                found += [os.path.join(root, f) for f in sorted(files) if f.endswith(TESTCASE_EXTENSIONS)]
+        elif os.path.isfile(path):
+            found.append(path)
+        else:
+            raise FileNotFoundError(f"No such testcase file or directory: {path}")
+    return list(dict.fromkeys(found))
+
+
+class BatchRunner:
+    """
+    Runs testcases with ForgeAgent in notebook sessions of this process,
+    without the API server or its task store.
+
+    Up to ``parallel`` testcases run at once, each in its own kernel and
+    browser context. ``on_result`` is called as each testcase finishes.
+    With a ``replay_cache``, steps are replayed from recorded cells when possible.
+    With an ``llm_cache``, testcases opted in (see `use_llm_cache`, ``use_llm_cache``
+    overriding their choice) answer repeated LLM calls from it.
+    """
+
+    def __init__(
+        self,
+        parallel: int = 1,
+        backend: KernelBackend = KernelBackend.JUPYTER,
+        notebook_dir: Optional[str] = None,
+        on_result: Optional[Callable[[CaseResult], None]] = None,
+        agent_factory: Optional[Callable[..., Any]] = None,
+        replay_cache: Optional[ReplayCache] = None,
+        llm_cache: Optional[LLMResponseCache] = None,
+        use_llm_cache: Optional[bool] = None,
+    ):
+        if parallel < 1:
+            raise ValueError("Batch runs require parallel >= 1.")
+        if backend == KernelBackend.SHARED:
+            raise ValueError("The shared kernel backend is only available in the API server.")
+        self.parallel = parallel
+        self.backend = backend
+        self.notebook_dir = notebook_dir
+        self.on_result = on_result
+        self.agent_factory = agent_factory or ForgeAgent
+        self.replay_cache = replay_cache
+        self.llm_cache = llm_cache
+        self.use_llm_cache = use_llm_cache
+
+    async def run(self, paths: List[str]) -> List[CaseResult]:
+        """Run the testcases, returning their results in the order given."""
+        pool = None
+        if self.backend == KernelBackend.JUPYTER and paths:
+            # Keep a warm kernel for each testcase running at once
+            settings = KernelPoolSettings()
+            size = min(self.parallel, len(paths))
+            pool = KernelPool.from_settings(settings.model_copy(update={
+                "kernel_pool_min_size": size,
+                "kernel_pool_max_size": max(size, settings.kernel_pool_max_size),
+            }))
+            pool.start()
+        semaphore = asyncio.Semaphore(self.parallel)
+
+        async def run_one(path: str) -> CaseResult:
+            async with semaphore:
+                result = await self.run_testcase(path, pool)
+            if self.on_result:
+                self.on_result(result)
+            return result
+
+        try:
+            return list(await asyncio.gather(*(run_one(path) for path in paths)))
+        finally:
+            if pool is not None:
+                pool.close()
+
+    async def run_testcase(self, path: str, pool: Optional[KernelPool] = None) -> CaseResult:
+        started = time.monotonic()
+        result = CaseResult(path=path, name=path, outcome=CaseOutcome.ERROR, duration=0)
+        kernel: Optional[Kernel] = None
+        session: Optional[JupyterNotebookSession] = None
+        llm_cache: Optional[ScopedLLMCache] = None
+        try:
+            # Setup: anything failing here is an error rather than a test failure
+            with open(path, "r", encoding="utf-8") as f:
+                testcase_yaml = f.read()
+            testcase = yaml.safe_load(testcase_yaml) or {}
+            result.name = str(testcase.get("name") or path)
+            steps = agent_steps(testcase)
+            result.steps = [
+                StepResult(index=i, content=step["content"]) for i, step in enumerate(testcase.get("steps", []))
+            ]
+            env = TestEnv(**{"base_url": DEFAULT_BASE_URL, **(testcase.get("test-env") or {})})
+            checks = step_checks(testcase)
+
+            kernel = await asyncio.to_thread(pool.acquire) if pool else InProcessKernel()
+            session = JupyterNotebookSession(name=result.name, kernel=kernel, cell_timeout=env.timeout / 1000)
+            session.notebook.metadata["testcase"] = testcase_yaml  # For `forge export`
+            session.start()
+            init = await session.add_cell(build_browser_init_code(env))
+            if not init.is_success:
+                raise RuntimeError(f"Failed to initialize browser: {_error_message(init.error)}")
+            if self.llm_cache is not None and use_llm_cache(self.use_llm_cache, testcase):
+                llm_cache = ScopedLLMCache(self.llm_cache)
+            agent = self.agent_factory(path, session, replay_cache=self.replay_cache, llm_cache=llm_cache)
+        except Exception as e:
+            result.message = str(e)
+            await self._cleanup(result, kernel, session, pool)
+            result.duration = round(time.monotonic() - started, 3)
+            return result
+
+        async def step_callback(index: int, status: str):
+            if index < len(result.steps):
+                result.steps[index].status = status
+
+        try:
+            await agent.run(
+                steps,
+                step_callback=step_callback,
+                replay_keys=step_keys(testcase, env),
+                routes=route_steps(testcase),
+                checks=checks,
+            )
+            result.outcome = CaseOutcome.PASSED
+        except Exception as e:
+            result.outcome = CaseOutcome.FAILED
+            failed = next((s for s in result.steps if s.status == "error"), None)
+            result.message = f"Step {failed.index + 1} failed: {e}" if failed else str(e)
+        for index in agent.replayed_steps:
+            result.steps[index].replayed = True
+        for index in agent.escalated_steps:
+            result.steps[index].escalated = True
+        for index in agent.checked_steps:
+            result.steps[index].checked = True
+        if llm_cache is not None:
+            result.llm_cache_hits, result.llm_cache_misses = llm_cache.hits, llm_cache.misses
+        await self._cleanup(result, kernel, session, pool)
+        result.duration = round(time.monotonic() - started, 3)
+        return result
+
+    async def _cleanup(
+        self,
+        result: CaseResult,
+        kernel: Optional[Kernel],
+        session: Optional[JupyterNotebookSession],
+        pool: Optional[KernelPool],
+    ) -> None:
+        if session is not None:
+            try:
+                await session.add_cell(BROWSER_CLEANUP_CODE, internal=True)
+            except Exception:
+                pass
+            if self.notebook_dir:
+                os.makedirs(self.notebook_dir, exist_ok=True)
+                stem = os.path.splitext(os.path.normpath(result.path))[0].replace(os.sep, "_").lstrip("._")
+                result.notebook = os.path.join(self.notebook_dir, f"{stem}.ipynb")
+                session.save(result.notebook)
+        if kernel is not None:
+            try:
+                if pool is not None:
+                    pool.release(kernel)
+                else:
+                    kernel.stop()
+            except Exception as e:
+                logger.warning(f"Failed to release the kernel of {result.path}: {e}")
+
+
+def _error_message(error: Optional[Dict[str, Any]]) -> str:
+    if not error:
+        return "unknown error"
+    return f"{error.get('ename')}: {error.get('evalue')}"
+
+
+def summarize(results: List[CaseResult]) -> Dict[str, int]:
+    counts = {outcome.value: 0 for outcome in CaseOutcome}
+    for result in results:
+        counts[result.outcome.value] += 1
+    return {"total": len(results), **counts}
+
+
+def write_json_report(results: List[CaseResult], path: str, duration: float) -> None:
+    report = {
+        "summary": {**summarize(results), "duration": round(duration, 3)},
+        "results": [result.model_dump(mode="json") for result in results],
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+def write_junit_report(results: List[CaseResult], path: str, duration: float, name: str = "forge") -> None:
+    summary = summarize(results)
+    attrs = {
+        "name": name,
+        "tests": str(summary["total"]),
+        "failures": str(summary["failed"]),
+        "errors": str(summary["error"]),
+        "skipped": "0",
+        "time": f"{duration:.3f}",
+    }
+    root = ET.Element("testsuites", attrs)
+    suite = ET.SubElement(root, "testsuite", {
+        **attrs, "timestamp": datetime.now().isoformat(timespec="seconds"), "hostname": socket.gethostname(),
+    })
+    for result in results:
+        case = ET.SubElement(suite, "testcase", {
+            "classname": os.path.dirname(os.path.normpath(result.path)).replace(os.sep, ".") or name,
+            "name": result.name,
+            "file": result.path,
+            "time": f"{result.duration:.3f}",
+        })
+        if result.outcome != CaseOutcome.PASSED:
+            tag = "failure" if result.outcome == CaseOutcome.FAILED else "error"
+            ET.SubElement(case, tag, {"message": result.message or ""}).text = result.message
+        lines = []
+        for s in result.steps:
+            flags = [flag for flag in ("replayed", "escalated", "checked") if getattr(s, flag)]
+            lines.append(f"Step {s.index + 1} [{', '.join([s.status] + flags)}]: {s.content}")
+        if result.notebook:
+            lines.append(f"Notebook: {result.notebook}")
+        if lines:
+            ET.SubElement(case, "system-out").text = "\n".join(lines)
+    ET.indent(root)
+    ET.ElementTree(root).write(path, encoding="utf-8", xml_declaration=True)
+
+
+def write_report(results: List[CaseResult], path: str, duration: float) -> None:
+    """Write a JUnit XML report for a `.xml` path, or a JSON report for a `.json` one."""
+    if path.endswith(".xml"):
+        write_junit_report(results, path, duration)
+    elif path.endswith(".json"):
+        write_json_report(results, path, duration)
+    else:
+        raise ValueError(f"Unknown report format of {path}, expected .xml or .json")
+
+
+def run_batch(
+    paths: List[str],
+    parallel: int = 1,
+    reports: Optional[List[str]] = None,
+    backend: KernelBackend = KernelBackend.JUPYTER,
+    notebook_dir: Optional[str] = None,
+    replay: bool = True,
+    llm_cache: Optional[bool] = None,
+) -> int:
+    """
+    Run testcases, printing each result as it finishes, and write the reports.
+    ``llm_cache`` turns the LLM response cache on or off for every testcase;
+    by default each testcase's `llm-cache` (or LLM_CACHE_DEFAULT) decides.
+    Returns the exit code: 0 if every testcase passed, 1 if not, 2 if the
+    testcases or reports couldn't be found.
+    """
+    reports = reports or []
+    try:
+        testcases = collect_testcases(paths)
+        for report in reports:
+            if not report.endswith((".xml", ".json")):
+                raise ValueError(f"Unknown report format of {report}, expected .xml or .json")
+    except (FileNotFoundError, ValueError) as e:
+        print(f"error: {e}")
+        return 2
+    if not testcases:
+        print("error: no testcases found")
+        return 2
+
+    def on_result(result: CaseResult):
+        print(f"{result.outcome.value.upper():<6} {result.path} ({result.duration:.1f}s)", flush=True)
+        if result.message:
+            print(f"       {result.message}", flush=True)
+
+    print(f"Running {len(testcases)} testcases, {parallel} at a time...", flush=True)
+    started = time.monotonic()
+    runner = BatchRunner(
+        parallel=parallel,
+        backend=backend,
+        notebook_dir=notebook_dir,
+        on_result=on_result,
+        replay_cache=ReplayCache.from_settings() if replay else None,
+        llm_cache=LLMResponseCache.from_settings() if llm_cache is not False else None,
+        use_llm_cache=llm_cache,
+    )
+    try:
+        results = asyncio.run(runner.run(testcases))
+    finally:
+        if runner.llm_cache is not None:
+            runner.llm_cache.close()
+    duration = time.monotonic() - started
+
+    summary = summarize(results)
+    print(f"{summary['passed']} passed, {summary['failed']} failed, {summary['error']} errors in {duration:.1f}s")
+    cached = [r for r in results if r.llm_cache_hits is not None]
+    if cached:
+        hits = sum(r.llm_cache_hits for r in cached)
+        misses = sum(r.llm_cache_misses for r in cached)
+        print(f"LLM cache: {hits} hits, {misses} misses")
+    for report in reports:
+        if os.path.dirname(report):
+            os.makedirs(os.path.dirname(report), exist_ok=True)
+        write_report(results, report, duration)
+        print(f"Report written to {report}")
+    return 0 if summary["passed"] == summary["total"] else 1
@@ -0,0 +1,114 @@
+import re
+import textwrap
+from typing import Any, Dict, List, Optional
+
+import yaml
+
+from .model.testcase import DEFAULT_BASE_URL, StepType, TestEnv
+from .runtime.interface import CellStatus
+
+# Indentation of the step code inside the generated test
+BODY_INDENT = " " * 12
+
+ASSERTION = re.compile(r"\bassert\b|\bexpect\(")
+
+
+def _identifier(name: str) -> str:
+    """A Python identifier for a test, e.g. `Baidu search` -> `baidu_search`."""
+    slug = re.sub(r"\W+", "_", name.lower()).strip("_")
+    return slug if slug and not slug[0].isdigit() else f"case_{slug}"
+
+
+def script_filename(name: str) -> str:
+    """The file name of the exported test of a testcase or task."""
+    return f"test_{_identifier(name)}.py"
+
+
+def step_cells(notebook) -> Dict[int, List[str]]:
+    """
+    The code of the cells that carried out each step: successful cells run by
+    the agent (or replayed) while the step executed. Internal cells such as DOM
+    extraction and screenshots are left out.
+    """
+    steps: Dict[int, List[str]] = {}
+    for cell in notebook.cells:
+        metadata = cell.get("metadata", {})
+        if cell.get("cell_type") != "code" or metadata.get("internal") or metadata.get("step") is None:
+            continue
+        if metadata.get("status") != CellStatus.SUCCESS:
+            continue
+        steps.setdefault(metadata["step"], []).append(cell.source)
+    return steps
+
+
+def export_pytest(notebook, testcase_yaml: Optional[str] = None, name: Optional[str] = None) -> str:
+    """
+    Turn the notebook of a run into a standalone pytest file that replays its
+    steps with Playwright, with no kernel, agent or LLM involved.
+
+    The testcase defaults to the one recorded in the notebook's metadata. The
+    browser is set up from its test-env, but always runs headless.
+    """
+    testcase_yaml = testcase_yaml or notebook.metadata.get("testcase")
+    if not testcase_yaml:
+        raise ValueError("The notebook doesn't record its testcase, pass it explicitly")
+    testcase: Dict[str, Any] = yaml.safe_load(testcase_yaml) or {}
+    env = TestEnv(**{"base_url": DEFAULT_BASE_URL, **(testcase.get("test-env") or {})})
+    name = name or testcase.get("name") or "testcase"
+    func = _identifier(str(name))
+    cells = step_cells(notebook)
+
+    body: List[str] = []
+    for i, step in enumerate(testcase.get("steps", [])):
+        content = step.get("content") if isinstance(step, dict) else str(step)
+        verification = isinstance(step, dict) and step.get("type") == StepType.VERIFICATION.value
+        body.append(f"# Step {i + 1}{' (verification)' if verification else ''}: {_one_line(content)}")
+        code = [c.strip("\n") for c in cells.get(i, []) if c.strip()]
+        if not code:
+            body.append("# No recorded actions")
+        for source in code:
+            body.append(source)
+        if verification and not any(ASSERTION.search(source) for source in code):
+            body.append("# The agent judged this step from the output; add an assertion to check it here")
+        body.append("")
+
+    title = _one_line(name).replace('"""', "'''")
+    source = f'''"""
+{title}
+
+Exported from a TestForge run. Run it with `pytest test_{func}.py`.
+"""
+import asyncio
+
+from playwright.async_api import async_playwright, expect
+
+BASE_URL = {env.base_url!r}
+
+
+async def run_{func}():
+    async with async_playwright() as playwright:
+        browser = await playwright.{env.browser.value}.launch(headless=True)
+        try:
+            context = await browser.new_context(base_url=BASE_URL, viewport={env.viewport!r})
+            context.set_default_timeout({env.timeout})
+            page = await context.new_page()
+            await page.goto(BASE_URL)
+
+{textwrap.indent(chr(10).join(body).rstrip(), BODY_INDENT)}
+        finally:
+            await browser.close()
+
+
+def test_{func}():
+    asyncio.run(run_{func}())
+'''
+    # Recorded cells are kernel code (magics are allowed there); make sure they still make a valid module
+    try:
+        compile(source, f"test_{func}.py", "exec")
+    except SyntaxError as e:
+        raise ValueError(f"The recorded cells don't form valid Python: {e}")
+    return source
+
+
+def _one_line(text: str) -> str:
+    return " ".join(str(text).split())
@@ -1,9 +1,17 @@
+import asyncio
+import threading
+import weakref
 from functools import lru_cache
-from typing import Optional
+from typing import Any, Callable, Dict, Hashable, Optional
 
+import httpx
+from langchain_core.caches import BaseCache
 from langchain_openai import ChatOpenAI
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+from .llm_cache import ContextLLMCache
+from .llm_limiter import LLMLimitSettings, LLMRateLimiter, RateLimitedTransport
+
 
 class LLMSettings(BaseSettings):
     """
@@ -15,6 +23,10 @@ class LLMSettings(BaseSettings):
     openai_base_url: str = "https://api.openai.com/v1"
     openai_model_name: str = "gpt-4-turbo"
     openai_temperature: float = 0.0
+    # Connection pool of the clients shared by every task of a process
+    openai_max_connections: int = 100
+    openai_max_keepalive_connections: int = 20
+    openai_keepalive_expiry: float = 60.0  # Seconds an idle connection is kept open
 
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -36,6 +48,9 @@ def create_llm(
     base_url: Optional[str] = None,
     model: Optional[str] = None,
     temperature: Optional[float] = None,
+    cache: Optional[BaseCache] = None,
+    http_async_client: Optional[httpx.AsyncClient] = None,
+    max_retries: Optional[int] = None,
 ) -> ChatOpenAI:
     """
     Create a LangChain ChatOpenAI instance with the specified configuration.
@@ -46,6 +61,9 @@ def create_llm(
         base_url: OpenAI Base URL
         model: Model name (e.g., gpt-4-turbo)
         temperature: Sampling temperature
+        cache: Response cache answering repeated calls (see `llm_cache`)
+        http_async_client: HTTP client to send async requests with, e.g. to share its connections
+        max_retries: Retries of failed requests by the OpenAI client (default: its own)
         
     Returns:
         ChatOpenAI: Configured ChatOpenAI instance
@@ -63,4 +81,67 @@ def create_llm(
         base_url=final_base_url,
         model=final_model,
         temperature=final_temp,
+        cache=cache,
+        http_async_client=http_async_client,
+        max_retries=max_retries,
     )
+
+
+# Objects shared by every task of the process, per event loop: pooled
+# connections belong to the loop that opened them
+_shared: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, Any]]" = weakref.WeakKeyDictionary()
+_shared_outside_loop: Dict[Hashable, Any] = {}
+_shared_lock = threading.RLock()
+
+
+def shared(key: Hashable, factory: Callable[[], Any]) -> Any:
+    """
+    The object registered under ``key`` for the running event loop, created
+    by ``factory`` on first use. Used for LLM clients and compiled agent
+    graphs, which every task can reuse.
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    with _shared_lock:
+        objects = _shared_outside_loop if loop is None else _shared.setdefault(loop, {})
+        if key not in objects:
+            objects[key] = factory()
+        return objects[key]
+
+
+def get_llm(model: Optional[str] = None, temperature: Optional[float] = None) -> ChatOpenAI:
+    """
+    The shared client of a model, keeping its HTTP connections alive between
+    calls and tasks. Calls can be answered from the response cache of the
+    run (see `llm_cache.llm_cache_scope`). Requests of every model go through
+    the process's rate limiter, which also retries them (see `llm_limiter`).
+    """
+    settings = get_settings()
+    model = model or settings.openai_model_name
+    temperature = temperature if temperature is not None else settings.openai_temperature
+
+    def factory() -> ChatOpenAI:
+        limits = httpx.Limits(
+            max_connections=settings.openai_max_connections,
+            max_keepalive_connections=settings.openai_max_keepalive_connections,
+            keepalive_expiry=settings.openai_keepalive_expiry,
+        )
+        limit_settings = LLMLimitSettings()
+        transport = RateLimitedTransport(
+            shared(("llm_limiter",), lambda: LLMRateLimiter.from_settings(limit_settings)),
+            httpx.AsyncHTTPTransport(limits=limits),
+            max_retries=limit_settings.llm_limit_max_retries,
+            backoff_base=limit_settings.llm_limit_backoff_base,
+            backoff_max=limit_settings.llm_limit_backoff_max,
+        )
+        return create_llm(
+            model=model,
+            temperature=temperature,
+            cache=ContextLLMCache(),
+            http_async_client=httpx.AsyncClient(transport=transport, timeout=httpx.Timeout(600, connect=5)),
+            # The transport retries, within the rate limits
+            max_retries=0,
+        )
+    return shared(("llm", model, temperature), factory)
@@ -0,0 +1,283 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional, Sequence
+
+from langchain_core.caches import BaseCache
+from langchain_core.messages import messages_from_dict, messages_to_dict
+from langchain_core.outputs import ChatGeneration, Generation
+from loguru import logger
+from pydantic import BaseModel, computed_field
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class LLMCacheSettings(BaseSettings):
+    """
+    LLM response cache configuration settings.
+    Reads from environment variables or .env file.
+    Prefix: LLM_CACHE_
+    """
+    # Whether tasks and testcases that don't choose use the cache
+    llm_cache_default: bool = False
+    llm_cache_path: str = os.path.join("storage", "llm_cache.db")
+    llm_cache_max_entries: int = 10000
+    llm_cache_max_bytes: int = 256 * 1024 * 1024
+    llm_cache_max_age: float = 7 * 24 * 3600  # Seconds; 0 keeps responses until evicted for space
+
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        env_file_encoding="utf-8",
+        extra="ignore"
+    )
+
+
+class CacheStats(BaseModel):
+    hits: int = 0
+    misses: int = 0
+    entries: int = 0
+    size_bytes: int = 0
+    evictions: int = 0  # Entries removed for space or age
+
+    @computed_field
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_used ON responses (used_at);
+CREATE INDEX IF NOT EXISTS idx_responses_created ON responses (created_at);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+# Fields of serialized messages that differ between identical conversations
+VOLATILE_FIELDS = ("id", "response_metadata", "usage_metadata")
+
+
+def _normalize(value: Any) -> Any:
+    """Drop the volatile fields from the constructor kwargs of serialized messages."""
+    if isinstance(value, dict):
+        normalized = {k: _normalize(v) for k, v in value.items()}
+        if value.get("type") == "constructor" and isinstance(normalized.get("kwargs"), dict):
+            normalized["kwargs"] = {k: v for k, v in normalized["kwargs"].items() if k not in VOLATILE_FIELDS}
+        return normalized
+    if isinstance(value, list):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def cache_key(prompt: str, llm_string: str) -> str:
+    """
+    The content address of a chat model call. ``prompt`` is the serialized
+    messages and ``llm_string`` the model, its parameters (temperature, ...)
+    and the bound tool schemas, as LangChain passes them to caches. Message
+    ids and response metadata are left out, so a conversation that repeats
+    an earlier one maps to the same key.
+    """
+    try:
+        prompt = json.dumps(_normalize(json.loads(prompt)), sort_keys=True, separators=(",", ":"))
+    except ValueError:
+        pass
+    return hashlib.sha256(f"{prompt}\0{llm_string}".encode()).hexdigest()
+
+
+class LLMResponseCache(BaseCache):
+    """
+    Chat model responses stored in SQLite by content address (see `cache_key`),
+    shared by every process running tasks. Pass it as the ``cache`` of a chat
+    model: an identical call is then answered from the store without reaching
+    the API.
+
+    Entries older than ``max_age`` are dropped, and the least recently used
+    ones go first when the store outgrows ``max_entries`` or ``max_bytes``.
+    Hits and misses are counted in the store as well.
+    """
+
+    def __init__(self, path: str, max_entries: int = 10000, max_bytes: int = 256 * 1024 * 1024, max_age: float = 0):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    @classmethod
+    def from_settings(cls, settings: Optional[LLMCacheSettings] = None) -> "LLMResponseCache":
+        settings = settings or LLMCacheSettings()
+        return cls(
+            settings.llm_cache_path,
+            max_entries=settings.llm_cache_max_entries,
+            max_bytes=settings.llm_cache_max_bytes,
+            max_age=settings.llm_cache_max_age,
+        )
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        key = cache_key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.max_age and row[1] < now - self.max_age:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._count("evictions")
+                row = None
+            if row is None:
+                self._count("misses")
+                return None
+            self._conn.execute("UPDATE responses SET used_at = ? WHERE key = ?", (now, key))
+            self._count("hits")
+        try:
+            return [ChatGeneration(message=message) for message in messages_from_dict(json.loads(row[0]))]
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable LLM cache entry {key}: {e}")
+            return None
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        if not return_val or not all(isinstance(g, ChatGeneration) for g in return_val):
+            return
+        key = cache_key(prompt, llm_string)
+        value = json.dumps(messages_to_dict([g.message for g in return_val]), ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, size, created_at, used_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, value, len(value.encode()), now, now),
+                )
+                self._evict(now)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _evict(self, now: float) -> None:
+        evicted = 0
+        if self.max_age:
+            evicted += self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.max_age,)).rowcount
+        entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if entries > self.max_entries or size > self.max_bytes:
+            doomed = []
+            for key, entry_size in self._conn.execute("SELECT key, size FROM responses ORDER BY used_at, key"):
+                if entries <= self.max_entries and size <= self.max_bytes:
+                    break
+                doomed.append((key,))
+                entries -= 1
+                size -= entry_size
+            self._conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+            evicted += len(doomed)
+        if evicted:
+            self._count("evictions", evicted)
+
+    def _count(self, name: str, n: int = 1) -> None:
+        self._conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET value = value + excluded.value",
+            (name, n),
+        )
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.execute("DELETE FROM counters")
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            counters: Dict[str, int] = dict(self._conn.execute("SELECT name, value FROM counters").fetchall())
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return CacheStats(entries=entries, size_bytes=size, **counters)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ScopedLLMCache(BaseCache):
+    """A view of a shared cache counting the hits and misses of one run."""
+
+    def __init__(self, cache: BaseCache):
+        self.cache = cache
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        result = self.cache.lookup(prompt, llm_string)
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        self.cache.update(prompt, llm_string, return_val)
+
+    def clear(self, **kwargs: Any) -> None:
+        self.cache.clear(**kwargs)
+
+
+# The cache of the run being executed in this context, if it uses one
+_run_cache: ContextVar[Optional[BaseCache]] = ContextVar("llm_run_cache", default=None)
+
+
+@contextmanager
+def llm_cache_scope(cache: Optional[BaseCache]) -> Iterator[None]:
+    """Answer the LLM calls made within the block from ``cache`` (none if None)."""
+    token = _run_cache.set(cache)
+    try:
+        yield
+    finally:
+        _run_cache.reset(token)
+
+
+class ContextLLMCache(BaseCache):
+    """
+    The cache of shared chat models: delegates to the cache of the current
+    run (see `llm_cache_scope`), so runs can opt in while sharing a client.
+    """
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        cache = _run_cache.get()
+        return cache.lookup(prompt, llm_string) if cache is not None else None
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        cache = _run_cache.get()
+        if cache is not None:
+            cache.update(prompt, llm_string, return_val)
+
+    def clear(self, **kwargs: Any) -> None:
+        cache = _run_cache.get()
+        if cache is not None:
+            cache.clear(**kwargs)
+
+
+def use_llm_cache(requested: Optional[bool], testcase: Optional[Dict[str, Any]] = None) -> bool:
+    """
+    Whether a run uses the LLM cache: as requested for the task, else as its
+    testcase's `llm-cache` says, else the LLM_CACHE_DEFAULT setting.
+    """
+    if requested is not None:
+        return requested
+    opted = (testcase or {}).get("llm-cache")
+    if isinstance(opted, bool):
+        return opted
+    return LLMCacheSettings().llm_cache_default
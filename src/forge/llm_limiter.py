@@ -0,0 +1,303 @@
+import asyncio
+import json
+import random
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Deque, Iterator, Optional, Tuple
+
+import httpx
+from loguru import logger
+from pydantic import BaseModel
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class LLMLimitSettings(BaseSettings):
+    """
+    LLM request limits, shared by every task of a process.
+    Reads from environment variables or .env file.
+    Prefix: LLM_LIMIT_
+    """
+    llm_limit_requests_per_minute: int = 0  # 0 for no limit
+    llm_limit_tokens_per_minute: int = 0  # 0 for no limit
+    llm_limit_max_in_flight: int = 16  # 0 for no limit
+    llm_limit_max_retries: int = 5  # Retries of a request answered with 429 or 5xx
+    llm_limit_backoff_base: float = 1.0  # Seconds, doubled on each retry
+    llm_limit_backoff_max: float = 60.0
+
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        env_file_encoding="utf-8",
+        extra="ignore"
+    )
+
+
+class LLMCallStats(BaseModel):
+    """LLM requests of one run and the time they waited for the limiter."""
+    calls: int = 0
+    retries: int = 0
+    wait_seconds: float = 0.0  # Total time queued in the limiter
+    max_wait_seconds: float = 0.0
+
+
+# The run making LLM requests in this context, and its stats
+_run: ContextVar[Tuple[str, Optional[LLMCallStats]]] = ContextVar("llm_run", default=("", None))
+
+
+@contextmanager
+def llm_run_scope(run_id: str, stats: Optional[LLMCallStats] = None) -> Iterator[None]:
+    """
+    Queue the LLM requests made within the block as ``run_id``'s, which the
+    limiter serves in turn with other runs', and count them in ``stats``.
+    """
+    token = _run.set((run_id, stats))
+    try:
+        yield
+    finally:
+        _run.reset(token)
+
+
+class TokenBucket:
+    """Refills ``per_minute`` units a minute, holding at most a minute's worth."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount: float, now: float) -> float:
+        """Seconds until ``amount`` units are available."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float, now: float) -> None:
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+
+    def adjust(self, amount: float) -> None:
+        """Give back units taken in excess, or take more (the level may go negative)."""
+        self.level = min(self.capacity, self.level + amount)
+
+
+class LLMRateLimiter:
+    """
+    Admits LLM requests within requests and tokens per minute and a cap on
+    requests in flight. Waiting requests are queued per run and runs are
+    served in turn, so a task sending many requests doesn't hold up the rest.
+    """
+
+    def __init__(self, requests_per_minute: int = 0, tokens_per_minute: int = 0, max_in_flight: int = 0):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self._queues: "OrderedDict[str, Deque[Tuple[asyncio.Future, float]]]" = OrderedDict()
+        self._paused_until = 0.0
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    @classmethod
+    def from_settings(cls, settings: Optional[LLMLimitSettings] = None) -> "LLMRateLimiter":
+        settings = settings or LLMLimitSettings()
+        return cls(
+            requests_per_minute=settings.llm_limit_requests_per_minute,
+            tokens_per_minute=settings.llm_limit_tokens_per_minute,
+            max_in_flight=settings.llm_limit_max_in_flight,
+        )
+
+    @property
+    def queued(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    async def acquire(self, run_id: str, tokens: float) -> float:
+        """Wait for a request of about ``tokens`` tokens to be admitted; returns the time waited."""
+        started = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(run_id, deque()).append((future, tokens))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Admitted just as the wait was cancelled
+                self.release(tokens, tokens)
+            raise
+        return time.monotonic() - started
+
+    def release(self, estimated: float, used: Optional[float] = None) -> None:
+        """A request finished; ``used`` corrects the tokens taken for it."""
+        self.in_flight -= 1
+        if self.tokens is not None and used is not None:
+            self.tokens.adjust(estimated - used)
+        self._dispatch()
+
+    def pause(self, seconds: float) -> None:
+        """Admit nothing for a while, e.g. when the provider asks to retry later."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        while self._queues and (not self.max_in_flight or self.in_flight < self.max_in_flight):
+            run_id, queue = next(iter(self._queues.items()))
+            future, tokens = queue[0]
+            if future.done():  # Cancelled while queued
+                self._pop(run_id)
+                continue
+            now = time.monotonic()
+            delay = max(
+                self._paused_until - now,
+                self.requests.delay(1, now) if self.requests else 0.0,
+                self.tokens.delay(tokens, now) if self.tokens else 0.0,
+            )
+            if delay > 0:
+                self._wake_in(delay)
+                return
+            if self.requests:
+                self.requests.take(1, now)
+            if self.tokens:
+                self.tokens.take(tokens, now)
+            self.in_flight += 1
+            self._pop(run_id)
+            future.set_result(None)
+
+    def _pop(self, run_id: str) -> None:
+        """Remove the head of a run's queue and move the run to the back of the line."""
+        queue = self._queues.pop(run_id)
+        queue.popleft()
+        if queue:
+            self._queues[run_id] = queue
+
+    def _wake_in(self, delay: float) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+
+        def wake():
+            self._timer = None
+            self._dispatch()
+        self._timer = asyncio.get_running_loop().call_later(delay, wake)
+
+
+def estimate_tokens(request: httpx.Request) -> float:
+    """A rough token count of a chat request: its prompt plus the completion it allows."""
+    content = request.content or b""
+    tokens = len(content) / 4
+    try:
+        body = json.loads(content)
+        tokens += body.get("max_completion_tokens") or body.get("max_tokens") or 0
+    except (ValueError, AttributeError):
+        pass
+    return tokens
+
+
+def retry_after(response: httpx.Response) -> Optional[float]:
+    """The delay a response asks for before retrying, in seconds."""
+    if "retry-after-ms" in response.headers:
+        try:
+            return float(response.headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+async def _used_tokens(response: httpx.Response) -> Optional[float]:
+    if not response.headers.get("content-type", "").startswith("application/json"):
+        return None
+    try:
+        await response.aread()
+        return float(response.json()["usage"]["total_tokens"])
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+class RateLimitedTransport(httpx.AsyncBaseTransport):
+    """
+    Sends requests once the limiter admits them, retrying those answered with
+    429 or 5xx (or not answered) after the Retry-After delay or a jittered
+    exponential backoff. A 429 also holds back every other request for its
+    delay, as the limit it hit is shared.
+    """
+
+    def __init__(
+        self,
+        limiter: LLMRateLimiter,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        max_retries: int = 5,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+    ):
+        self.limiter = limiter
+        self.transport = transport or httpx.AsyncHTTPTransport()
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        run_id, stats = _run.get()
+        tokens = estimate_tokens(request)
+        attempt = 0
+        while True:
+            waited = await self.limiter.acquire(run_id, tokens)
+            if stats is not None:
+                stats.calls += 1
+                stats.wait_seconds += waited
+                stats.max_wait_seconds = max(stats.max_wait_seconds, waited)
+            if waited >= 1:
+                logger.debug(f"LLM request of {run_id or 'unknown run'} waited {waited:.2f}s in queue")
+            # Tokens the attempt used: none if it failed, unknown (the estimate stands) if it was cut short
+            used: Optional[float] = None
+            try:
+                try:
+                    response = await self.transport.handle_async_request(request)
+                except httpx.TransportError as e:
+                    # Failed requests don't count against the provider's token limit
+                    used = 0
+                    if attempt >= self.max_retries:
+                        raise
+                    delay = self._backoff(attempt)
+                    logger.warning(f"LLM request failed ({e!r}), retrying in {delay:.1f}s")
+                else:
+                    status = response.status_code
+                    if (status == 429 or status >= 500) and attempt < self.max_retries:
+                        used = 0
+                        delay = retry_after(response)
+                        if delay is None:
+                            delay = self._backoff(attempt)
+                        else:
+                            delay = min(delay, self.backoff_max) + random.uniform(0, self.backoff_base)
+                        if status == 429:
+                            self.limiter.pause(delay)
+                        logger.warning(f"LLM request answered {status}, retrying in {delay:.1f}s")
+                        await response.aclose()
+                    else:
+                        used = await _used_tokens(response)
+                        return response
+            finally:
+                # The slot is given back however the attempt ended, cancellation included
+                self.limiter.release(tokens, used)
+            attempt += 1
+            if stats is not None:
+                stats.retries += 1
+            await asyncio.sleep(delay)
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
@@ -1,9 +1,118 @@
+import argparse
+import multiprocessing
+import sys
+
 import uvicorn
-from forge.api import app
 
-def main():
+
+def serve(host: str = "0.0.0.0", port: int = 8000):
+    from forge.api import app
+
     print("Starting TestForge API Server...")
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    uvicorn.run(app, host=host, port=port)
+
+
+def worker(processes: int = 1, concurrency: int = None):
+    from forge.worker import run_worker
+
+    if processes <= 1:
+        run_worker(concurrency)
+        return
+    # Separate processes, so runs use every core
+    ctx = multiprocessing.get_context("spawn")
+    children = [ctx.Process(target=run_worker, args=(concurrency,)) for _ in range(processes)]
+    for child in children:
+        child.start()
+    try:
+        for child in children:
+            child.join()
+    except KeyboardInterrupt:
+        # Children got the signal too and finish their runs
+        for child in children:
+            child.join()
+
+
+def run(
+    paths, parallel: int = 1, reports=None, backend: str = "jupyter", notebooks: str = None, replay: bool = True,
+    llm_cache: bool = None,
+) -> int:
+    from forge.batch import run_batch
+    from forge.runtime.interface import KernelBackend
+
+    return run_batch(
+        paths, parallel=parallel, reports=reports, backend=KernelBackend(backend), notebook_dir=notebooks,
+        replay=replay, llm_cache=llm_cache,
+    )
+
+
+def export(notebook: str, testcase: str = None, output: str = None) -> int:
+    import nbformat
+    from forge.export import export_pytest
+
+    with open(notebook, "r", encoding="utf-8") as f:
+        nb = nbformat.read(f, as_version=4)
+    testcase_yaml = None
+    if testcase:
+        with open(testcase, "r", encoding="utf-8") as f:
+            testcase_yaml = f.read()
+    try:
+        source = export_pytest(nb, testcase_yaml)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(source)
+    else:
+        print(source, end="")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="forge", description="TestForge autonomous testing agent")
+    commands = parser.add_subparsers(dest="command")
+
+    serve_parser = commands.add_parser("serve", help="Run the API server (default)")
+    serve_parser.add_argument("--host", default="0.0.0.0")
+    serve_parser.add_argument("--port", type=int, default=8000)
+
+    worker_parser = commands.add_parser("worker", help="Execute queued task runs (needs WORKER_QUEUE_ENABLED)")
+    worker_parser.add_argument("-p", "--processes", type=int, default=1, help="Worker processes to start")
+    worker_parser.add_argument("-c", "--concurrency", type=int, default=None, help="Runs per process (default: WORKER_CONCURRENCY)")
+
+    run_parser = commands.add_parser("run", help="Run testcases without the API server and report the results")
+    run_parser.add_argument("paths", nargs="+", help="Testcase files, or directories to run every testcase under")
+    run_parser.add_argument("-n", "--parallel", type=int, default=1, help="Testcases to run at once")
+    run_parser.add_argument(
+        "--report", action="append", default=[], metavar="PATH",
+        help="Write a JUnit XML (.xml) or JSON (.json) report; may be repeated",
+    )
+    run_parser.add_argument("--backend", choices=["jupyter", "inprocess"], default="jupyter", help="Where cells are executed")
+    run_parser.add_argument("--notebooks", metavar="DIR", help="Save the notebook of each run to DIR")
+    run_parser.add_argument("--no-replay", action="store_true", help="Run every step through the LLM agent")
+    run_parser.add_argument(
+        "--llm-cache", action=argparse.BooleanOptionalAction, default=None,
+        help="Answer repeated LLM calls from the response cache (default: as each testcase's llm-cache says)",
+    )
+
+    export_parser = commands.add_parser("export", help="Export the notebook of a run as a standalone pytest file")
+    export_parser.add_argument("notebook", help="A notebook saved by `forge run --notebooks`")
+    export_parser.add_argument("--testcase", help="The testcase of the run, if the notebook doesn't record it")
+    export_parser.add_argument("-o", "--output", help="File to write (default: standard output)")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        if args.parallel < 1:
+            run_parser.error("--parallel must be at least 1")
+        sys.exit(run(args.paths, args.parallel, args.report, args.backend, args.notebooks, not args.no_replay, args.llm_cache))
+    elif args.command == "export":
+        sys.exit(export(args.notebook, args.testcase, args.output))
+    elif args.command == "worker":
+        worker(args.processes, args.concurrency)
+    elif args.command == "serve":
+        serve(args.host, args.port)
+    else:
+        serve()
 
 if __name__ == "__main__":
     main()
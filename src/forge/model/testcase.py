@@ -2,6 +2,9 @@ from typing import List, Optional, Dict, Any, Union, Literal
 from pydantic import BaseModel, Field
 from enum import Enum
 
+# Used when a testcase's test-env has no base_url
+DEFAULT_BASE_URL = "https://www.baidu.com"
+
 class BrowserType(str, Enum):
     CHROMIUM = "chromium"
     FIREFOX = "firefox"
@@ -22,6 +25,11 @@ class Step(BaseModel):
     id: Union[int, str]
     type: StepType
     content: str
+    # A model tier (`small`, `large`) or model name to run the step on, instead of the one of its type
+    model: Optional[str] = None
+    # Checks verifying the step directly, without the LLM, e.g. `{title_contains: Playwright}`
+    # (see `agent.verification.parse_assert_block`)
+    assert_: Optional[Union[Dict[str, Any], List[Dict[str, Any]]]] = Field(None, alias="assert")
 
 class TestCase(BaseModel):
     name: str
@@ -29,3 +37,13 @@ class TestCase(BaseModel):
     version: str = "1.0"
     test_env: TestEnv = Field(alias="test-env")
     steps: List[Step]
+    # Answer repeated LLM calls from the response cache
+    llm_cache: Optional[bool] = Field(None, alias="llm-cache")
+
+
+def agent_steps(testcase: Dict[str, Any]) -> List[str]:
+    """The steps of a parsed testcase as given to the agent, with its description as context."""
+    steps = [step["content"] for step in testcase.get("steps", [])]
+    if steps:
+        steps[0] = f"Context: {testcase.get('description', '')}\nStep 1: {steps[0]}"
+    return steps
@@ -0,0 +1,337 @@
+import itertools
+import os
+import select
+import socket
+import subprocess
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+from loguru import logger
+from pydantic import BaseModel
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from ..model.testcase import BrowserType
+
+
+class BrowserPoolSettings(BaseSettings):
+    """
+    Browser pool configuration settings.
+    Reads from environment variables or .env file.
+    Prefix: BROWSER_POOL_
+    """
+    browser_pool_enabled: bool = False
+    browser_pool_size: int = 2
+    browser_pool_max_contexts: int = 50
+    browser_pool_headless: bool = True
+    browser_pool_health_interval: float = 30.0
+
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        env_file_encoding="utf-8",
+        extra="ignore"
+    )
+
+
+# Runs a Playwright browser server with the Node driver bundled in the Python package.
+# The server is closed when our end of stdin is closed, so it never outlives us.
+_LAUNCH_SERVER_SCRIPT = """
+const playwright = require(process.argv[1]);
+playwright[process.argv[2]].launchServer({ headless: process.argv[3] === "true" }).then((server) => {
+    console.log(server.wsEndpoint());
+    process.stdin.on("end", () => server.close().then(() => process.exit(0)));
+    process.stdin.resume();
+}, (error) => {
+    console.error(error.message);
+    process.exit(1);
+});
+"""
+
+
+class BrowserServer:
+    """
+    A Playwright browser server process (``launchServer``) that kernels
+    attach to with ``browser_type.connect(ws_endpoint)``.
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, browser: BrowserType = BrowserType.CHROMIUM, headless: bool = True, startup_timeout: float = 30):
+        self.id = f"{browser.value}-{next(self._ids)}"
+        self.browser = browser
+        self.headless = headless
+        self.startup_timeout = startup_timeout
+        self.ws_endpoint: Optional[str] = None
+        self._process: Optional[subprocess.Popen] = None
+
+    def start(self) -> None:
+        """Launch the browser server and wait for its WebSocket endpoint."""
+        if self._process is not None:
+            return  # Already started
+
+        from playwright._impl._driver import compute_driver_executable
+        node, cli = compute_driver_executable()
+        package = os.path.dirname(str(cli))
+
+        self._process = subprocess.Popen(
+            [node, "-e", _LAUNCH_SERVER_SCRIPT, package, self.browser.value, str(self.headless).lower()],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+
+        ready, _, _ = select.select([self._process.stdout], [], [], self.startup_timeout)
+        line = self._process.stdout.readline().strip() if ready else ""
+        if not line.startswith("ws"):
+            error = "timed out"
+            if ready:
+                # stdout was closed, the process is exiting
+                self._process.wait(timeout=10)
+                error = self._process.stderr.read().strip()
+            self.stop()
+            raise RuntimeError(f"Browser server {self.id} failed to start: {error}")
+
+        self.ws_endpoint = line
+        # Keep reading what the server prints, or it blocks once a pipe fills up
+        for stream in (self._process.stdout, self._process.stderr):
+            threading.Thread(target=self._drain, args=(stream,), daemon=True).start()
+
+    def _drain(self, stream) -> None:
+        """Log a server's output until it exits."""
+        try:
+            for line in stream:
+                logger.debug(f"Browser server {self.id}: {line.rstrip()}")
+        except (OSError, ValueError):
+            pass  # Closed with the process
+
+    def stop(self) -> None:
+        """Close the browser server."""
+        if not self._process:
+            return
+
+        process, self._process = self._process, None
+        try:
+            process.stdin.close()
+            process.wait(timeout=10)
+        except Exception:
+            process.kill()
+            process.wait()
+        self.ws_endpoint = None
+
+    def is_alive(self) -> bool:
+        """Check the server process is running and accepts connections."""
+        if not self._process or self._process.poll() is not None or not self.ws_endpoint:
+            return False
+
+        endpoint = urlparse(self.ws_endpoint)
+        try:
+            with socket.create_connection((endpoint.hostname, endpoint.port), timeout=2):
+                return True
+        except OSError:
+            return False
+
+
+class BrowserLease(BaseModel):
+    """A browser server handed out to a task, to be released when it's done."""
+    server_id: str
+    browser: BrowserType
+    ws_endpoint: str
+
+
+class _PooledServer:
+    def __init__(self, server: BrowserServer):
+        self.server = server
+        self.active = 0
+        self.served = 0
+
+
+class BrowserPool:
+    """
+    A small set of shared browser servers per browser type.
+
+    Tasks lease a server's ``ws_endpoint`` and create their own isolated
+    BrowserContext on it, so the number of browser processes depends on ``size``
+    rather than on the number of running tasks. A server that has served
+    ``max_contexts`` leases is drained and replaced, and a background thread
+    replaces servers that fail their health check.
+    """
+
+    def __init__(
+        self,
+        size: int = 2,
+        max_contexts: int = 50,
+        headless: bool = True,
+        health_interval: float = 30.0,
+        server_factory: Callable[[BrowserType, bool], BrowserServer] = BrowserServer,
+    ):
+        if size < 1:
+            raise ValueError("Browser pool requires size >= 1.")
+
+        self.size = size
+        self.max_contexts = max_contexts
+        self.headless = headless
+        self.health_interval = health_interval
+        self.server_factory = server_factory
+
+        self._servers: Dict[BrowserType, List[_PooledServer]] = {}
+        self._retired: List[_PooledServer] = []
+        self._closed = False
+        self._cond = threading.Condition()
+        self._worker: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_settings(cls, settings: Optional[BrowserPoolSettings] = None) -> Optional["BrowserPool"]:
+        """Create a pool configured from settings. Returns None if the pool is disabled."""
+        settings = settings or BrowserPoolSettings()
+        if not settings.browser_pool_enabled:
+            return None
+        return cls(
+            size=settings.browser_pool_size,
+            max_contexts=settings.browser_pool_max_contexts,
+            headless=settings.browser_pool_headless,
+            health_interval=settings.browser_pool_health_interval,
+        )
+
+    def start(self, browsers: Optional[List[BrowserType]] = None) -> None:
+        """Launch the servers for the given browser types and start health checks."""
+        for browser in browsers or [BrowserType.CHROMIUM]:
+            self._fill(browser)
+
+        with self._cond:
+            if self._worker is not None:
+                return  # Already started
+            self._closed = False
+            self._worker = threading.Thread(target=self._run, name="browser-pool", daemon=True)
+            self._worker.start()
+
+    def close(self) -> None:
+        """Stop health checks and close every server."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            worker, self._worker = self._worker, None
+
+        if worker is not None:
+            worker.join()
+
+        with self._cond:
+            servers = [p for pooled in self._servers.values() for p in pooled] + self._retired
+            self._servers.clear()
+            self._retired.clear()
+
+        for pooled in servers:
+            pooled.server.stop()
+
+    def server_count(self, browser: BrowserType) -> int:
+        """Number of servers currently accepting leases for a browser type."""
+        with self._cond:
+            return len(self._servers.get(browser, []))
+
+    def acquire(self, browser: BrowserType = BrowserType.CHROMIUM) -> BrowserLease:
+        """Lease the least loaded server for a browser type."""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Browser pool is closed.")
+            has_servers = bool(self._servers.get(browser))
+
+        if not has_servers:
+            # First lease for this browser type, launch its servers
+            self._fill(browser)
+
+        with self._cond:
+            candidates = self._servers.get(browser)
+            if not candidates:
+                raise RuntimeError(f"No {browser.value} browser server available.")
+
+            pooled = min(candidates, key=lambda p: p.active)
+            pooled.active += 1
+            pooled.served += 1
+            if pooled.served >= self.max_contexts:
+                # Stop handing it out; it is replaced once its leases are released
+                self._retire(browser, pooled)
+
+            return BrowserLease(
+                server_id=pooled.server.id,
+                browser=browser,
+                ws_endpoint=pooled.server.ws_endpoint,
+            )
+
+    def release(self, lease: BrowserLease) -> None:
+        """Return a lease. Drained servers are closed once their last lease is released."""
+        with self._cond:
+            for pooled in self._servers.get(lease.browser, []) + self._retired:
+                if pooled.server.id == lease.server_id:
+                    pooled.active = max(0, pooled.active - 1)
+                    break
+            self._cond.notify_all()
+
+    def _retire(self, browser: BrowserType, pooled: _PooledServer) -> None:
+        self._servers[browser].remove(pooled)
+        self._retired.append(pooled)
+        self._cond.notify_all()
+
+    def _fill(self, browser: BrowserType) -> None:
+        """Launch servers until the browser type has ``size`` of them."""
+        while True:
+            with self._cond:
+                if self._closed or len(self._servers.setdefault(browser, [])) >= self.size:
+                    return
+
+            server = self.server_factory(browser, self.headless)
+            server.start()
+            logger.info(f"Browser server {server.id} listening on {server.ws_endpoint}")
+
+            with self._cond:
+                if self._closed or len(self._servers[browser]) >= self.size:
+                    surplus = server
+                else:
+                    self._servers[browser].append(_PooledServer(server))
+                    surplus = None
+
+            if surplus is not None:
+                surplus.stop()
+                return
+
+    def _run(self) -> None:
+        last_check = time.monotonic()
+        while True:
+            with self._cond:
+                # Woken up early when a lease is released or a server is retired
+                self._cond.wait(timeout=self.health_interval)
+                if self._closed:
+                    return
+                browsers = list(self._servers)
+
+            if time.monotonic() - last_check >= self.health_interval:
+                self._check_health()
+                last_check = time.monotonic()
+            self._close_drained()
+            for browser in browsers:
+                try:
+                    self._fill(browser)
+                except Exception as e:
+                    logger.error(f"Browser pool failed to launch a {browser.value} server: {e}")
+
+    def _check_health(self) -> None:
+        with self._cond:
+            servers = [(b, p) for b, pooled in self._servers.items() for p in pooled]
+
+        for browser, pooled in servers:
+            if pooled.server.is_alive():
+                continue
+            logger.warning(f"Browser server {pooled.server.id} failed its health check, replacing it.")
+            with self._cond:
+                if pooled in self._servers.get(browser, []):
+                    self._servers[browser].remove(pooled)
+            pooled.server.stop()
+
+    def _close_drained(self) -> None:
+        with self._cond:
+            drained = [p for p in self._retired if p.active == 0]
+            self._retired = [p for p in self._retired if p.active > 0]
+
+        for pooled in drained:
+            logger.info(f"Recycling browser server {pooled.server.id} after {pooled.served} contexts.")
+            pooled.server.stop()
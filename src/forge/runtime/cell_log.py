@@ -0,0 +1,84 @@
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+
+def output_size(output: Dict[str, Any]) -> int:
+    """Approximate in-memory size of an output, as its JSON-encoded length in bytes."""
+    return len(json.dumps(output, ensure_ascii=False, default=str).encode("utf-8"))
+
+
+def _truncate_text(text: str, limit: int) -> str:
+    """Keep the head and the tail of a text, dropping the middle."""
+    if len(text) <= limit:
+        return text
+    head = limit // 2
+    tail = limit - head
+    return f"{text[:head]}\n... [{len(text) - limit} characters truncated] ...\n{text[-tail:]}"
+
+
+def truncate_output(output: Dict[str, Any], limit: int) -> Dict[str, Any]:
+    """
+    Return a copy of an output whose text fields are cut down to about ``limit``
+    characters (head and tail kept). Binary data such as images is dropped.
+    """
+    output = dict(output)
+    output_type = output.get("output_type")
+
+    if output_type == "stream":
+        output["text"] = _truncate_text(output.get("text", ""), limit)
+
+    elif output_type in ("execute_result", "display_data"):
+        data = {}
+        for mime, value in output.get("data", {}).items():
+            if isinstance(value, str) and mime.startswith("text/"):
+                data[mime] = _truncate_text(value, limit)
+        if not data:
+            data["text/plain"] = "[binary output truncated]"
+        output["data"] = data
+
+    elif output_type == "error":
+        output["evalue"] = _truncate_text(output.get("evalue", ""), limit)
+        traceback: List[str] = output.get("traceback", [])
+        # The end of a traceback is where the error is
+        output["traceback"] = [_truncate_text(line, limit) for line in traceback[-5:]]
+
+    return output
+
+
+class CellLog:
+    """
+    Append-only on-disk log of cell outputs, one JSON record per line.
+    Outputs dropped from memory are written here and can be fetched back by cell id.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        # Byte offset of the latest record of each cell
+        self._offsets: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def append(self, cell_id: str, outputs: List[Dict[str, Any]]) -> None:
+        """Write the full outputs of a cell."""
+        record = json.dumps({"cell_id": cell_id, "outputs": outputs}, ensure_ascii=False, default=str)
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, "ab") as f:
+                offset = f.tell()
+                f.write(record.encode("utf-8") + b"\n")
+            self._offsets[cell_id] = offset
+
+    def get(self, cell_id: str) -> Optional[List[Dict[str, Any]]]:
+        """Read the full outputs of a cell, or None if it was never logged."""
+        with self._lock:
+            offset = self._offsets.get(cell_id)
+            if offset is None:
+                return None
+            with open(self.path, "rb") as f:
+                f.seek(offset)
+                line = f.readline()
+        return json.loads(line)["outputs"]
+
+    def __contains__(self, cell_id: str) -> bool:
+        return cell_id in self._offsets
@@ -0,0 +1,210 @@
+import asyncio
+import builtins
+import contextvars
+import io
+import sys
+import traceback
+from typing import Any, Callable, Dict, List, Optional
+
+from jupyter_client.utils import run_sync
+
+from .interface import ExecutionResult, Kernel, OutputCallback, append_output
+
+
+# Receives (stream name, text) for writes made by the execution running in the current context
+_current_stream: contextvars.ContextVar[Optional[Callable[[str, str], None]]] = contextvars.ContextVar(
+    "forge_inprocess_stream", default=None
+)
+
+
+class _StreamProxy(io.TextIOBase):
+    """
+    Replaces sys.stdout/sys.stderr so that writes made while an in-process
+    execution is running are captured for that execution only, even when
+    several executions interleave on the same event loop.
+    """
+
+    def __init__(self, name: str, original: Any):
+        self._name = name
+        self._original = original
+
+    def write(self, text: str) -> int:
+        emit = _current_stream.get()
+        if emit is None:
+            return self._original.write(text)
+        emit(self._name, text)
+        return len(text)
+
+    def flush(self) -> None:
+        if _current_stream.get() is None:
+            self._original.flush()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._original, name)
+
+
+def _install_stream_proxies() -> None:
+    if not isinstance(sys.stdout, _StreamProxy):
+        sys.stdout = _StreamProxy("stdout", sys.stdout)
+    if not isinstance(sys.stderr, _StreamProxy):
+        sys.stderr = _StreamProxy("stderr", sys.stderr)
+
+
+async def run_cell(code: str, namespace: Dict[str, Any], filename: str) -> Any:
+    """
+    Run a cell in the given namespace, with top-level await support.
+    Like IPython, returns the value of a trailing expression (None otherwise).
+    NOTE: This function is also sent to Jupyter kernels as source, keep it self-contained.
+    """
+    import ast
+    import inspect
+
+    flags = ast.PyCF_ALLOW_TOP_LEVEL_AWAIT
+    tree = ast.parse(code, filename=filename)
+
+    last_expr = None
+    if tree.body and isinstance(tree.body[-1], ast.Expr):
+        last_expr = ast.Expression(tree.body.pop().value)
+
+    result = eval(compile(tree, filename, "exec", flags=flags), namespace)
+    if inspect.iscoroutine(result):
+        await result
+
+    if last_expr is None:
+        return None
+    value = eval(compile(last_expr, filename, "eval", flags=flags), namespace)
+    if inspect.iscoroutine(value):
+        value = await value
+    return value
+
+
+class InProcessKernel(Kernel):
+    """
+    A Kernel that runs code on the caller's event loop, in a private namespace,
+    without a kernel process or ZeroMQ round trips.
+
+    Top-level await is supported and outputs follow the same nbformat shapes as
+    JupyterKernel (stream, execute_result, error). Code is not isolated from the
+    server process: blocking calls block the event loop, so this backend is only
+    meant for trusted, internally authored test suites.
+    """
+
+    def __init__(self, timeout: Optional[float] = None):
+        # Default wall-clock deadline for a whole execution, in seconds (None = no limit)
+        self.timeout = timeout
+        self.namespace: Optional[Dict[str, Any]] = None
+        self._execution_count = 0
+        self._running: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Create the execution namespace."""
+        if self.namespace is not None:
+            return  # Already started
+        self.namespace = {"__name__": "__main__", "__builtins__": builtins}
+        self._execution_count = 0
+
+    def stop(self) -> None:
+        """Cancel any running execution and drop the namespace."""
+        self.interrupt()
+        self.namespace = None
+
+    def interrupt(self) -> None:
+        """Cancel the code currently running."""
+        if self._running and not self._running.done():
+            self._running.get_loop().call_soon_threadsafe(self._running.cancel)
+
+    def execute(
+        self,
+        code: str,
+        on_output: Optional[OutputCallback] = None,
+        timeout: Optional[float] = None,
+    ) -> ExecutionResult:
+        """
+        Execute code synchronously.
+        NOTE: This blocks until execution finishes.
+        """
+        return run_sync(self.aexecute)(code, on_output, timeout)
+
+    async def aexecute(
+        self,
+        code: str,
+        on_output: Optional[OutputCallback] = None,
+        timeout: Optional[float] = None,
+    ) -> ExecutionResult:
+        """Execute a code snippet and return the result asynchronously."""
+        if self.namespace is None:
+            raise RuntimeError("Kernel is not running. Call start() first.")
+
+        outputs: List[Dict[str, Any]] = []
+
+        def _emit(output: Dict[str, Any]) -> None:
+            if on_output:
+                on_output(dict(output))
+            append_output(outputs, output)
+
+        def _emit_stream(name: str, text: str) -> None:
+            _emit({"output_type": "stream", "name": name, "text": text})
+
+        _install_stream_proxies()
+        self._execution_count += 1
+        timeout = self.timeout if timeout is None else timeout
+
+        # The task runs in a copy of the current context, so the stream
+        # redirection only applies to this execution.
+        context = contextvars.copy_context()
+        context.run(_current_stream.set, _emit_stream)
+        task = asyncio.get_running_loop().create_task(
+            self._run(code, self._execution_count, _emit), context=context
+        )
+        self._running = task
+
+        try:
+            done, _ = await asyncio.wait({task}, timeout=timeout or None)
+            if not done:
+                _emit({
+                    "output_type": "error",
+                    "ename": "TimeoutError",
+                    "evalue": f"Execution exceeded the {timeout:g}s deadline, execution cancelled",
+                    "traceback": []
+                })
+                task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            if task.cancelled() and done:
+                _emit({
+                    "output_type": "error",
+                    "ename": "KeyboardInterrupt",
+                    "evalue": "Execution interrupted",
+                    "traceback": []
+                })
+        finally:
+            self._running = None
+
+        return ExecutionResult(outputs=outputs)
+
+    async def _run(self, code: str, execution_count: int, emit: Callable[[Dict[str, Any]], None]) -> None:
+        try:
+            value = await run_cell(code, self.namespace, f"<cell-{execution_count}>")
+            if value is not None:
+                self.namespace["_"] = value
+                emit({
+                    "output_type": "execute_result",
+                    "data": {"text/plain": repr(value)},
+                    "execution_count": execution_count,
+                    "metadata": {}
+                })
+
+        except asyncio.CancelledError:
+            raise
+        except BaseException as e:
+            # SystemExit and KeyboardInterrupt from a cell must not stop the host's
+            # event loop; like in a Jupyter kernel, they only fail the cell.
+            # Drop our frames from the traceback, the user only cares about their cell
+            tb = e.__traceback__
+            while tb is not None and tb.tb_frame.f_code.co_filename == __file__:
+                tb = tb.tb_next
+            emit({
+                "output_type": "error",
+                "ename": type(e).__name__,
+                "evalue": str(e),
+                "traceback": traceback.format_exception(type(e), e, tb)
+            })
@@ -1,7 +1,33 @@
-from typing import Any, Dict, List, Optional, Protocol, runtime_checkable
+from typing import Any, Callable, Dict, List, Optional, Protocol, runtime_checkable
 from enum import Enum
 from pydantic import BaseModel, Field
 
+# Called with each nbformat output dict as soon as the kernel produces it
+OutputCallback = Callable[[Dict[str, Any]], None]
+
+# Called with an event type (cell_started, cell_output, cell_finished) and its data
+SessionEventCallback = Callable[[str, Dict[str, Any]], None]
+
+
+def append_output(outputs: List[Dict[str, Any]], output: Dict[str, Any]) -> None:
+    """
+    Append an output to a list of nbformat outputs, merging consecutive
+    chunks of the same stream into a single output.
+    """
+    if output.get("output_type") == "stream" and outputs:
+        last = outputs[-1]
+        if last.get("output_type") == "stream" and last.get("name") == output.get("name"):
+            last["text"] += output["text"]
+            return
+    outputs.append(output)
+
+
+class KernelBackend(str, Enum):
+    """Which Kernel implementation a session runs its cells on."""
+    JUPYTER = "jupyter"
+    SHARED = "shared"  # A namespace in a Jupyter kernel shared with other sessions
+    INPROCESS = "inprocess"
+
 class CellStatus(str, Enum):
     PENDING = "pending"
     RUNNING = "running"
@@ -14,9 +40,13 @@ class Cell(BaseModel):
     status: CellStatus
     outputs: List[Dict[str, Any]] = Field(default_factory=list)
     execution_count: Optional[int] = None
+    truncated: bool = False  # Full outputs are available from the session's cell log
+    revision: int = 0  # Notebook version at which the cell last changed
 
 class NotebookState(BaseModel):
     cells: List[Cell]
+    # Monotonically increasing version of the notebook, usable as a `since` cursor
+    version: int = 0
     # potentially other session metadata
 
 class ExecutionResult(BaseModel):
@@ -78,12 +108,36 @@ class Kernel(Protocol):
         """Stop the kernel process."""
         ...
 
-    def execute(self, code: str) -> ExecutionResult:
-        """Execute a code snippet and return the result synchronously."""
+    def interrupt(self) -> None:
+        """Interrupt the code currently running in the kernel."""
+        ...
+
+    def execute(
+        self,
+        code: str,
+        on_output: Optional[OutputCallback] = None,
+        timeout: Optional[float] = None,
+    ) -> ExecutionResult:
+        """
+        Execute a code snippet and return the result synchronously.
+        ``on_output`` is called with each output as it is produced.
+        ``timeout`` is a wall-clock deadline in seconds for the whole execution;
+        when it expires the kernel is interrupted.
+        """
         ...
 
-    async def aexecute(self, code: str) -> ExecutionResult:
-        """Execute a code snippet and return the result asynchronously."""
+    async def aexecute(
+        self,
+        code: str,
+        on_output: Optional[OutputCallback] = None,
+        timeout: Optional[float] = None,
+    ) -> ExecutionResult:
+        """
+        Execute a code snippet and return the result asynchronously.
+        ``on_output`` is called with each output as it is produced.
+        ``timeout`` is a wall-clock deadline in seconds for the whole execution;
+        when it expires the kernel is interrupted.
+        """
         ...
 
 @runtime_checkable
@@ -98,16 +152,34 @@ class NotebookSession(Protocol):
         """Stop the session and the underlying kernel."""
         ...
 
-    async def add_cell(self, code: str) -> ExecutionResult:
-        """Add a cell, execute it, and record the result asynchronously."""
+    async def add_cell(
+        self,
+        code: str,
+        on_output: Optional[OutputCallback] = None,
+        timeout: Optional[float] = None,
+        internal: bool = False,
+    ) -> ExecutionResult:
+        """
+        Add a cell, execute it, and record the result asynchronously.
+        Outputs are appended to the cell (and passed to ``on_output``) as they arrive.
+        ``timeout`` overrides the session's default per-cell deadline in seconds.
+        ``internal`` marks tool cells whose outputs only need to be kept as a summary.
+        """
+        ...
+
+    def get_cell_outputs(self, cell_id: str) -> Optional[List[Dict[str, Any]]]:
+        """Return the full, untruncated outputs of a cell."""
         ...
 
     def get_notebook_json(self) -> Dict[str, Any]:
         """Return the current state of the notebook in nbformat JSON."""
         ...
 
-    def get_state(self) -> NotebookState:
-        """Return the current state of the notebook for UI rendering."""
+    def get_state(self, since: Optional[int] = None) -> NotebookState:
+        """
+        Return the current state of the notebook for UI rendering.
+        With ``since``, only cells changed after that version are returned.
+        """
         ...
 
     def save(self, path: str) -> None:
@@ -1,10 +1,90 @@
 import asyncio
 import queue
 import time
-from typing import Any, Dict, Optional, List
-from jupyter_client.manager import KernelManager
+from typing import Any, AsyncIterator, Callable, Dict, Optional, List
+from jupyter_client.manager import KernelManager, AsyncKernelManager
 from jupyter_client.blocking.client import BlockingKernelClient
-from .interface import ExecutionResult, Kernel
+from jupyter_client.asynchronous.client import AsyncKernelClient
+from jupyter_client.utils import run_sync
+from .interface import ExecutionResult, Kernel, OutputCallback, append_output
+
+
+def _message_to_output(msg: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Convert an IOPub message into an nbformat-compliant output dict.
+    Returns None for messages that do not produce an output (e.g. status).
+    """
+    msg_type = msg["header"]["msg_type"]
+    content = msg["content"]
+
+    if msg_type == "stream":
+        return {
+            "output_type": "stream",
+            "name": content["name"],
+            "text": content["text"]
+        }
+
+    if msg_type == "execute_result":
+        return {
+            "output_type": "execute_result",
+            "data": content["data"],
+            "execution_count": content["execution_count"],
+            "metadata": content.get("metadata", {})
+        }
+
+    if msg_type == "display_data":
+        return {
+            "output_type": "display_data",
+            "data": content["data"],
+            "metadata": content.get("metadata", {})
+        }
+
+    if msg_type == "error":
+        return {
+            "output_type": "error",
+            "ename": content["ename"],
+            "evalue": content["evalue"],
+            "traceback": content["traceback"]
+        }
+
+    return None
+
+
+def _error_output(ename: str, evalue: str) -> Dict[str, Any]:
+    """Build an error output for failures that did not come from the kernel."""
+    return {
+        "output_type": "error",
+        "ename": ename,
+        "evalue": evalue,
+        "traceback": []
+    }
+
+
+def _deadline_output(timeout: float) -> Dict[str, Any]:
+    return _error_output(
+        "TimeoutError",
+        f"Execution exceeded the {timeout:g}s deadline, kernel interrupted"
+    )
+
+
+def _restarted_output() -> Dict[str, Any]:
+    return _error_output(
+        "DeadKernelError",
+        "Kernel did not respond to the interrupt and was restarted, its state was lost"
+    )
+
+
+class KernelRestarted(RuntimeError):
+    """Ends the executions a kernel restart cut short."""
+
+
+def _is_idle(msg: Dict[str, Any]) -> bool:
+    """Check whether an IOPub message reports that the kernel went idle."""
+    return (
+        msg["header"]["msg_type"] == "status"
+        and msg["content"]["execution_state"] == "idle"
+    )
+
 
 class JupyterKernel(Kernel):
     """
@@ -12,8 +92,15 @@ class JupyterKernel(Kernel):
     It manages a single Python kernel process.
     """
 
-    def __init__(self, kernel_name: str = "python3"):
+    # How often to check that the kernel is alive while waiting for output
+    POLL_INTERVAL = 1.0
+    # How long to wait for the kernel to go idle after an interrupt before restarting it
+    INTERRUPT_GRACE = 5.0
+
+    def __init__(self, kernel_name: str = "python3", timeout: Optional[float] = None):
         self.kernel_name = kernel_name
+        # Default wall-clock deadline for a whole execution, in seconds (None = no limit)
+        self.timeout = timeout
         self._km: Optional[KernelManager] = None
         self._kc: Optional[BlockingKernelClient] = None
 
@@ -45,88 +132,390 @@ class JupyterKernel(Kernel):
             self._km.shutdown_kernel(now=True)
             self._km = None
 
-    def execute(self, code: str) -> ExecutionResult:
+    def interrupt(self) -> None:
+        """Interrupt the code currently running in the kernel."""
+        if self._km:
+            self._km.interrupt_kernel()
+
+    def execute(
+        self,
+        code: str,
+        on_output: Optional[OutputCallback] = None,
+        timeout: Optional[float] = None,
+    ) -> ExecutionResult:
         """
         Execute code synchronously.
         NOTE: This blocks until execution finishes.
+        If the execution exceeds ``timeout`` seconds the kernel is interrupted and
+        its remaining output drained, so the next execution starts from a clean state.
         """
         if not self._kc:
             raise RuntimeError("Kernel is not running. Call start() first.")
 
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout if timeout else None
+        interrupted = False
+
         # 1. Send execute request
         msg_id = self._kc.execute(code)
 
         # 2. Poll for messages until idle
         outputs: List[Dict[str, Any]] = []
-        
+
+        def _emit(output: Dict[str, Any]) -> None:
+            if on_output:
+                on_output(dict(output))
+            append_output(outputs, output)
+
         # Loop until we receive 'idle' status
         while True:
+            wait = self.POLL_INTERVAL
+            if deadline is not None:
+                wait = max(0.0, min(wait, deadline - time.monotonic()))
+
             try:
                 # Get IOPub message (stdout, stderr, display, status)
-                msg = self._kc.get_iopub_msg(timeout=30)
-                msg_type = msg["header"]["msg_type"]
-                content = msg["content"]
-                
-                # Check for parent_header to match our request
-                if msg["parent_header"].get("msg_id") != msg_id:
-                    continue
-
-                if msg_type == "stream":
-                    outputs.append({
-                        "output_type": "stream",
-                        "name": content["name"],
-                        "text": content["text"]
-                    })
-                
-                elif msg_type == "execute_result":
-                    outputs.append({
-                        "output_type": "execute_result",
-                        "data": content["data"],
-                        "execution_count": content["execution_count"],
-                        "metadata": content.get("metadata", {})
-                    })
-                
-                elif msg_type == "display_data":
-                    outputs.append({
-                        "output_type": "display_data",
-                        "data": content["data"],
-                        "metadata": content.get("metadata", {})
-                    })
-
-                elif msg_type == "error":
-                    outputs.append({
-                        "output_type": "error",
-                        "ename": content["ename"],
-                        "evalue": content["evalue"],
-                        "traceback": content["traceback"]
-                    })
-
-                elif msg_type == "status":
-                    if content["execution_state"] == "idle":
-                        break
-
+                msg = self._kc.get_iopub_msg(timeout=wait)
             except queue.Empty:
-                # If we timeout waiting for messages, we should probably stop
-                # and report an error.
-                outputs.append({
-                    "output_type": "error",
-                    "ename": "TimeoutError",
-                    "evalue": "Execution timed out",
-                    "traceback": []
-                })
-                break
+                if deadline is not None and time.monotonic() >= deadline:
+                    if interrupted:
+                        # e.g. a top-level await that SIGINT can't break
+                        self._km.restart_kernel(now=True)
+                        _emit(_restarted_output())
+                        break
+                    # Interrupt and keep draining until the kernel reports idle
+                    _emit(_deadline_output(timeout))
+                    self.interrupt()
+                    interrupted = True
+                    deadline = time.monotonic() + self.INTERRUPT_GRACE
+                elif not self._km or not self._km.is_alive():
+                    _emit(_error_output("DeadKernelError", "Kernel died during execution"))
+                    break
+                continue
             except Exception as e:
-                outputs.append({
-                    "output_type": "error",
-                    "ename": type(e).__name__,
-                    "evalue": str(e),
-                    "traceback": []
-                })
+                _emit(_error_output(type(e).__name__, str(e)))
+                break
+
+            # Check for parent_header to match our request
+            if msg["parent_header"].get("msg_id") != msg_id:
+                continue
+
+            output = _message_to_output(msg)
+            if output is not None:
+                _emit(output)
+            elif _is_idle(msg):
                 break
 
         return ExecutionResult(outputs=outputs)
 
-    async def aexecute(self, code: str) -> ExecutionResult:
+    async def aexecute(
+        self,
+        code: str,
+        on_output: Optional[OutputCallback] = None,
+        timeout: Optional[float] = None,
+    ) -> ExecutionResult:
         """Execute a code snippet and return the result asynchronously."""
+        callback = None
+        if on_output:
+            # Outputs are produced in the worker thread, deliver them on the caller's loop
+            loop = asyncio.get_running_loop()
+            callback = lambda output: loop.call_soon_threadsafe(on_output, output)
+
         # Since jupyter_client blocking client is not async, we run it in a thread
-        return await asyncio.to_thread(self.execute, code)
+        return await asyncio.to_thread(self.execute, code, callback, timeout)
+
+
+class AsyncJupyterKernel(Kernel):
+    """
+    A Kernel implementation built on jupyter_client's asyncio API.
+
+    Executions do not occupy a thread: a single reader task per kernel consumes
+    the IOPub channel and routes every message to the waiter registered for its
+    parent ``msg_id``. The client and the reader are bound to the event loop that
+    first executes code and are re-created if the kernel is used from another loop.
+
+    Executions may target a subshell (see ``acreate_subshell``), which runs
+    them in its own thread, concurrently with other subshells' executions.
+    """
+
+    # How often to check that the kernel is alive while waiting for output
+    POLL_INTERVAL = 1.0
+    # How long to wait for the kernel to go idle after an interrupt before restarting it
+    INTERRUPT_GRACE = 5.0
+
+    def __init__(self, kernel_name: str = "python3", timeout: Optional[float] = None):
+        self.kernel_name = kernel_name
+        # Default wall-clock deadline for a whole execution, in seconds (None = no limit)
+        self.timeout = timeout
+        self._km: Optional[AsyncKernelManager] = None
+        self._kc: Optional[AsyncKernelClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._reader: Optional[asyncio.Task] = None
+        self._waiters: Dict[str, asyncio.Queue] = {}
+        self._connect_lock: Optional[asyncio.Lock] = None
+        self._control_lock: Optional[asyncio.Lock] = None
+        # Whether the kernel supports subshells; None until asked
+        self._subshells: Optional[bool] = None
+        # Called after the kernel was restarted, e.g. to tell the owners of its state
+        self.on_restart: Optional[Callable[[], None]] = None
+
+    async def astart(self) -> None:
+        """Start the kernel process asynchronously."""
+        if self._km is not None:
+            return  # Already started
+
+        self._km = AsyncKernelManager(kernel_name=self.kernel_name)
+        await self._km.start_kernel()
+
+    def start(self) -> None:
+        """Start the kernel process."""
+        run_sync(self.astart)()
+
+    async def _shutdown(self) -> None:
+        if self._km:
+            await self._km.shutdown_kernel(now=True)
+            self._km = None
+
+    async def astop(self) -> None:
+        """Stop the kernel process asynchronously."""
+        self._close_client()
+        await self._shutdown()
+
+    def stop(self) -> None:
+        """Stop the kernel process."""
+        self._close_client()
+        run_sync(self._shutdown)()
+
+    def _close_client(self) -> None:
+        """Stop the IOPub reader and close the client channels."""
+        loop, reader, waiters = self._loop, self._reader, list(self._waiters.values())
+        self._reader = None
+        self._waiters.clear()
+
+        def _cancel() -> None:
+            if reader:
+                reader.cancel()
+            for waiter in waiters:
+                waiter.put_nowait(RuntimeError("Kernel client was closed."))
+
+        # The reader and the waiters belong to the loop the client is bound to,
+        # which may be running in another thread (e.g. stop() from a worker).
+        if loop is not None and not loop.is_closed():
+            try:
+                running = asyncio.get_running_loop()
+            except RuntimeError:
+                running = None
+            if running is loop:
+                _cancel()
+            else:
+                loop.call_soon_threadsafe(_cancel)
+
+        if self._kc:
+            self._kc.stop_channels()
+            self._kc = None
+        self._loop = None
+        self._connect_lock = None
+        self._control_lock = None
+
+    def _fail_waiters(self, exc: BaseException) -> None:
+        """Wake up every pending execution with the given exception."""
+        for waiter in self._waiters.values():
+            waiter.put_nowait(exc)
+        self._waiters.clear()
+
+    async def _ensure_client(self) -> AsyncKernelClient:
+        """Connect a client on the running loop and start the IOPub reader."""
+        if not self._km:
+            raise RuntimeError("Kernel is not running. Call start() first.")
+
+        loop = asyncio.get_running_loop()
+        if self._kc is not None and self._loop is loop:
+            return self._kc
+
+        # Concurrent first executions must share a single client
+        if self._connect_lock is None or self._loop is not loop:
+            self._close_client()
+            self._loop = loop
+            self._connect_lock = asyncio.Lock()
+            self._control_lock = asyncio.Lock()
+
+        async with self._connect_lock:
+            if self._kc is not None:
+                return self._kc
+
+            kc = self._km.client()
+            kc.start_channels()
+            try:
+                await kc.wait_for_ready(timeout=10)
+            except RuntimeError:
+                kc.stop_channels()
+                raise RuntimeError("Kernel failed to start within timeout.")
+
+            self._kc = kc
+            self._reader = loop.create_task(self._read_iopub(kc))
+            return kc
+
+    async def _read_iopub(self, kc: AsyncKernelClient) -> None:
+        """Dispatch IOPub messages to the waiters keyed by parent msg_id."""
+        try:
+            while True:
+                msg = await kc.get_iopub_msg()
+                parent_id = msg["parent_header"].get("msg_id")
+                waiter = self._waiters.get(parent_id)
+                if waiter is not None:
+                    waiter.put_nowait(msg)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._fail_waiters(e)
+
+    async def _control_request(self, msg_type: str, content: Dict[str, Any], timeout: float = 10) -> Dict[str, Any]:
+        """Send a request on the control channel and wait for its reply."""
+        kc = await self._ensure_client()
+        msg = kc.session.msg(msg_type, content)
+        async with self._control_lock:
+            kc.control_channel.send(msg)
+            while True:
+                reply = await kc.control_channel.get_msg(timeout=timeout)
+                if reply["parent_header"].get("msg_id") == msg["header"]["msg_id"]:
+                    return reply
+
+    async def acreate_subshell(self) -> Optional[str]:
+        """
+        Create a subshell (JEP 91) and return its id, or None if the kernel has
+        none. Executions on a subshell run in order, in the subshell's thread and
+        event loop, concurrently with those of other subshells. SIGINT doesn't
+        reach them: a subshell execution past its deadline restarts the kernel.
+        """
+        kc = await self._ensure_client()
+        if self._subshells is None:
+            info = await kc.kernel_info(reply=True, timeout=10)
+            self._subshells = "kernel subshells" in info["content"].get("supported_features", [])
+        if not self._subshells:
+            return None
+        reply = await self._control_request("create_subshell_request", {})
+        return reply["content"]["subshell_id"]
+
+    async def adelete_subshell(self, subshell_id: str) -> None:
+        """Delete a subshell, stopping its thread."""
+        await self._control_request("delete_subshell_request", {"subshell_id": subshell_id})
+
+    async def _restart(self) -> None:
+        await self._km.restart_kernel(now=True)
+        # Other executions in flight died with the process
+        self._fail_waiters(KernelRestarted())
+        if self.on_restart:
+            self.on_restart()
+
+    async def ainterrupt(self) -> None:
+        """Interrupt the code currently running in the kernel asynchronously."""
+        if self._km:
+            await self._km.interrupt_kernel()
+
+    def interrupt(self) -> None:
+        """Interrupt the code currently running in the kernel."""
+        run_sync(self.ainterrupt)()
+
+    def execute(
+        self,
+        code: str,
+        on_output: Optional[OutputCallback] = None,
+        timeout: Optional[float] = None,
+    ) -> ExecutionResult:
+        """
+        Execute code synchronously.
+        NOTE: This blocks until execution finishes.
+        """
+        return run_sync(self.aexecute)(code, on_output, timeout)
+
+    async def aexecute(
+        self,
+        code: str,
+        on_output: Optional[OutputCallback] = None,
+        timeout: Optional[float] = None,
+        subshell_id: Optional[str] = None,
+    ) -> ExecutionResult:
+        """Execute a code snippet and return the result asynchronously."""
+        outputs: List[Dict[str, Any]] = []
+        async for output in self.astream(code, timeout=timeout, subshell_id=subshell_id):
+            if on_output:
+                on_output(dict(output))
+            append_output(outputs, output)
+        return ExecutionResult(outputs=outputs)
+
+    async def astream(
+        self, code: str, timeout: Optional[float] = None, subshell_id: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Execute a code snippet and yield its outputs as they are produced.
+        If the execution exceeds ``timeout`` seconds the kernel is interrupted and
+        its remaining output drained, so the next execution starts from a clean state.
+        With ``subshell_id``, the code runs on that subshell.
+        """
+        kc = await self._ensure_client()
+        loop = asyncio.get_running_loop()
+        timeout = self.timeout if timeout is None else timeout
+        deadline = loop.time() + timeout if timeout else None
+        interrupted = False
+
+        # Register the waiter before yielding to the loop so that no message
+        # for this execution can be dispatched before we listen for it.
+        if subshell_id is None:
+            msg_id = kc.execute(code)
+        else:
+            # Not stopping on errors, so a failing cell can't abort requests queued on other subshells
+            msg = kc.session.msg("execute_request", {
+                "code": code,
+                "silent": False,
+                "store_history": True,
+                "user_expressions": {},
+                "allow_stdin": False,
+                "stop_on_error": False,
+            })
+            msg["header"]["subshell_id"] = subshell_id
+            kc.shell_channel.send(msg)
+            msg_id = msg["header"]["msg_id"]
+        waiter: asyncio.Queue = asyncio.Queue()
+        self._waiters[msg_id] = waiter
+
+        try:
+            while True:
+                wait = self.POLL_INTERVAL
+                if deadline is not None:
+                    wait = max(0.0, min(wait, deadline - loop.time()))
+
+                try:
+                    item = await asyncio.wait_for(waiter.get(), timeout=wait)
+                except asyncio.TimeoutError:
+                    if deadline is not None and loop.time() >= deadline:
+                        if interrupted:
+                            # e.g. a top-level await that SIGINT can't break
+                            await self._restart()
+                            yield _restarted_output()
+                            return
+                        # Interrupt and keep draining until the kernel reports idle
+                        yield _deadline_output(timeout)
+                        if subshell_id is None:
+                            # Subshell threads can't be interrupted, they only get the grace period
+                            await self.ainterrupt()
+                        interrupted = True
+                        deadline = loop.time() + self.INTERRUPT_GRACE
+                    elif not self._km or not await self._km.is_alive():
+                        yield _error_output("DeadKernelError", "Kernel died during execution")
+                        return
+                    continue
+
+                if isinstance(item, KernelRestarted):
+                    yield _restarted_output()
+                    return
+                if isinstance(item, BaseException):
+                    yield _error_output(type(item).__name__, str(item))
+                    return
+
+                output = _message_to_output(item)
+                if output is not None:
+                    yield output
+                elif _is_idle(item):
+                    return
+        finally:
+            self._waiters.pop(msg_id, None)
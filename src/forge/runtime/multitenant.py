@@ -0,0 +1,315 @@
+import asyncio
+import inspect
+import textwrap
+import threading
+from typing import Callable, Dict, List, Optional, Set
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from jupyter_client.utils import run_sync
+
+from .inprocess import run_cell
+from .interface import ExecutionResult, Kernel, OutputCallback
+from .kernel import AsyncJupyterKernel, _error_output
+
+
+class SharedKernelSettings(BaseSettings):
+    """
+    Multi-tenant kernel configuration settings.
+    Reads from environment variables or .env file.
+    Prefix: SHARED_KERNEL_
+    """
+    shared_kernel_max_tenants: int = 20
+
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        env_file_encoding="utf-8",
+        extra="ignore"
+    )
+
+
+# Installed in the kernel (again after a restart) before running a tenant's code.
+# Tenant namespaces live in a dict inside the kernel, out of the kernel's own globals.
+_BOOTSTRAP_CODE = f"""
+if "__forge_run__" not in globals():
+    def __forge_bootstrap__():
+        import asyncio
+        import builtins
+        from typing import Any, Dict
+        namespaces = {{}}
+
+{textwrap.indent(inspect.getsource(run_cell), " " * 8)}
+        async def run(tenant_id, code, filename, timeout=None):
+            namespace = namespaces.setdefault(tenant_id, {{"__name__": "__main__", "__builtins__": builtins}})
+            if not timeout:
+                return await run_cell(code, namespace, filename)
+            # Subshells can't be interrupted, so deadlines cancel the cell here
+            try:
+                return await asyncio.wait_for(run_cell(code, namespace, filename), timeout)
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"Execution exceeded the {{timeout:g}}s deadline, cell cancelled") from None
+
+        def drop(tenant_id):
+            namespaces.pop(tenant_id, None)
+
+        return run, drop
+
+    __forge_run__, __forge_drop__ = __forge_bootstrap__()
+    del __forge_bootstrap__
+"""
+
+
+class SharedJupyterKernel:
+    """
+    A single Jupyter kernel process hosting the namespaces of several tenants.
+
+    Each tenant gets a ``TenantKernel`` implementing the Kernel protocol, and
+    a subshell of the kernel: tenants' cells run concurrently, each tenant's in
+    order, and replies are routed by msg_id. Deadlines cancel the cell inside
+    the kernel; a cell that doesn't yield (e.g. blocking in sync code) is only
+    stopped by restarting the kernel, which loses every tenant's state. The
+    next cell of every other tenant then fails, telling it so.
+
+    Kernels without subshells run the tenants' cells one at a time, so a
+    deadline or an interrupt only ever applies to the tenant's own cell.
+    """
+
+    # Seconds past a cell's deadline for the kernel to report its cancellation
+    CANCEL_MARGIN = 1.0
+
+    def __init__(self, kernel_factory: Callable[[], Kernel] = AsyncJupyterKernel):
+        self.kernel = kernel_factory()
+        self.tenants: Dict[str, "TenantKernel"] = {}
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: Set[asyncio.Task] = set()
+        self._stopped = False
+        # Subshell of each tenant; empty while the kernel has none
+        self._subshells: Dict[str, str] = {}
+        self._subshells_supported = isinstance(self.kernel, AsyncJupyterKernel)
+        self._bootstrapped = False
+        if isinstance(self.kernel, AsyncJupyterKernel):
+            self.kernel.on_restart = self._on_restart
+
+    def start(self) -> None:
+        """Start the kernel process."""
+        self._stopped = False
+        self.kernel.start()
+
+    def stop(self) -> None:
+        """Stop the kernel process, for every tenant."""
+        self._stopped = True
+        for task in list(self._pending):
+            task.cancel()
+        self.kernel.stop()
+        self.tenants.clear()
+
+    def tenant(self, tenant_id: str) -> "TenantKernel":
+        """Attach a tenant to this kernel."""
+        if tenant_id not in self.tenants:
+            self.tenants[tenant_id] = TenantKernel(self, tenant_id)
+        return self.tenants[tenant_id]
+
+    def _get_lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        return self._lock
+
+    async def _subshell(self, tenant_id: str) -> Optional[str]:
+        """The tenant's subshell, created with the tenant's first cell; None without subshells."""
+        if not self._subshells_supported:
+            return None
+        async with self._get_lock():
+            if not self._bootstrapped:
+                # Installed once from the main shell, so subshells never race to do it
+                await self.kernel.aexecute(_BOOTSTRAP_CODE)
+                self._bootstrapped = True
+            if tenant_id not in self._subshells:
+                subshell_id = await self.kernel.acreate_subshell()
+                if subshell_id is None:
+                    self._subshells_supported = False
+                    return None
+                self._subshells[tenant_id] = subshell_id
+            return self._subshells[tenant_id]
+
+    async def _execute(
+        self,
+        tenant_id: str,
+        code: str,
+        on_output: Optional[OutputCallback],
+        timeout: Optional[float],
+    ) -> ExecutionResult:
+        subshell_id = await self._subshell(tenant_id)
+        run = f"await __forge_run__({tenant_id!r}, {code!r}, {f'<{tenant_id}>'!r}, {timeout!r})"
+        if subshell_id is not None:
+            deadline = timeout + self.CANCEL_MARGIN if timeout else None
+            return await self.kernel.aexecute(run, on_output=on_output, timeout=deadline, subshell_id=subshell_id)
+        async with self._get_lock():
+            return await self.kernel.aexecute(f"{_BOOTSTRAP_CODE}\n{run}", on_output=on_output, timeout=timeout)
+
+    def _on_restart(self) -> None:
+        """The kernel restarted: subshells and namespaces are gone."""
+        self._subshells.clear()
+        self._bootstrapped = False
+        for tenant in self.tenants.values():
+            # Tenants running a cell are told by that cell's result
+            if not tenant._running:
+                tenant._restarted = True
+
+    def _drop(self, tenant_id: str) -> None:
+        self.tenants.pop(tenant_id, None)
+        subshell_id = self._subshells.pop(tenant_id, None)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            run_sync(self._release)(tenant_id, subshell_id)
+            return
+
+        # Don't block the loop, nor run the kernel client from another loop
+        # while other tenants are executing on this one.
+        task = loop.create_task(self._release(tenant_id, subshell_id))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _release(self, tenant_id: str, subshell_id: Optional[str]) -> None:
+        """Drop a tenant's namespace and delete its subshell."""
+        code = f'if "__forge_drop__" in globals(): __forge_drop__({tenant_id!r})'
+        async with self._get_lock():
+            if self._stopped:
+                return
+            await self.kernel.aexecute(code)
+            if subshell_id is not None:
+                await self.kernel.adelete_subshell(subshell_id)
+
+
+class TenantKernel(Kernel):
+    """
+    A tenant's view of a SharedJupyterKernel: code runs in the tenant's own
+    namespace inside the shared kernel process.
+    """
+
+    def __init__(self, host: SharedJupyterKernel, tenant_id: str):
+        self.host = host
+        self.tenant_id = tenant_id
+        self._attached = True
+        self._running = False
+        # The host kernel restarted since the tenant's last cell, losing its namespace
+        self._restarted = False
+        self.on_stop: Optional[Callable[["TenantKernel"], None]] = None
+
+    def start(self) -> None:
+        """The host kernel is already running; the namespace is created on first use."""
+        if not self._attached:
+            raise RuntimeError(f"Tenant {self.tenant_id} was detached from its kernel.")
+
+    def stop(self) -> None:
+        """Drop the tenant's namespace and detach from the host kernel."""
+        if not self._attached:
+            return
+        self._attached = False
+        try:
+            self.host._drop(self.tenant_id)
+        finally:
+            if self.on_stop:
+                self.on_stop(self)
+
+    def interrupt(self) -> None:
+        """
+        Interrupt the host kernel, only if it is running this tenant's cell.
+        Cells on subshells can't be interrupted; their deadline cancels them.
+        """
+        if self._running and self.tenant_id not in self.host._subshells:
+            self.host.kernel.interrupt()
+
+    def execute(
+        self,
+        code: str,
+        on_output: Optional[OutputCallback] = None,
+        timeout: Optional[float] = None,
+    ) -> ExecutionResult:
+        """
+        Execute code synchronously.
+        NOTE: This blocks until execution finishes.
+        """
+        return run_sync(self.aexecute)(code, on_output, timeout)
+
+    async def aexecute(
+        self,
+        code: str,
+        on_output: Optional[OutputCallback] = None,
+        timeout: Optional[float] = None,
+    ) -> ExecutionResult:
+        """Execute a code snippet in the tenant's namespace asynchronously."""
+        if not self._attached:
+            raise RuntimeError("Kernel is not running. Call start() first.")
+        if self._restarted:
+            # Running the cell would only fail on the missing state; say why instead
+            self._restarted = False
+            output = _error_output(
+                "DeadKernelError",
+                "The shared kernel was restarted after another tenant's cell hung, this tenant's state was lost",
+            )
+            if on_output:
+                on_output(dict(output))
+            return ExecutionResult(outputs=[output])
+
+        self._running = True
+        try:
+            return await self.host._execute(self.tenant_id, code, on_output, timeout)
+        finally:
+            self._running = False
+
+
+class MultiTenantKernelManager:
+    """
+    Packs tenants into as few kernel processes as possible, with at most
+    ``max_tenants`` per process. Processes are stopped when their last tenant leaves.
+    """
+
+    def __init__(self, max_tenants: int = 20, kernel_factory: Callable[[], Kernel] = AsyncJupyterKernel):
+        if max_tenants < 1:
+            raise ValueError("Multi-tenant kernels require max_tenants >= 1.")
+        self.max_tenants = max_tenants
+        self.kernel_factory = kernel_factory
+        self._hosts: List[SharedJupyterKernel] = []
+        self._mutex = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings: Optional[SharedKernelSettings] = None) -> "MultiTenantKernelManager":
+        """Create a manager configured from environment variables/settings."""
+        settings = settings or SharedKernelSettings()
+        return cls(max_tenants=settings.shared_kernel_max_tenants)
+
+    @property
+    def host_count(self) -> int:
+        """Number of kernel processes currently running."""
+        return len(self._hosts)
+
+    def acquire(self, tenant_id: str) -> TenantKernel:
+        """Attach a tenant to a kernel process that has room, starting one if needed."""
+        with self._mutex:
+            host = next((h for h in self._hosts if len(h.tenants) < self.max_tenants), None)
+            if host is None:
+                host = SharedJupyterKernel(self.kernel_factory)
+                host.start()
+                self._hosts.append(host)
+            tenant = host.tenant(tenant_id)
+            tenant.on_stop = self._on_tenant_stop
+            return tenant
+
+    def close(self) -> None:
+        """Stop every kernel process."""
+        with self._mutex:
+            hosts, self._hosts = self._hosts, []
+        for host in hosts:
+            host.stop()
+
+    def _on_tenant_stop(self, tenant: TenantKernel) -> None:
+        with self._mutex:
+            host = tenant.host
+            if host.tenants or host not in self._hosts:
+                return
+            self._hosts.remove(host)
+        host.stop()
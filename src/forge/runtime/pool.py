@@ -0,0 +1,231 @@
+import threading
+from collections import deque
+from typing import Callable, Deque, List, Optional
+
+from loguru import logger
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from ..model.testcase import BrowserType
+from .interface import Kernel
+from .kernel import AsyncJupyterKernel
+from .profile import KernelProfile, get_profile
+
+
+class KernelPoolSettings(BaseSettings):
+    """
+    Kernel pool configuration settings.
+    Reads from environment variables or .env file.
+    Prefix: KERNEL_POOL_
+    """
+    kernel_pool_min_size: int = 2
+    kernel_pool_max_size: int = 4
+    kernel_pool_recycle: bool = False
+    kernel_pool_profile: Optional[str] = "playwright"
+    kernel_pool_browser: BrowserType = BrowserType.CHROMIUM
+    kernel_pool_headless: bool = True
+
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        env_file_encoding="utf-8",
+        extra="ignore"
+    )
+
+
+class KernelPool:
+    """
+    A pool of already-started kernels that sessions can check out instantly.
+
+    A background thread keeps at least ``min_size`` idle kernels warm and takes
+    care of returned kernels: they are either reset and put back (recycle) or
+    shut down (discard). At most ``max_size`` idle kernels are kept around.
+    If a profile is given, its warm-up code runs in every kernel before it is
+    handed out.
+    """
+
+    # Executed in a returned kernel before it is handed out again
+    RESET_CODE = "%reset -f"
+    # Seconds to wait before retrying after a kernel failed to start
+    RETRY_DELAY = 5.0
+
+    def __init__(
+        self,
+        min_size: int = 2,
+        max_size: int = 4,
+        recycle: bool = False,
+        kernel_factory: Callable[[], Kernel] = AsyncJupyterKernel,
+        profile: Optional[KernelProfile] = None,
+    ):
+        if min_size < 0 or max_size < min_size:
+            raise ValueError("Kernel pool requires 0 <= min_size <= max_size.")
+
+        self.min_size = min_size
+        self.max_size = max_size
+        self.recycle = recycle
+        self.kernel_factory = kernel_factory
+        self.profile = profile
+
+        self._idle: Deque[Kernel] = deque()
+        self._returned: Deque[tuple] = deque()
+        self._starting = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._worker: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_settings(cls, settings: Optional[KernelPoolSettings] = None) -> "KernelPool":
+        """Create a pool configured from environment variables/settings."""
+        settings = settings or KernelPoolSettings()
+        return cls(
+            min_size=settings.kernel_pool_min_size,
+            max_size=settings.kernel_pool_max_size,
+            recycle=settings.kernel_pool_recycle,
+            profile=get_profile(
+                settings.kernel_pool_profile,
+                browser=settings.kernel_pool_browser,
+                headless=settings.kernel_pool_headless,
+            ),
+        )
+
+    @property
+    def idle_count(self) -> int:
+        """Number of warm kernels ready to be checked out."""
+        return len(self._idle)
+
+    def start(self) -> None:
+        """Start the background thread that warms and recycles kernels."""
+        with self._cond:
+            if self._worker is not None:
+                return  # Already started
+            self._closed = False
+            self._worker = threading.Thread(target=self._run, name="kernel-pool", daemon=True)
+            self._worker.start()
+
+    def close(self) -> None:
+        """Stop the background thread and shut down every idle kernel."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            worker, self._worker = self._worker, None
+
+        if worker is not None:
+            worker.join()
+
+        with self._cond:
+            kernels: List[Kernel] = list(self._idle) + [k for k, _ in self._returned]
+            self._idle.clear()
+            self._returned.clear()
+
+        for kernel in kernels:
+            self._discard(kernel)
+
+    def acquire(self) -> Kernel:
+        """
+        Check out a started kernel.
+        Falls back to starting one synchronously if no warm kernel is available.
+        """
+        with self._cond:
+            kernel = self._idle.popleft() if self._idle else None
+            # Wake up the worker so it refills what we just took
+            self._cond.notify_all()
+
+        if kernel is not None:
+            return kernel
+
+        logger.warning("Kernel pool is empty, starting a kernel on demand.")
+        return self._start_kernel()
+
+    def release(self, kernel: Kernel, recycle: Optional[bool] = None) -> None:
+        """
+        Return a kernel to the pool. The kernel is recycled (reset and kept warm)
+        or discarded (shut down) in the background; this call does not block.
+        """
+        recycle = self.recycle if recycle is None else recycle
+        with self._cond:
+            queued = not self._closed and self._worker is not None
+            if queued:
+                self._returned.append((kernel, recycle))
+                self._cond.notify_all()
+
+        if not queued:
+            # No background thread to hand it to, shut it down right away
+            self._discard(kernel)
+
+    def _start_kernel(self) -> Kernel:
+        kernel = self.kernel_factory()
+        kernel.start()
+        self._warm_up(kernel)
+        return kernel
+
+    def _warm_up(self, kernel: Kernel) -> None:
+        if not self.profile or not self.profile.warmup_code:
+            return
+        # A failed warm-up is not fatal: tasks set up whatever is missing themselves
+        result = kernel.execute(self.profile.warmup_code)
+        if not result.is_success:
+            logger.warning(f"Kernel profile '{self.profile.name}' warm-up failed: {result.error}")
+
+    def _needs_refill(self) -> bool:
+        return len(self._idle) + self._starting < self.min_size
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._closed or self._returned or self._needs_refill()
+                )
+                if self._closed:
+                    return
+
+                returned = self._returned.popleft() if self._returned else None
+                if returned is None:
+                    self._starting += 1
+
+            if returned is not None:
+                self._handle_returned(*returned)
+                continue
+
+            try:
+                kernel = self._start_kernel()
+            except Exception as e:
+                logger.error(f"Kernel pool failed to start a kernel: {e}")
+                with self._cond:
+                    self._starting -= 1
+                    self._cond.wait_for(lambda: self._closed, timeout=self.RETRY_DELAY)
+                continue
+
+            with self._cond:
+                self._starting -= 1
+                if not self._closed:
+                    self._idle.append(kernel)
+                    continue
+
+            # Pool was closed while the kernel was starting
+            self._discard(kernel)
+
+    def _handle_returned(self, kernel: Kernel, recycle: bool) -> None:
+        with self._cond:
+            keep = recycle and len(self._idle) < self.max_size
+
+        if keep:
+            try:
+                keep = kernel.execute(self.RESET_CODE).is_success
+                if keep:
+                    self._warm_up(kernel)
+            except Exception as e:
+                logger.warning(f"Kernel pool failed to reset a kernel: {e}")
+                keep = False
+
+        if keep:
+            with self._cond:
+                if not self._closed and len(self._idle) < self.max_size:
+                    self._idle.append(kernel)
+                    return
+
+        self._discard(kernel)
+
+    @staticmethod
+    def _discard(kernel: Kernel) -> None:
+        try:
+            kernel.stop()
+        except Exception as e:
+            logger.warning(f"Kernel pool failed to stop a kernel: {e}")
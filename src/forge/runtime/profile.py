@@ -0,0 +1,110 @@
+from typing import Dict, Optional
+from pydantic import BaseModel
+
+from ..model.testcase import BrowserType, TestEnv
+
+
+class KernelProfile(BaseModel):
+    """
+    Describes how a kernel is warmed up right after it starts,
+    so that tasks checking it out don't pay for it.
+    """
+    name: str
+    warmup_code: str = ""
+
+
+def _browser_key(browser: BrowserType, headless: bool) -> str:
+    """Identifies the browser launched in a kernel, to tell if a task can reuse it."""
+    return repr((browser.value, headless))
+
+
+def playwright_profile(
+    browser: BrowserType = BrowserType.CHROMIUM,
+    headless: bool = True,
+    launch: bool = True,
+) -> KernelProfile:
+    """
+    A profile that imports Playwright and launches a browser ahead of time.
+    Tasks then only create their own BrowserContext and page.
+    With ``launch=False`` only the Playwright driver is started, for kernels
+    that connect to a shared browser server instead.
+    """
+    warmup_code = """
+from playwright.async_api import async_playwright
+playwright = await async_playwright().start()
+"""
+    if launch:
+        warmup_code += f"""browser = await playwright.{browser.value}.launch(headless={headless})
+_forge_browser_key = {_browser_key(browser, headless)}
+"""
+    return KernelProfile(name="playwright" if launch else "playwright-driver", warmup_code=warmup_code)
+
+
+def playwright_driver_profile(**kwargs) -> KernelProfile:
+    """A profile that only starts the Playwright driver, see ``playwright_profile``."""
+    kwargs["launch"] = False
+    return playwright_profile(**kwargs)
+
+
+PROFILES = {
+    "playwright": playwright_profile,
+    "playwright-driver": playwright_driver_profile,
+}
+
+
+def get_profile(name: Optional[str], **kwargs) -> Optional[KernelProfile]:
+    """Look up a profile by name. Returns None if no profile is requested."""
+    if not name:
+        return None
+    if name not in PROFILES:
+        raise ValueError(f"Unknown kernel profile '{name}'")
+    return PROFILES[name](**kwargs)
+
+
+def build_browser_init_code(env: TestEnv, ws_endpoint: Optional[str] = None) -> str:
+    """
+    Build the cell that gives a task an isolated context and page configured from its test-env.
+    The browser pre-launched by the playwright profile is reused when it matches the test-env,
+    otherwise a matching browser is launched. If a ``ws_endpoint`` is given, the kernel
+    connects to that shared browser server instead of launching a browser.
+    """
+    if ws_endpoint:
+        key = repr(ws_endpoint)
+        launch = f"await playwright.{env.browser.value}.connect({ws_endpoint!r})"
+    else:
+        key = _browser_key(env.browser, env.headless)
+        launch = f"await playwright.{env.browser.value}.launch(headless={env.headless})"
+
+    context_options: Dict[str, object] = {
+        "base_url": env.base_url,
+        "viewport": env.viewport,
+    }
+    options = ", ".join(f"{k}={v!r}" for k, v in context_options.items())
+    return f"""
+from playwright.async_api import async_playwright
+if globals().get("_forge_browser_key") != {key} or not browser.is_connected():
+    if "browser" in globals():
+        await browser.close()
+    if "playwright" not in globals():
+        playwright = await async_playwright().start()
+    browser = {launch}
+    _forge_browser_key = {key}
+context = await browser.new_context({options})
+context.set_default_timeout({env.timeout})
+page = await context.new_page()
+await page.goto({env.base_url!r})
+"""
+
+
+# Closes what the browser init cell opened, once a task is done with the kernel
+BROWSER_CLEANUP_CODE = """
+try:
+    if 'context' in locals():
+        await context.close()
+    if 'browser' in locals():
+        await browser.close()
+    if 'playwright' in locals():
+        await playwright.stop()
+except Exception:
+    pass
+"""
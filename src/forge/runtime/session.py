@@ -1,16 +1,71 @@
+import os
 import nbformat
-from typing import Any, Dict
-from .interface import ExecutionResult, NotebookSession, Cell, CellStatus, NotebookState
-from .kernel import JupyterKernel
+from typing import Any, Dict, List, Optional
+from loguru import logger
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from .cell_log import CellLog, output_size, truncate_output
+from .interface import ExecutionResult, Kernel, NotebookSession, Cell, CellStatus, NotebookState, OutputCallback, SessionEventCallback, append_output
+from .kernel import AsyncJupyterKernel
+
+class NotebookSettings(BaseSettings):
+    """
+    Notebook memory configuration settings.
+    Reads from environment variables or .env file.
+    Prefix: NOTEBOOK_
+    """
+    notebook_cell_output_budget: int = 64 * 1024
+    notebook_session_output_budget: int = 4 * 1024 * 1024
+    notebook_cell_log_dir: str = os.path.join("storage", "cell_logs")
+
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        env_file_encoding="utf-8",
+        extra="ignore"
+    )
+
 
 class JupyterNotebookSession(NotebookSession):
     """
     A session that manages a Jupyter Notebook and its associated Kernel.
+
+    Memory held by cell outputs is bounded: a cell whose outputs exceed
+    ``cell_output_budget`` bytes keeps a head/tail truncated copy, and when all
+    cells together exceed ``session_output_budget`` the oldest cells are cut
+    down to a summary. Internal cells only ever keep a summary. Full outputs of
+    truncated cells are written to ``cell_log`` and fetched with ``get_cell_outputs``.
+
+    ``on_event`` is notified when a cell starts, produces an output and finishes,
+    so the notebook can be pushed to clients instead of polled.
     """
 
-    def __init__(self, name: str = "notebook"):
+    # Characters of each output kept for internal cells and evicted cells
+    SUMMARY_LIMIT = 500
+
+    def __init__(
+        self,
+        name: str = "notebook",
+        kernel: Optional[Kernel] = None,
+        cell_timeout: Optional[float] = None,
+        cell_output_budget: Optional[int] = None,
+        session_output_budget: Optional[int] = None,
+        cell_log: Optional[CellLog] = None,
+        on_event: Optional[SessionEventCallback] = None,
+    ):
         self.name = name
-        self.kernel = JupyterKernel()
+        self.kernel = kernel or AsyncJupyterKernel()
+        # Default wall-clock deadline for each cell, in seconds (None = no limit)
+        self.cell_timeout = cell_timeout
+        # Output byte budgets (None = unbounded)
+        self.cell_output_budget = cell_output_budget
+        self.session_output_budget = session_output_budget
+        self.cell_log = cell_log
+        self.on_event = on_event
+        self._output_bytes = 0
+        # Bumped on every change; each cell records the version of its last change
+        self.version = 0
+        self._cell_cache: Dict[str, Cell] = {}
+        # Index of the test step being executed; new cells are tagged with it
+        self.current_step: Optional[int] = None
         # Initialize an empty notebook (v4)
         self.notebook = nbformat.v4.new_notebook()
         self.notebook.metadata.kernelspec = {
@@ -27,25 +82,63 @@ class JupyterNotebookSession(NotebookSession):
         """Stop the session and the underlying kernel."""
         self.kernel.stop()
 
-    async def add_cell(self, code: str) -> ExecutionResult:
-        """Add a cell, execute it, and record the result asynchronously."""
+    async def add_cell(
+        self,
+        code: str,
+        on_output: Optional[OutputCallback] = None,
+        timeout: Optional[float] = None,
+        internal: bool = False,
+    ) -> ExecutionResult:
+        """
+        Add a cell, execute it, and record the result asynchronously.
+        Outputs are appended to the cell as they arrive, so the cell can be
+        rendered while it is still running. A cell running longer than
+        ``timeout`` (or the session's ``cell_timeout``) is interrupted.
+        Internal cells (tool plumbing rather than test actions) only keep a
+        summary of their outputs in the notebook; the returned result is complete.
+        """
         # 1. Create a notebook cell with RUNNING status
         cell = nbformat.v4.new_code_cell(source=code)
         # Store status in metadata so we can retrieve it later
         cell.metadata["status"] = CellStatus.RUNNING
+        if internal:
+            cell.metadata["internal"] = True
+        if self.current_step is not None:
+            cell.metadata["step"] = self.current_step
         self.notebook.cells.append(cell)
+        self._touch(cell)
+        self._emit("cell_started", {"cell_id": cell.id, "code": code, "internal": internal})
+        # Bytes of output pushed to listeners, held to the cell's budget like the stored outputs
+        pushed = 0
+
+        def _on_output(output: Dict[str, Any]) -> None:
+            nonlocal pushed
+            # ExecutionResult.outputs are nbformat-compliant dicts;
+            # nbformat.from_dict converts them to nodes for consistency.
+            append_output(cell.outputs, nbformat.from_dict(output))
+            self._touch(cell)
+            # Internal cells only keep a summary, so their raw outputs aren't pushed either.
+            # Past the budget nothing more is pushed; cell_finished tells listeners to read the stored copy.
+            budget = self.cell_output_budget
+            if not internal and (budget is None or pushed < budget):
+                event_output = output
+                if budget is not None and pushed + output_size(output) > budget:
+                    # Cut down to what is left of the budget, never past it
+                    event_output = truncate_output(output, budget - pushed)
+                    pushed = budget
+                elif budget is not None:
+                    pushed += output_size(output)
+                self._emit("cell_output", {"cell_id": cell.id, "output": event_output})
+            if on_output:
+                on_output(output)
 
         try:
-            # 2. Execute the code
-            result = await self.kernel.aexecute(code)
-            
-            # 3. Populate outputs directly from ExecutionResult
-            # Since ExecutionResult.outputs is already a list of nbformat-compliant dicts
-            
-            # Convert plain dicts to nbformat nodes for consistency, 
-            # though simple dict assignment often works in many tools.
-            # nbformat.from_dict handles validation better.
-            cell.outputs = [nbformat.from_dict(out) for out in result.outputs]
+            # 2. Execute the code, streaming outputs into the cell
+            result = await self.kernel.aexecute(
+                code,
+                on_output=_on_output,
+                timeout=self.cell_timeout if timeout is None else timeout,
+            )
 
             if result.is_success:
                 cell.metadata["status"] = CellStatus.SUCCESS
@@ -56,24 +149,124 @@ class JupyterNotebookSession(NotebookSession):
         except Exception:
             cell.metadata["status"] = CellStatus.ERROR
             raise
+        finally:
+            self._enforce_budgets(cell)
+            self._touch(cell)
+            self._emit("cell_finished", {
+                "cell_id": cell.id,
+                "status": cell.metadata["status"],
+                "truncated": cell.metadata.get("truncated", False),
+            })
+
+    def _touch(self, cell) -> None:
+        """Record that a cell changed."""
+        self.version += 1
+        cell.metadata["revision"] = self.version
+
+    def _emit(self, event_type: str, data: Dict[str, Any]) -> None:
+        if self.on_event is None:
+            return
+        try:
+            self.on_event(event_type, data)
+        except Exception as e:
+            # A broken listener must not fail the cell
+            logger.warning(f"Session event listener failed: {e}")
+
+    def _truncate_cell(self, cell, limit: int) -> None:
+        """Replace a cell's outputs with truncated copies, logging the full ones first."""
+        if self.cell_log is not None and cell.id not in self.cell_log:
+            self.cell_log.append(cell.id, [dict(out) for out in cell.outputs])
+        cell.outputs = [nbformat.from_dict(truncate_output(out, limit)) for out in cell.outputs]
+        cell.metadata["truncated"] = True
+
+    def _cell_bytes(self, cell) -> int:
+        return sum(output_size(out) for out in cell.outputs)
+
+    def _enforce_budgets(self, cell) -> None:
+        """Bound the memory held by a finished cell and by the whole session."""
+        size = self._cell_bytes(cell)
+        if cell.metadata.get("internal"):
+            if size > self.SUMMARY_LIMIT:
+                self._truncate_cell(cell, self.SUMMARY_LIMIT)
+        elif self.cell_output_budget is not None and size > self.cell_output_budget:
+            # Leave room for the JSON overhead of each output
+            limit = max(self.SUMMARY_LIMIT, self.cell_output_budget // max(1, len(cell.outputs)) - 200)
+            self._truncate_cell(cell, limit)
+        cell.metadata["output_bytes"] = self._cell_bytes(cell)
+        self._output_bytes += cell.metadata["output_bytes"]
+
+        if self.session_output_budget is None:
+            return
+
+        # Evict the oldest cells down to a summary until we're under budget
+        for old in self.notebook.cells:
+            if self._output_bytes <= self.session_output_budget:
+                break
+            if old.metadata.get("status") == CellStatus.RUNNING:
+                continue
+            before = old.metadata.get("output_bytes", 0)
+            if before <= self.SUMMARY_LIMIT:
+                continue
+            self._truncate_cell(old, self.SUMMARY_LIMIT)
+            self._touch(old)
+            old.metadata["output_bytes"] = self._cell_bytes(old)
+            self._output_bytes -= before - old.metadata["output_bytes"]
+
+    def get_cell_outputs(self, cell_id: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Return the full outputs of a cell, reading them back from the cell log
+        if they were truncated in memory. Returns None for an unknown cell.
+        """
+        if self.cell_log is not None:
+            outputs = self.cell_log.get(cell_id)
+            if outputs is not None:
+                return outputs
+        for cell in self.notebook.cells:
+            if cell.id == cell_id:
+                return [dict(out) for out in cell.outputs]
+        return None
 
     def get_notebook_json(self) -> Dict[str, Any]:
         """Return the current state of the notebook in nbformat JSON."""
         return dict(self.notebook)
 
-    def get_state(self) -> NotebookState:
-        """Return the current state of the notebook for UI rendering."""
+    def get_state(self, since: Optional[int] = None) -> NotebookState:
+        """
+        Return the current state of the notebook for UI rendering.
+        With ``since``, only cells changed after that version are returned.
+        """
         cells = []
         for nb_cell in self.notebook.cells:
+            if since is not None and nb_cell.metadata.get("revision", 0) <= since:
+                continue
+            cells.append(self._cell(nb_cell))
+        return NotebookState(cells=cells, version=self.version)
+
+    def get_cell(self, cell_id: str) -> Optional[Cell]:
+        """Return one cell for UI rendering, or None for an unknown cell."""
+        # Recent cells are the ones asked for, so look from the end
+        for nb_cell in reversed(self.notebook.cells):
+            if nb_cell.id == cell_id:
+                return self._cell(nb_cell)
+        return None
+
+    def _cell(self, nb_cell) -> Cell:
+        revision = nb_cell.metadata.get("revision", 0)
+        # Unchanged cells are not rebuilt
+        cached = self._cell_cache.get(nb_cell.id)
+        if cached is None or cached.revision != revision:
             status = nb_cell.metadata.get("status", CellStatus.PENDING)
-            cells.append(Cell(
+            cached = Cell(
                 id=nb_cell.id,
                 source=nb_cell.source,
                 status=status,
                 outputs=nb_cell.outputs,
-                execution_count=nb_cell.execution_count
-            ))
-        return NotebookState(cells=cells)
+                execution_count=nb_cell.execution_count,
+                truncated=nb_cell.metadata.get("truncated", False),
+                revision=revision
+            )
+            self._cell_cache[nb_cell.id] = cached
+        return cached
 
     def save(self, path: str) -> None:
         """Save the notebook to disk."""
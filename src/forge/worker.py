@@ -0,0 +1,129 @@
+import asyncio
+import os
+import signal
+import socket
+from typing import Optional, Set
+
+from loguru import logger
+
+from .api.job_queue import Job, JobQueue, WorkerSettings
+from .api.models import TaskStatus
+from .api.repository import InMemoryTaskRepository
+from .api.runner import run_task
+from .api.scheduler import SchedulerSettings
+from .api.store import store
+
+
+class Worker:
+    """
+    Claims task runs from the job queue and executes them in this process,
+    recording progress in the shared task store.
+
+    Up to ``concurrency`` runs execute at once. Each claimed job is kept alive
+    with heartbeats, so that if this process dies its jobs go back to the queue.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        concurrency: int = 1,
+        poll_interval: float = 1.0,
+        max_attempts: int = 3,
+        worker_id: Optional[str] = None,
+    ):
+        self.queue = queue
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self._active: Set[asyncio.Task] = set()
+
+    @classmethod
+    def from_settings(cls, settings: Optional[WorkerSettings] = None, concurrency: Optional[int] = None) -> "Worker":
+        settings = settings or WorkerSettings()
+        queue = JobQueue(
+            settings.worker_queue_path,
+            lease_timeout=settings.worker_lease_timeout,
+            max_per_base_url=SchedulerSettings().scheduler_max_per_base_url,
+        )
+        return cls(
+            queue,
+            concurrency=concurrency or settings.worker_concurrency,
+            poll_interval=settings.worker_poll_interval,
+            max_attempts=settings.worker_max_attempts,
+        )
+
+    async def run(self, stop: Optional[asyncio.Event] = None) -> None:
+        """Execute jobs until ``stop`` is set, then finish the runs in progress."""
+        stop = stop or asyncio.Event()
+        if isinstance(store.repository, InMemoryTaskRepository):
+            raise ValueError("Workers require a shared task store (STORE_BACKEND=sqlite).")
+        store.kernel_pool.start()
+        if store.browser_pool:
+            store.browser_pool.start()
+        logger.info(f"Worker {self.worker_id} started with concurrency {self.concurrency}.")
+        try:
+            while not stop.is_set():
+                while len(self._active) < self.concurrency:
+                    job = self.queue.claim(self.worker_id)
+                    if job is None:
+                        break
+                    task = asyncio.create_task(self._execute(job))
+                    self._active.add(task)
+                    task.add_done_callback(self._active.discard)
+                try:
+                    await asyncio.wait_for(stop.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+            if self._active:
+                logger.info(f"Worker {self.worker_id} waiting for {len(self._active)} runs to finish.")
+                await asyncio.gather(*self._active, return_exceptions=True)
+        finally:
+            store.kernel_pool.close()
+            store.tenant_kernels.close()
+            if store.browser_pool:
+                store.browser_pool.close()
+            store.close()
+            self.queue.close()
+
+    async def _execute(self, job: Job) -> None:
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        try:
+            if store.get_task(job.task_id) is None:
+                return
+            if job.attempts > self.max_attempts:
+                store.append_log(job.task_id, "ERROR", f"Giving up after {job.attempts - 1} interrupted attempts.")
+                store.update_status(job.task_id, TaskStatus.FAILED)
+                return
+            store.append_log(
+                job.task_id, "INFO", f"Claimed by worker {self.worker_id} after {job.wait_seconds:.1f}s in queue."
+            )
+            await run_task(job.task_id)
+        except Exception as e:
+            logger.error(f"Worker {self.worker_id} failed to run task {job.task_id}: {e}")
+            store.update_status(job.task_id, TaskStatus.ERROR)
+        finally:
+            heartbeat.cancel()
+            # The notebook isn't served from here; the store keeps its cell summaries
+            store.close_session(job.task_id)
+            store.repository.detach(job.task_id)
+            self.queue.complete(job.id)
+
+    async def _heartbeat(self, job: Job) -> None:
+        while True:
+            await asyncio.sleep(self.queue.lease_timeout / 3)
+            self.queue.heartbeat(job.id)
+
+
+def run_worker(concurrency: Optional[int] = None) -> None:
+    """Run a worker until SIGINT or SIGTERM."""
+    worker = Worker.from_settings(concurrency=concurrency)
+
+    async def main():
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        await worker.run(stop)
+
+    asyncio.run(main())
@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import forge.api.runner as runner
+import forge.api.storage as storage
+from forge.api.models import TaskStatus
+from forge.api.repository import InMemoryTaskRepository
+from forge.api.scheduler import TaskScheduler
+from forge.api.server import app
+from forge.api.store import store
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def clean_store(monkeypatch, tmp_path):
+    store.repository = InMemoryTaskRepository()
+    monkeypatch.setattr(store, "scheduler", TaskScheduler(max_concurrency=8, max_per_base_url=0))
+    store.suites.clear()
+    monkeypatch.setattr(storage, "STORAGE_DIR", str(tmp_path))
+    yield
+
+
+@pytest.fixture
+def runs(monkeypatch):
+    """Replace task runs with ones that pass unless the testcase says `fail`."""
+    started = []
+    running = {"now": 0, "max": 0}
+
+    async def fake_run_task(task_id):
+        started.append(task_id)
+        running["now"] += 1
+        running["max"] = max(running["max"], running["now"])
+        store.update_status(task_id, TaskStatus.RUNNING)
+        await asyncio.sleep(0.01)
+        running["now"] -= 1
+        failed = "fail" in store.get_task(task_id).yaml_content
+        store.update_status(task_id, TaskStatus.FAILED if failed else TaskStatus.COMPLETED)
+
+    monkeypatch.setattr(runner, "run_task", fake_run_task)
+    return {"started": started, "running": running}
+
+
+def _write(tmp_path, path, content="steps:\n  - content: open"):
+    file = tmp_path / path
+    file.parent.mkdir(parents=True, exist_ok=True)
+    file.write_text(content)
+
+
+def test_suite_from_directory_and_pattern(client, tmp_path, runs):
+    _write(tmp_path, "nightly/a.yaml")
+    _write(tmp_path, "nightly/deep/b.yml")
+    _write(tmp_path, "nightly/notes.txt")
+    _write(tmp_path, "other/c.yaml")
+
+    response = client.post("/api/v1/suites", json={
+        "name": "nightly",
+        "directory": "nightly",
+        "pattern": "*/c.yaml",
+        "testcase_files": ["nightly/a.yaml"],
+        "parallelism": 2,
+    })
+    assert response.status_code == 202
+    assert response.json()["status"] == "pending"
+    suite_id = response.json()["id"]
+
+    suite = client.get(f"/api/v1/suites/{suite_id}").json()
+    assert suite["status"] == "passed"
+    assert suite["counts"]["total"] == 3
+    assert suite["counts"]["completed"] == 3
+    assert suite["duration_seconds"] > 0
+    assert runs["running"]["max"] == 2
+
+    tasks = client.get("/api/v1/tasks", params={"suite_id": suite_id}).json()
+    assert sorted(t["name"] for t in tasks) == ["nightly/a.yaml", "nightly/deep/b.yml", "other/c.yaml"]
+    assert [s["id"] for s in client.get("/api/v1/suites").json()] == [suite_id]
+
+
+def test_suite_run_all(client, runs):
+    docs = ["name: one\nsteps: []", "name: two\nsteps: [fail]", "steps: []"]
+    suite = client.post("/api/v1/suites", json={"name": "batch", "yaml_contents": docs, "parallelism": 1}).json()
+
+    suite = client.get(f"/api/v1/suites/{suite['id']}").json()
+    assert suite["status"] == "failed"
+    assert suite["counts"]["completed"] == 2
+    assert suite["counts"]["failed"] == 1
+    assert suite["stopped"] is False
+    assert [store.get_task(t).name for t in suite["task_ids"]] == ["one", "two", "batch #3"]
+
+
+def test_suite_fail_fast(client, runs):
+    docs = ["steps: []", "steps: [fail]", "steps: []", "steps: []"]
+    suite = client.post("/api/v1/suites", json={
+        "name": "batch", "yaml_contents": docs, "parallelism": 1, "mode": "fail_fast",
+    }).json()
+
+    suite = client.get(f"/api/v1/suites/{suite['id']}").json()
+    assert suite["status"] == "failed"
+    assert suite["stopped"] is True
+    assert suite["counts"] == {"total": 4, "pending": 2, "queued": 0, "running": 0, "completed": 1, "failed": 1}
+    assert len(runs["started"]) == 2
+
+
+def test_create_suite_errors(client):
+    assert client.post("/api/v1/suites", json={"name": "empty", "directory": "missing"}).status_code == 400
+    response = client.post("/api/v1/suites", json={"name": "bad", "testcase_files": ["missing.yaml"]})
+    assert response.status_code == 400
+    assert store.list_tasks() == []
+    assert client.post("/api/v1/suites", json={"name": "bad", "yaml_contents": ["steps: []"], "parallelism": 0}).status_code == 422
+    assert client.get("/api/v1/suites/non-existent").status_code == 404
+
+
+def test_find_testcases_stays_in_storage(tmp_path):
+    _write(tmp_path, "a.yaml")
+    assert storage.find_testcases("**/*.yaml") == ["a.yaml"]
+    assert storage.find_testcases("../*") == []
@@ -1,8 +1,12 @@
 import pytest
 import asyncio
+import json
 from fastapi.testclient import TestClient
 from forge.api.server import app
 from forge.api.store import store
+from forge.api.repository import InMemoryTaskRepository
+from forge.api.models import StepStatus, TaskEventType, TaskStatus
+from forge.runtime.interface import KernelBackend
 
 @pytest.fixture
 def client():
@@ -11,8 +15,7 @@ def client():
 @pytest.fixture(autouse=True)
 def clean_store():
     # Clean up the store before each test
-    store._tasks.clear()
-    store._executions.clear()
+    store.repository = InMemoryTaskRepository()
     store._sessions.clear() # Clear sessions too
     yield
 
@@ -146,3 +149,255 @@ def test_create_and_run_task_with_file(client):
         
     assert found, "Did not find expected startup log message"
 
+
+def test_create_task_with_backend(client):
+    response = client.post("/api/v1/tasks", json={"name": "Task 1", "yaml_content": "steps: []"})
+    assert response.json()["backend"] == "jupyter"
+
+    response = client.post("/api/v1/tasks", json={"name": "Task 2", "yaml_content": "steps: []", "backend": "inprocess"})
+    assert response.status_code == 201
+    assert response.json()["backend"] == "inprocess"
+
+    response = client.post("/api/v1/tasks", json={"name": "Task 3", "yaml_content": "steps: []", "backend": "unknown"})
+    assert response.status_code == 422
+
+def test_rerun_gets_a_new_session():
+    first = store.create_session("t1", backend=KernelBackend.INPROCESS)
+    assert store.create_session("t1", backend=KernelBackend.INPROCESS) is first
+    store.stop_session("t1")
+    # The stopped session stays readable, but a rerun doesn't reuse its released kernel
+    assert store.get_session("t1") is first
+    second = store.create_session("t1", backend=KernelBackend.INPROCESS)
+    assert second is not first and second.kernel is not first.kernel
+    store.close_session("t1")
+
+def test_llm_cache(client, tmp_path):
+    from forge.llm_cache import LLMResponseCache
+
+    response = client.post("/api/v1/tasks", json={"name": "Task 1", "yaml_content": "steps: []", "llm_cache": True})
+    assert response.json()["llm_cache"] is True
+    assert client.post("/api/v1/tasks", json={"name": "Task 2", "yaml_content": "steps: []"}).json()["llm_cache"] is None
+
+    cache, store.llm_cache = store.llm_cache, LLMResponseCache(str(tmp_path / "llm.db"))
+    try:
+        assert store.llm_cache.lookup("prompt", "model") is None
+        data = client.get("/api/v1/llm-cache").json()
+        assert (data["hits"], data["misses"], data["entries"], data["hit_rate"]) == (0, 1, 0, 0.0)
+        assert client.delete("/api/v1/llm-cache").status_code == 204
+        assert client.get("/api/v1/llm-cache").json()["misses"] == 0
+    finally:
+        store.llm_cache.close()
+        store.llm_cache = cache
+
+def test_get_cell_outputs_not_found(client):
+    response = client.get("/api/v1/tasks/non-existent/cells/abc/outputs")
+    assert response.status_code == 404
+
+def test_get_execution_with_cursor(client):
+    from forge.runtime.inprocess import InProcessKernel
+    from forge.runtime.session import JupyterNotebookSession
+
+    create_res = client.post("/api/v1/tasks", json={"name": "Task 1", "yaml_content": "steps: []"})
+    task_id = create_res.json()["id"]
+    session = JupyterNotebookSession(kernel=InProcessKernel())
+    session.start()
+    store._sessions[task_id] = session
+    asyncio.run(session.add_cell("print('hello')"))
+
+    data = client.get(f"/api/v1/tasks/{task_id}/execution").json()
+    assert len(data["cells"]) == 1
+    cursor = data["cursor"]
+
+    data = client.get(f"/api/v1/tasks/{task_id}/execution", params={"since": cursor}).json()
+    assert data["cells"] == []
+    assert data["cursor"] == cursor
+
+    asyncio.run(session.add_cell("1 + 1"))
+    data = client.get(f"/api/v1/tasks/{task_id}/execution", params={"since": cursor}).json()
+    assert [c["code"] for c in data["cells"]] == ["1 + 1"]
+
+def _read_events(response):
+    events = []
+    for block in response.text.split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if fields:
+            events.append(fields)
+    return events
+
+def test_stream_task_events(client):
+    create_res = client.post("/api/v1/tasks", json={"name": "Task 1", "yaml_content": "steps:\n  - content: open"})
+    task_id = create_res.json()["id"]
+
+    store.update_status(task_id, TaskStatus.RUNNING)
+    store.append_log(task_id, "INFO", "hello")
+    store.update_step(task_id, 0, status=StepStatus.COMPLETED, screenshot="/screenshots/x.png")
+    store.update_status(task_id, TaskStatus.COMPLETED)
+    store.events.publish(task_id, TaskEventType.END)
+
+    response = client.get(f"/api/v1/tasks/{task_id}/events")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _read_events(response)
+    assert [e["event"] for e in events] == ["task_status", "log", "step_status", "screenshot", "task_status", "end"]
+    assert json.loads(events[1]["data"])["data"]["message"] == "hello"
+    assert json.loads(events[3]["data"])["data"] == {"index": 0, "url": "/screenshots/x.png"}
+
+    # Resume after the log event
+    response = client.get(f"/api/v1/tasks/{task_id}/events", headers={"Last-Event-ID": events[1]["id"]})
+    assert [e["event"] for e in _read_events(response)] == ["step_status", "screenshot", "task_status", "end"]
+
+    # A client already caught up on a finished task gets an empty stream instead of heartbeats
+    response = client.get(f"/api/v1/tasks/{task_id}/events", headers={"Last-Event-ID": events[-1]["id"]})
+    assert response.status_code == 200
+    assert _read_events(response) == []
+
+def test_stream_task_events_not_found(client):
+    response = client.get("/api/v1/tasks/non-existent/events")
+    assert response.status_code == 404
+
+def test_execution_state_last_event_id(client):
+    create_res = client.post("/api/v1/tasks", json={"name": "Task 1", "yaml_content": "steps: []"})
+    task_id = create_res.json()["id"]
+    store.append_log(task_id, "INFO", "hello")
+
+    data = client.get(f"/api/v1/tasks/{task_id}/execution").json()
+    assert data["last_event_id"] == 1
+
+    store.update_status(task_id, TaskStatus.COMPLETED)
+    store.events.publish(task_id, TaskEventType.END)
+    response = client.get(f"/api/v1/tasks/{task_id}/events", params={"last_event_id": data["last_event_id"]})
+    assert [e["event"] for e in _read_events(response)] == ["task_status", "end"]
+
+def test_get_execution_deltas_and_limit(client):
+    create_res = client.post("/api/v1/tasks", json={"name": "Task 1", "yaml_content": "steps: []"})
+    task_id = create_res.json()["id"]
+    for i in range(5):
+        store.append_log(task_id, "INFO", f"log {i}")
+
+    data = client.get(f"/api/v1/tasks/{task_id}/execution", params={"limit": 2}).json()
+    assert [log["message"] for log in data["logs"]] == ["log 0", "log 1"]
+    assert data["has_more"] is True
+
+    data = client.get(f"/api/v1/tasks/{task_id}/execution", params={"since_log_seq": data["log_seq"], "limit": 2}).json()
+    assert [log["seq"] for log in data["logs"]] == [3, 4]
+
+    data = client.get(f"/api/v1/tasks/{task_id}/execution", params={"since_log_seq": data["log_seq"]}).json()
+    assert [log["message"] for log in data["logs"]] == ["log 4"]
+    assert data["has_more"] is False
+    assert data["log_seq"] == 5
+
+def test_get_execution_cells_with_limit(client):
+    from forge.runtime.inprocess import InProcessKernel
+    from forge.runtime.session import JupyterNotebookSession
+
+    create_res = client.post("/api/v1/tasks", json={"name": "Task 1", "yaml_content": "steps: []"})
+    task_id = create_res.json()["id"]
+    session = JupyterNotebookSession(kernel=InProcessKernel())
+    session.start()
+    store._sessions[task_id] = session
+    for i in range(3):
+        asyncio.run(session.add_cell(str(i)))
+
+    data = client.get(f"/api/v1/tasks/{task_id}/execution", params={"limit": 2}).json()
+    assert [c["code"] for c in data["cells"]] == ["0", "1"]
+    assert data["has_more"] is True
+
+    data = client.get(f"/api/v1/tasks/{task_id}/execution", params={"since_cell_version": data["cursor"], "limit": 2}).json()
+    assert [c["code"] for c in data["cells"]] == ["2"]
+    assert data["has_more"] is False
+
+def test_get_execution_etag(client):
+    create_res = client.post("/api/v1/tasks", json={"name": "Task 1", "yaml_content": "steps: []"})
+    task_id = create_res.json()["id"]
+    store.append_log(task_id, "INFO", "hello")
+
+    response = client.get(f"/api/v1/tasks/{task_id}/execution")
+    etag = response.headers["etag"]
+
+    response = client.get(f"/api/v1/tasks/{task_id}/execution", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    # Different parameters are a different representation
+    response = client.get(f"/api/v1/tasks/{task_id}/execution", params={"since_log_seq": 1}, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+
+    store.append_log(task_id, "INFO", "again")
+    response = client.get(f"/api/v1/tasks/{task_id}/execution", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert len(response.json()["logs"]) == 2
+
+def test_list_tasks_cursor_and_filters(client):
+    for i in range(5):
+        client.post("/api/v1/tasks", json={"name": f"{'smoke' if i % 2 else 'login'} {i}", "yaml_content": "..."})
+
+    response = client.get("/api/v1/tasks", params={"limit": 2, "include_total": True})
+    assert [t["name"] for t in response.json()] == ["login 4", "smoke 3"]
+    assert response.headers["x-total-count"] == "5"
+    cursor = response.headers["x-next-cursor"]
+
+    response = client.get("/api/v1/tasks", params={"limit": 2, "after": cursor})
+    assert [t["name"] for t in response.json()] == ["login 2", "smoke 1"]
+    assert "x-total-count" not in response.headers
+
+    response = client.get("/api/v1/tasks", params={"name_prefix": "smoke", "status": "pending"})
+    assert [t["name"] for t in response.json()] == ["smoke 3", "smoke 1"]
+    assert "x-next-cursor" not in response.headers
+
+    assert client.get("/api/v1/tasks", params={"after": "garbage"}).status_code == 400
+
+def test_get_task_queue(client):
+    create_res = client.post("/api/v1/tasks", json={"name": "Task 1", "yaml_content": "steps: []"})
+    task_id = create_res.json()["id"]
+
+    data = client.get(f"/api/v1/tasks/{task_id}/queue").json()
+    assert data["task_id"] == task_id
+    assert data["position"] is None
+    assert client.get("/api/v1/tasks/non-existent/queue").status_code == 404
+
+def test_start_task_with_worker_queue(client, tmp_path):
+    from forge.api.job_queue import JobQueue
+    from forge.api.sqlite_repository import SQLiteTaskRepository
+
+    store.repository = SQLiteTaskRepository(str(tmp_path / "forge.db"))
+    store.job_queue = JobQueue(str(tmp_path / "jobs.db"))
+    try:
+        task_id = client.post("/api/v1/tasks", json={"name": "Task 1", "yaml_content": "steps: []"}).json()["id"]
+        response = client.post(f"/api/v1/tasks/{task_id}/start", json={"priority": "high"})
+        assert response.status_code == 202
+
+        # Queued for a worker rather than run in the API process
+        assert client.get(f"/api/v1/tasks/{task_id}").json()["status"] == "queued"
+        queue_info = client.get(f"/api/v1/tasks/{task_id}/queue").json()
+        assert queue_info["position"] == 1
+        assert queue_info["priority"] == "high"
+        assert client.post(f"/api/v1/tasks/{task_id}/start").status_code == 409
+
+        job = store.job_queue.claim("w1")
+        assert job.task_id == task_id
+    finally:
+        store.job_queue.close()
+        store.job_queue = None
+
+def test_export_task(client):
+    from forge.runtime.inprocess import InProcessKernel
+    from forge.runtime.session import JupyterNotebookSession
+
+    yaml_content = "name: Search\nsteps:\n  - id: 1\n    type: action\n    content: open"
+    task_id = client.post("/api/v1/tasks", json={"name": "Nightly search", "yaml_content": yaml_content}).json()["id"]
+    assert client.get(f"/api/v1/tasks/{task_id}/export").status_code == 409
+
+    store.update_status(task_id, TaskStatus.COMPLETED)
+    assert client.get(f"/api/v1/tasks/{task_id}/export").status_code == 404
+
+    session = JupyterNotebookSession(kernel=InProcessKernel())
+    session.start()
+    session.current_step = 0
+    asyncio.run(session.add_cell("opened = True"))
+    store._sessions[task_id] = session
+
+    response = client.get(f"/api/v1/tasks/{task_id}/export")
+    assert response.status_code == 200
+    assert response.headers["content-disposition"] == 'attachment; filename="test_nightly_search.py"'
+    assert "# Step 1: open\n            opened = True" in response.text
+    assert client.get("/api/v1/tasks/non-existent/export").status_code == 404
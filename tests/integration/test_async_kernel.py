@@ -0,0 +1,84 @@
+import asyncio
+import pytest
+import pytest_asyncio
+from forge.runtime.kernel import AsyncJupyterKernel
+
+@pytest_asyncio.fixture
+async def kernel():
+    k = AsyncJupyterKernel()
+    await k.astart()
+    yield k
+    await k.astop()
+
+@pytest.mark.asyncio
+async def test_async_kernel_simple_math(kernel):
+    result = await kernel.aexecute("1 + 1")
+    assert result.is_success
+    assert result.text_result == "2"
+
+@pytest.mark.asyncio
+async def test_async_kernel_error(kernel):
+    result = await kernel.aexecute("raise ValueError('fail')")
+    assert not result.is_success
+    assert result.error["ename"] == "ValueError"
+
+@pytest.mark.asyncio
+async def test_async_kernel_routes_outputs_by_msg_id(kernel):
+    # Executions queue up in the kernel; each caller must only see its own outputs
+    codes = [f"import time; time.sleep(0.05); print('cell-{i}')" for i in range(5)]
+    results = await asyncio.gather(*(kernel.aexecute(code) for code in codes))
+
+    for i, result in enumerate(results):
+        assert result.is_success
+        assert result.stdout == f"cell-{i}\n"
+
+def test_async_kernel_sync_execute():
+    k = AsyncJupyterKernel()
+    k.start()
+    try:
+        result = k.execute("print('sync')")
+        assert result.is_success
+        assert result.stdout == "sync\n"
+    finally:
+        k.stop()
+
+@pytest.mark.asyncio
+async def test_async_kernel_streams_outputs(kernel):
+    code = "import sys\nfor i in range(3):\n    print(i, flush=True)\nsys.stderr.write('err\\n')\n'done'"
+    outputs = [out async for out in kernel.astream(code)]
+    assert outputs[-1]["output_type"] == "execute_result"
+
+    # The collected result merges consecutive chunks of the same stream
+    result = await kernel.aexecute(code)
+    assert [out["output_type"] for out in result.outputs] == ["stream", "stream", "execute_result"]
+    assert result.stdout == "0\n1\n2\n"
+    assert result.stderr == "err\n"
+
+@pytest.mark.asyncio
+async def test_async_kernel_deadline_interrupts(kernel):
+    result = await kernel.aexecute("import time\nprint('start', flush=True)\ntime.sleep(30)", timeout=1)
+    assert not result.is_success
+    assert result.error["ename"] == "TimeoutError"
+    assert result.stdout == "start\n"
+
+    # The kernel was interrupted and drained, the next execution is clean
+    result = await kernel.aexecute("'after'")
+    assert result.is_success
+    assert result.text_result == "'after'"
+
+@pytest.mark.asyncio
+async def test_async_kernel_deadline_is_total(kernel):
+    # Chatty cells are bounded by the deadline too
+    code = "import time\nwhile True:\n    print('.', flush=True)\n    time.sleep(0.1)"
+    result = await kernel.aexecute(code, timeout=1)
+    assert result.error["ename"] == "TimeoutError"
+
+@pytest.mark.asyncio
+async def test_async_kernel_deadline_restarts_unresponsive_kernel(kernel):
+    kernel.INTERRUPT_GRACE = 1
+    # SIGINT doesn't break a top-level await, the kernel is restarted instead
+    result = await kernel.aexecute("import asyncio\nawait asyncio.sleep(30)", timeout=1)
+    assert result.outputs[-1]["ename"] == "DeadKernelError"
+
+    result = await kernel.aexecute("1 + 1")
+    assert result.text_result == "2"
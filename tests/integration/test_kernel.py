@@ -54,3 +54,11 @@ async def test_async_execution(kernel):
     result = await kernel.aexecute("import time; time.sleep(0.1); print('async')")
     assert result.is_success
     assert "async" in result.stdout
+
+def test_kernel_deadline_interrupts(kernel):
+    result = kernel.execute("import time; time.sleep(30)", timeout=1)
+    assert not result.is_success
+    assert result.error["ename"] == "TimeoutError"
+
+    result = kernel.execute("1 + 1")
+    assert result.text_result == "2"
@@ -0,0 +1,72 @@
+import time
+import pytest
+from forge.runtime.pool import KernelPool
+from forge.runtime.profile import KernelProfile
+
+def _wait_for_idle(pool, count, timeout=30):
+    deadline = time.time() + timeout
+    while pool.idle_count < count and time.time() < deadline:
+        time.sleep(0.1)
+    return pool.idle_count >= count
+
+@pytest.fixture
+def pool():
+    p = KernelPool(min_size=1, max_size=1)
+    p.start()
+    yield p
+    p.close()
+
+def test_pool_warms_kernels(pool):
+    assert _wait_for_idle(pool, 1)
+
+    kernel = pool.acquire()
+    result = kernel.execute("1 + 1")
+    assert result.text_result == "2"
+
+    # The pool refills in the background
+    assert _wait_for_idle(pool, 1)
+    pool.release(kernel)
+
+def test_pool_recycles_kernels():
+    pool = KernelPool(min_size=1, max_size=2)
+    pool.start()
+    try:
+        assert _wait_for_idle(pool, 1)
+        kernel = pool.acquire()
+        kernel.execute("secret = 42")
+
+        # The recycled kernel joins the refilled one
+        pool.release(kernel, recycle=True)
+        assert _wait_for_idle(pool, 2)
+
+        kernels = [pool.acquire(), pool.acquire()]
+        assert kernel in kernels
+        assert not kernel.execute("secret").is_success
+        for k in kernels:
+            pool.release(k)
+    finally:
+        pool.close()
+
+def test_acquire_without_warm_kernels():
+    pool = KernelPool(min_size=0, max_size=0)
+    kernel = pool.acquire()
+    try:
+        assert kernel.execute("1 + 1").is_success
+    finally:
+        pool.release(kernel)
+        pool.close()
+
+def test_pool_applies_profile():
+    pool = KernelPool(min_size=1, max_size=1, profile=KernelProfile(name="test", warmup_code="warm = True"))
+    pool.start()
+    try:
+        assert _wait_for_idle(pool, 1)
+        kernel = pool.acquire()
+        assert kernel.execute("warm").text_result == "True"
+        pool.release(kernel)
+    finally:
+        pool.close()
+
+def test_invalid_pool_size():
+    with pytest.raises(ValueError):
+        KernelPool(min_size=2, max_size=1)
@@ -0,0 +1,108 @@
+import asyncio
+import pytest
+from forge.runtime.multitenant import MultiTenantKernelManager
+from forge.runtime.session import JupyterNotebookSession
+from forge.runtime.interface import CellStatus
+
+@pytest.fixture
+def manager():
+    m = MultiTenantKernelManager(max_tenants=2)
+    yield m
+    m.close()
+
+@pytest.mark.asyncio
+async def test_tenants_share_a_process_with_isolated_namespaces(manager):
+    a = manager.acquire("task-a")
+    b = manager.acquire("task-b")
+    assert a.host is b.host
+    assert manager.host_count == 1
+
+    await a.aexecute("secret = 'a'")
+    await b.aexecute("secret = 'b'")
+
+    result = await a.aexecute("print(secret)\nsecret")
+    assert result.stdout == "a\n"
+    assert result.text_result == "'a'"
+    assert (await b.aexecute("secret")).text_result == "'b'"
+
+    # Kernel globals are not visible to tenants
+    assert not (await a.aexecute("__forge_run__")).is_success
+
+@pytest.mark.asyncio
+async def test_tenant_errors_and_top_level_await(manager):
+    tenant = manager.acquire("task-a")
+    result = await tenant.aexecute("import asyncio\nawait asyncio.sleep(0)\nraise ValueError('fail')")
+    assert result.error["ename"] == "ValueError"
+
+    results = await asyncio.gather(*(tenant.aexecute(f"{i} * 2") for i in range(3)))
+    assert [r.text_result for r in results] == ["0", "2", "4"]
+
+@pytest.mark.asyncio
+async def test_processes_are_packed_and_released(manager):
+    tenants = [manager.acquire(f"task-{i}") for i in range(3)]
+    assert manager.host_count == 2
+
+    await tenants[0].aexecute("x = 1")
+    tenants[0].stop()
+    assert manager.host_count == 2
+    with pytest.raises(RuntimeError):
+        await tenants[0].aexecute("x")
+
+    tenants[2].stop()
+    assert manager.host_count == 1
+
+@pytest.mark.asyncio
+async def test_session_on_tenant_kernel(manager):
+    session = JupyterNotebookSession(kernel=manager.acquire("task-a"))
+    session.start()
+    await session.add_cell("print('hello')")
+
+    state = session.get_state()
+    assert state.cells[0].status == CellStatus.SUCCESS
+    assert state.cells[0].outputs[0]['text'] == "hello\n"
+    session.stop()
+    assert manager.host_count == 0
+
+@pytest.mark.asyncio
+async def test_tenants_run_cells_concurrently(manager):
+    a = manager.acquire("task-a")
+    b = manager.acquire("task-b")
+    await asyncio.gather(a.aexecute("import asyncio"), b.aexecute("import asyncio"))
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    results = await asyncio.gather(
+        a.aexecute("await asyncio.sleep(1)\nprint('a')"),
+        b.aexecute("await asyncio.sleep(1)\nprint('b')"),
+    )
+    assert loop.time() - started < 1.8
+    assert [r.stdout for r in results] == ["a\n", "b\n"]
+
+@pytest.mark.asyncio
+async def test_tenant_deadline_cancels_only_its_cell(manager):
+    a = manager.acquire("task-a")
+    b = manager.acquire("task-b")
+    await a.aexecute("import asyncio\nx = 1")
+    await b.aexecute("y = 2")
+
+    result = await a.aexecute("await asyncio.sleep(30)", timeout=0.5)
+    assert result.error["ename"] == "TimeoutError"
+    assert (await a.aexecute("x")).text_result == "1"
+    assert (await b.aexecute("y")).text_result == "2"
+
+@pytest.mark.asyncio
+async def test_restart_is_reported_to_every_tenant(manager):
+    a = manager.acquire("task-a")
+    b = manager.acquire("task-b")
+    a.host.kernel.INTERRUPT_GRACE = 0.5
+    await b.aexecute("y = 2")
+
+    # Sync code doesn't yield to the in-kernel deadline, so the kernel is restarted
+    result = await a.aexecute("import time\ntime.sleep(30)", timeout=0.5)
+    assert result.outputs[-1]["ename"] == "DeadKernelError"
+
+    result = await b.aexecute("y")
+    assert result.error["ename"] == "DeadKernelError"
+    assert "state was lost" in result.error["evalue"]
+    # Later cells run on the restarted kernel
+    assert (await b.aexecute("y = 3\ny")).text_result == "3"
@@ -49,3 +49,34 @@ async def test_session_error_state(session):
     assert len(state.cells) == 1
     assert state.cells[0].status == CellStatus.ERROR
     assert state.cells[0].outputs[0]['ename'] == "ValueError"
+
+@pytest.mark.asyncio
+async def test_session_streams_outputs(session):
+    code = "import time\nprint('first', flush=True)\ntime.sleep(1)\nprint('second')"
+    received = []
+    # Make sure the kernel client is connected before timing anything
+    await session.add_cell("pass")
+    task = asyncio.create_task(session.add_cell(code, on_output=received.append))
+
+    # Output is visible while the cell is still running
+    await asyncio.sleep(0.5)
+    state = session.get_state()
+    assert state.cells[-1].status == CellStatus.RUNNING
+    assert state.cells[-1].outputs[0]['text'] == "first\n"
+
+    await task
+
+    # Consecutive stream chunks are merged into one output
+    state = session.get_state()
+    assert len(state.cells[-1].outputs) == 1
+    assert state.cells[-1].outputs[0]['text'] == "first\nsecond\n"
+    assert "".join(out['text'] for out in received) == "first\nsecond\n"
+
+@pytest.mark.asyncio
+async def test_session_cell_timeout(session):
+    session.cell_timeout = 1
+    await session.add_cell("import time; time.sleep(30)")
+
+    state = session.get_state()
+    assert state.cells[0].status == CellStatus.ERROR
+    assert state.cells[0].outputs[0]['ename'] == "TimeoutError"
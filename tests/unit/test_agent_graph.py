@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+import forge.llm as llm
+from forge.agent.automation_agent import TOOLS, AutomationAgent
+from forge.llm_cache import ContextLLMCache, LLMResponseCache, ScopedLLMCache, llm_cache_scope
+from forge.runtime.inprocess import InProcessKernel
+from forge.runtime.session import JupyterNotebookSession
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    llm.get_settings.cache_clear()
+    yield
+    llm.get_settings.cache_clear()
+
+
+def test_shared_per_event_loop():
+    async def get(key):
+        return llm.shared(key, object)
+
+    async def both():
+        return await get("a"), await get("a"), await get("b")
+
+    first, again, other = asyncio.run(both())
+    assert first is again and first is not other
+    # Connections can't move between loops, so each loop gets its own objects
+    assert asyncio.run(get("a")) is not first
+
+
+def test_agents_share_client_and_graph(settings):
+    async def build():
+        a, b = AutomationAgent("t1"), AutomationAgent("t2")
+        return a, b, llm.get_llm(), llm.get_llm(temperature=0.5)
+
+    a, b, client, warmer = asyncio.run(build())
+    assert a.agent is b.agent
+    assert client is not warmer
+    assert isinstance(client.cache, ContextLLMCache)
+    assert a.config()["configurable"]["task_id"] == "t1"
+
+
+def test_tools_run_in_the_task_of_the_config():
+    session = JupyterNotebookSession(kernel=InProcessKernel())
+    session.start()
+    recorded = []
+    run_code = next(tool for tool in TOOLS if tool.name == "run_playwright_code")
+    config = {"configurable": {"task_id": "t1", "session": session, "recorded_cells": recorded}}
+
+    asyncio.run(run_code.ainvoke({"code": "x = 1"}, config=config))
+    asyncio.run(run_code.ainvoke({"code": "raise ValueError()"}, config=config))
+    assert recorded == ["x = 1"]
+    assert [cell.source for cell in session.notebook.cells] == ["x = 1", "raise ValueError()"]
+
+
+def test_context_cache_follows_the_run(tmp_path):
+    model = FakeListChatModel(responses=["first", "second", "third"], cache=ContextLLMCache())
+    cache = ScopedLLMCache(LLMResponseCache(str(tmp_path / "llm.db")))
+
+    assert model.invoke("search").content == "first"
+    with llm_cache_scope(cache):
+        assert model.invoke("search").content == "second"
+        assert model.invoke("search").content == "second"
+    # Outside the scope calls reach the model again
+    assert model.invoke("search").content == "third"
+    assert (cache.hits, cache.misses) == (1, 1)
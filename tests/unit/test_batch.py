@@ -0,0 +1,104 @@
+import asyncio
+import json
+import xml.etree.ElementTree as ET
+
+import pytest
+
+import forge.batch as batch
+from forge.batch import BatchRunner, CaseOutcome, collect_testcases, run_batch
+from forge.runtime.interface import KernelBackend
+
+
+class FakeAgent:
+    """Runs each step as a cell; a step saying `fail` raises."""
+
+    def __init__(self, task_id, session, replay_cache=None, llm_cache=None):
+        self.session = session
+        self.replayed_steps = []
+        self.escalated_steps = []
+        self.checked_steps = []
+
+    async def run(self, steps, step_callback=None, replay_keys=None, routes=None, checks=None):
+        for i, step in enumerate(steps):
+            await step_callback(i, "running")
+            await self.session.add_cell("steps_run = globals().get('steps_run', 0) + 1")
+            if "fail" in step:
+                await step_callback(i, "error")
+                raise RuntimeError("assertion failed")
+            await step_callback(i, "completed")
+
+
+@pytest.fixture(autouse=True)
+def no_browser(monkeypatch):
+    # The testcases run without Playwright browsers
+    monkeypatch.setattr(batch, "build_browser_init_code", lambda env: "page = None")
+
+
+def _write(path, steps, name=None):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    lines = [f"name: {name}"] if name else []
+    lines.append("steps:")
+    lines += [f"  - id: {i}\n    type: action\n    content: {step}" for i, step in enumerate(steps)]
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+def test_collect_testcases(tmp_path):
+    a = _write(tmp_path / "suite" / "a.yaml", ["open"])
+    b = _write(tmp_path / "suite" / "sub" / "b.yml", ["open"])
+    (tmp_path / "suite" / "notes.txt").write_text("")
+    assert collect_testcases([str(tmp_path / "suite"), a]) == [a, b]
+    with pytest.raises(FileNotFoundError):
+        collect_testcases([str(tmp_path / "missing")])
+
+
+def test_batch_runner(tmp_path):
+    ok = _write(tmp_path / "ok.yaml", ["open", "search"], name="Search")
+    failing = _write(tmp_path / "failing.yaml", ["open", "fail here", "never"])
+    broken = tmp_path / "broken.yaml"
+    broken.write_text("steps: [")
+
+    finished = []
+    runner = BatchRunner(
+        parallel=2,
+        backend=KernelBackend.INPROCESS,
+        notebook_dir=str(tmp_path / "notebooks"),
+        on_result=finished.append,
+        agent_factory=FakeAgent,
+    )
+    results = asyncio.run(runner.run([ok, failing, str(broken)]))
+
+    assert [r.outcome for r in results] == [CaseOutcome.PASSED, CaseOutcome.FAILED, CaseOutcome.ERROR]
+    assert sorted(r.path for r in finished) == sorted(r.path for r in results)
+    assert results[0].name == "Search"
+    assert [s.status for s in results[1].steps] == ["completed", "error", "pending"]
+    assert results[1].message == "Step 2 failed: assertion failed"
+    assert results[0].notebook.endswith(".ipynb")
+    assert json.load(open(results[0].notebook))["cells"]
+
+
+def test_run_batch_reports(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(batch, "ForgeAgent", FakeAgent)
+    _write(tmp_path / "cases" / "ok.yaml", ["open"])
+    _write(tmp_path / "cases" / "failing.yaml", ["fail"])
+    junit, report = str(tmp_path / "out" / "junit.xml"), str(tmp_path / "out" / "report.json")
+
+    code = run_batch([str(tmp_path / "cases")], parallel=2, reports=[junit, report], backend=KernelBackend.INPROCESS, replay=False)
+    assert code == 1
+    out = capsys.readouterr().out
+    assert "PASSED" in out and "FAILED" in out
+    assert "1 passed, 1 failed, 0 errors" in out
+
+    suite = ET.parse(junit).getroot().find("testsuite")
+    assert (suite.get("tests"), suite.get("failures"), suite.get("errors")) == ("2", "1", "0")
+    failure = [case.find("failure") for case in suite.iter("testcase")]
+    assert [f is not None for f in failure] == [True, False]
+
+    data = json.load(open(report))
+    assert data["summary"]["passed"] == 1
+    assert [r["outcome"] for r in data["results"]] == ["failed", "passed"]
+
+
+def test_run_batch_bad_arguments(tmp_path):
+    assert run_batch([str(tmp_path / "missing")]) == 2
+    assert run_batch([_write(tmp_path / "ok.yaml", ["open"])], reports=["report.html"]) == 2
@@ -0,0 +1,75 @@
+import pytest
+from forge.model.testcase import BrowserType
+from forge.runtime.browser_pool import BrowserPool
+
+class FakeServer:
+    count = 0
+
+    def __init__(self, browser, headless):
+        FakeServer.count += 1
+        self.id = f"{browser.value}-{FakeServer.count}"
+        self.ws_endpoint = None
+        self.alive = False
+
+    def start(self):
+        self.ws_endpoint = f"ws://127.0.0.1:9000/{self.id}"
+        self.alive = True
+
+    def stop(self):
+        self.alive = False
+
+    def is_alive(self):
+        return self.alive
+
+@pytest.fixture
+def pool():
+    p = BrowserPool(size=2, max_contexts=3, server_factory=FakeServer)
+    yield p
+    p.close()
+
+def test_leases_are_spread_across_servers(pool):
+    leases = [pool.acquire(BrowserType.CHROMIUM) for _ in range(2)]
+    assert pool.server_count(BrowserType.CHROMIUM) == 2
+    assert leases[0].server_id != leases[1].server_id
+
+    # Server count does not grow with the number of leases
+    pool.acquire(BrowserType.CHROMIUM)
+    assert pool.server_count(BrowserType.CHROMIUM) == 2
+
+def test_servers_are_per_browser_type(pool):
+    lease = pool.acquire(BrowserType.FIREFOX)
+    assert lease.browser == BrowserType.FIREFOX
+    assert pool.server_count(BrowserType.FIREFOX) == 2
+    assert pool.server_count(BrowserType.CHROMIUM) == 0
+
+def test_server_is_recycled_after_max_contexts(pool):
+    pool.start()
+    first = pool.acquire()
+    server = next(p.server for p in pool._servers[BrowserType.CHROMIUM] if p.server.id == first.server_id)
+
+    leases = [first] + [pool.acquire() for _ in range(5)]
+    served = [l for l in leases if l.server_id == server.id]
+    assert len(served) == 3
+    assert server.alive
+
+    # Closed once its last lease is released
+    for lease in served:
+        pool.release(lease)
+    pool._close_drained()
+    assert not server.alive
+
+def test_unhealthy_server_is_replaced(pool):
+    pool.start()
+    lease = pool.acquire()
+    dead = next(p.server for p in pool._servers[BrowserType.CHROMIUM] if p.server.id == lease.server_id)
+    dead.alive = False
+
+    pool._check_health()
+    assert pool.server_count(BrowserType.CHROMIUM) == 1
+    pool._fill(BrowserType.CHROMIUM)
+    assert pool.server_count(BrowserType.CHROMIUM) == 2
+    assert all(p.server.alive for p in pool._servers[BrowserType.CHROMIUM])
+
+def test_from_settings_disabled_by_default():
+    from forge.runtime.browser_pool import BrowserPoolSettings
+    assert BrowserPool.from_settings(BrowserPoolSettings(browser_pool_enabled=False)) is None
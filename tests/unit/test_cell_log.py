@@ -0,0 +1,72 @@
+import pytest
+from forge.runtime.cell_log import CellLog, output_size, truncate_output
+from forge.runtime.inprocess import InProcessKernel
+from forge.runtime.session import JupyterNotebookSession
+
+def test_truncate_output_keeps_head_and_tail():
+    out = truncate_output({"output_type": "stream", "name": "stdout", "text": "a" * 100 + "b" * 100}, 20)
+    assert out["text"].startswith("a" * 10)
+    assert out["text"].endswith("b" * 10)
+    assert "180 characters truncated" in out["text"]
+
+    out = truncate_output({"output_type": "display_data", "data": {"image/png": "x" * 1000}, "metadata": {}}, 20)
+    assert out["data"] == {"text/plain": "[binary output truncated]"}
+
+def test_cell_log_roundtrip(tmp_path):
+    log = CellLog(str(tmp_path / "cells.jsonl"))
+    log.append("a", [{"output_type": "stream", "name": "stdout", "text": "first"}])
+    log.append("b", [{"output_type": "stream", "name": "stdout", "text": "second"}])
+
+    assert log.get("b")[0]["text"] == "second"
+    assert log.get("a")[0]["text"] == "first"
+    assert log.get("missing") is None
+    assert "a" in log
+
+@pytest.fixture
+def session(tmp_path):
+    s = JupyterNotebookSession(
+        kernel=InProcessKernel(),
+        cell_output_budget=2000,
+        session_output_budget=5000,
+        cell_log=CellLog(str(tmp_path / "cells.jsonl")),
+    )
+    s.start()
+    yield s
+    s.stop()
+
+@pytest.mark.asyncio
+async def test_cell_budget_truncates_and_spills(session):
+    result = await session.add_cell("print('x' * 10000)")
+    # The caller still gets the full output
+    assert len(result.stdout) == 10001
+
+    cell = session.get_state().cells[0]
+    assert cell.truncated
+    assert output_size(cell.outputs[0]) <= 2000
+    assert session.get_cell_outputs(cell.id)[0]["text"] == "x" * 10000 + "\n"
+
+@pytest.mark.asyncio
+async def test_internal_cells_keep_a_summary(session):
+    await session.add_cell("print('dom' * 1000)\n{'tree': 'x' * 1000}", internal=True)
+    cell = session.get_state().cells[0]
+    assert cell.truncated
+    assert sum(output_size(out) for out in cell.outputs) < 2000
+    assert len(session.get_cell_outputs(cell.id)[0]["text"]) == 3001
+
+@pytest.mark.asyncio
+async def test_session_budget_evicts_oldest_cells(session):
+    for i in range(5):
+        await session.add_cell(f"print('{i}' * 1500)")
+
+    cells = session.get_state().cells
+    assert session._output_bytes <= 5000
+    assert cells[0].truncated
+    assert not cells[-1].truncated
+    assert session.get_cell_outputs(cells[0].id)[0]["text"] == "0" * 1500 + "\n"
+
+@pytest.mark.asyncio
+async def test_small_cells_are_untouched(session):
+    await session.add_cell("print('hello')")
+    cell = session.get_state().cells[0]
+    assert not cell.truncated
+    assert cell.outputs[0]["text"] == "hello\n"
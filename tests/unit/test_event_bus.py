@@ -0,0 +1,74 @@
+import asyncio
+import threading
+
+import pytest
+from forge.api.events import TaskEventBus
+from forge.api.models import TaskEventType
+
+
+def test_events_since():
+    bus = TaskEventBus()
+    for i in range(3):
+        bus.publish("t1", TaskEventType.LOG, {"message": str(i)})
+    bus.publish("t2", TaskEventType.LOG)
+
+    assert [e.id for e in bus.events_since("t1")] == [1, 2, 3]
+    assert [e.data["message"] for e in bus.events_since("t1", after=1)] == ["1", "2"]
+    assert bus.events_since("t1", after=3) == []
+    assert bus.last_event_id("t2") == 1
+
+
+def test_resync_when_history_is_dropped():
+    bus = TaskEventBus(history=2)
+    for _ in range(5):
+        bus.publish("t1", TaskEventType.LOG)
+
+    events = bus.events_since("t1", after=1)
+    assert events[0].type == TaskEventType.RESYNC
+    assert [e.id for e in events] == [3, 4, 5]
+    # Up to date with the retained history, no resync needed
+    assert [e.id for e in bus.events_since("t1", after=3)] == [4, 5]
+
+
+@pytest.mark.asyncio
+async def test_wait_is_woken_by_publish_from_another_thread():
+    bus = TaskEventBus()
+    assert await bus.wait("t1", timeout=0.05) == []
+
+    waiter = asyncio.create_task(bus.wait("t1", timeout=5))
+    await asyncio.sleep(0.05)
+    threading.Thread(target=bus.publish, args=("t1", TaskEventType.STEP_STATUS)).start()
+    events = await waiter
+    assert [e.type for e in events] == [TaskEventType.STEP_STATUS]
+
+
+@pytest.mark.asyncio
+async def test_wait_timeout_discards_the_waiter():
+    bus = TaskEventBus()
+    assert await bus.wait("t1", timeout=0.01) == []
+    assert bus._waiters == {}
+
+    waiter = asyncio.create_task(bus.wait("t1", timeout=5))
+    await asyncio.sleep(0.01)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert bus._waiters == {}
+
+
+def test_history_is_trimmed_after_the_run_ends():
+    bus = TaskEventBus(retention=0)
+    for _ in range(3):
+        bus.publish("t1", TaskEventType.LOG)
+    bus.publish("t1", TaskEventType.END)
+    # Trimmed on the next publish
+    bus.publish("t2", TaskEventType.LOG)
+
+    events = bus.events_since("t1", after=1)
+    assert [e.type for e in events] == [TaskEventType.RESYNC, TaskEventType.END]
+    assert bus.last_event_id("t1") == 4
+
+    # A rerun keeps its history until it ends
+    bus.publish("t1", TaskEventType.LOG)
+    bus.publish("t2", TaskEventType.LOG)
+    assert [e.id for e in bus.events_since("t1", after=3)] == [4, 5]
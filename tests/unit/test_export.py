@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+from forge.export import export_pytest, script_filename, step_cells
+from forge.runtime.inprocess import InProcessKernel
+from forge.runtime.session import JupyterNotebookSession
+
+TESTCASE = """
+name: Baidu search
+test-env:
+  base_url: https://www.baidu.com
+  browser: firefox
+steps:
+  - id: 1
+    type: action
+    content: Search for TestForge
+  - id: 2
+    type: verification
+    content: The results mention TestForge
+  - id: 3
+    type: verification
+    content: The title changed
+"""
+
+
+def _run(session, code, step=None, internal=False):
+    session.current_step = step
+    asyncio.run(session.add_cell(code, internal=internal))
+    session.current_step = None
+
+
+@pytest.fixture
+def session():
+    session = JupyterNotebookSession(kernel=InProcessKernel())
+    session.start()
+    session.notebook.metadata["testcase"] = TESTCASE
+    _run(session, "page = None")  # Browser setup, before any step
+    _run(session, "dom = {'tag': 'body'}", step=0, internal=True)
+    _run(session, "query = 'TestForge'", step=0)
+    _run(session, "raise ValueError('wrong selector')", step=0)
+    _run(session, "results = [query]", step=0)
+    _run(session, "assert 'TestForge' in results[0]", step=1)
+    _run(session, "print(query)", step=2)
+    return session
+
+
+def test_step_cells(session):
+    assert step_cells(session.notebook) == {
+        0: ["query = 'TestForge'", "results = [query]"],
+        1: ["assert 'TestForge' in results[0]"],
+        2: ["print(query)"],
+    }
+
+
+def test_export_pytest(session):
+    source = export_pytest(session.notebook)
+    assert "async def run_baidu_search():" in source
+    assert "def test_baidu_search():" in source
+    assert "playwright.firefox.launch(headless=True)" in source
+    assert "BASE_URL = 'https://www.baidu.com'" in source
+    assert "            # Step 1: Search for TestForge\n            query = 'TestForge'\n            results = [query]\n" in source
+    assert "# Step 2 (verification): The results mention TestForge\n            assert 'TestForge' in results[0]\n" in source
+    # Without an assertion, the verification is left to fill in
+    assert source.count("add an assertion") == 1
+    assert "wrong selector" not in source
+    assert "dom = " not in source
+    assert script_filename("Baidu search") == "test_baidu_search.py"
+
+
+def test_export_pytest_errors(session):
+    session.notebook.metadata.pop("testcase")
+    with pytest.raises(ValueError):
+        export_pytest(session.notebook)
+
+    # IPython magics run in a Jupyter kernel but aren't Python
+    _run(session, "x = 1", step=0)
+    session.notebook.cells[-1].source = "%time x = 1"
+    with pytest.raises(ValueError):
+        export_pytest(session.notebook, TESTCASE)
@@ -0,0 +1,96 @@
+import asyncio
+import pytest
+from forge.runtime.inprocess import InProcessKernel
+
+@pytest.fixture
+def kernel():
+    k = InProcessKernel()
+    k.start()
+    yield k
+    k.stop()
+
+@pytest.mark.asyncio
+async def test_execute_result(kernel):
+    result = await kernel.aexecute("1 + 1")
+    assert result.is_success
+    assert result.text_result == "2"
+
+    result = await kernel.aexecute("'Example Domain'")
+    assert result.text_result == "'Example Domain'"
+
+@pytest.mark.asyncio
+async def test_state_and_top_level_await(kernel):
+    await kernel.aexecute("import asyncio\nasync def title():\n    await asyncio.sleep(0)\n    return 'ok'")
+    result = await kernel.aexecute("value = await title()\nprint(value)\nawait title()")
+    assert result.stdout == "ok\n"
+    assert result.text_result == "'ok'"
+
+@pytest.mark.asyncio
+async def test_stdout_and_stderr_capture(kernel):
+    received = []
+    result = await kernel.aexecute("import sys\nprint('a')\nprint('b')\nsys.stderr.write('err')", on_output=received.append)
+    assert result.stdout == "a\nb\n"
+    assert result.stderr == "err"
+    # Consecutive chunks of a stream are merged
+    assert [out["name"] for out in result.outputs if out["output_type"] == "stream"] == ["stdout", "stderr"]
+    assert len(received) > 2
+
+@pytest.mark.asyncio
+async def test_error_with_traceback(kernel):
+    result = await kernel.aexecute("def fail():\n    raise ValueError('fail')\nfail()")
+    assert not result.is_success
+    assert result.error["ename"] == "ValueError"
+    assert result.error["evalue"] == "fail"
+    assert any("<cell-1>" in line for line in result.error["traceback"])
+
+    result = await kernel.aexecute("def broken(:")
+    assert result.error["ename"] == "SyntaxError"
+
+@pytest.mark.asyncio
+async def test_concurrent_executions_capture_their_own_output():
+    kernels = [InProcessKernel() for _ in range(3)]
+    for k in kernels:
+        k.start()
+
+    codes = [f"import asyncio\nfor _ in range(3):\n    print({i})\n    await asyncio.sleep(0.01)" for i in range(3)]
+    results = await asyncio.gather(*(k.aexecute(code) for k, code in zip(kernels, codes)))
+
+    for i, result in enumerate(results):
+        assert result.stdout == f"{i}\n" * 3
+
+    # Namespaces are isolated
+    await kernels[0].aexecute("secret = 1")
+    assert not (await kernels[1].aexecute("secret")).is_success
+
+@pytest.mark.asyncio
+async def test_deadline_cancels_execution(kernel):
+    result = await kernel.aexecute("import asyncio\nprint('start')\nawait asyncio.sleep(30)", timeout=0.2)
+    assert result.error["ename"] == "TimeoutError"
+    assert result.stdout == "start\n"
+    assert (await kernel.aexecute("1 + 1")).text_result == "2"
+
+@pytest.mark.asyncio
+async def test_exit_only_fails_the_cell(kernel):
+    result = await kernel.aexecute("raise SystemExit(3)")
+    assert result.error["ename"] == "SystemExit"
+    result = await kernel.aexecute("import sys\nsys.exit()")
+    assert result.error["ename"] == "SystemExit"
+    result = await kernel.aexecute("raise KeyboardInterrupt")
+    assert result.error["ename"] == "KeyboardInterrupt"
+    assert (await kernel.aexecute("1 + 1")).text_result == "2"
+
+@pytest.mark.asyncio
+async def test_session_with_inprocess_backend():
+    from forge.runtime.session import JupyterNotebookSession
+    from forge.runtime.interface import CellStatus
+
+    session = JupyterNotebookSession(kernel=InProcessKernel())
+    session.start()
+    await session.add_cell("print('hello')")
+    await session.add_cell("raise ValueError('fail')")
+
+    state = session.get_state()
+    assert state.cells[0].status == CellStatus.SUCCESS
+    assert state.cells[0].outputs[0]['text'] == "hello\n"
+    assert state.cells[1].status == CellStatus.ERROR
+    session.stop()
@@ -0,0 +1,70 @@
+import time
+
+import pytest
+from forge.api.job_queue import JobQueue
+from forge.api.models import TaskPriority
+
+
+@pytest.fixture
+def queue(tmp_path):
+    q = JobQueue(str(tmp_path / "jobs.db"), lease_timeout=60, max_per_base_url=1)
+    yield q
+    q.close()
+
+
+def test_claim_by_priority_then_age(queue):
+    queue.enqueue("low", "https://a.test", priority=TaskPriority.LOW)
+    queue.enqueue("normal", "https://b.test")
+    queue.enqueue("high", "https://c.test", priority=TaskPriority.HIGH)
+
+    assert queue.info("low").position == 3
+    claimed = [queue.claim("w1").task_id for _ in range(3)]
+    assert claimed == ["high", "normal", "low"]
+    assert queue.claim("w1") is None
+    assert queue.info("low").running == 3
+
+
+def test_per_site_limit_and_submitter_share(queue):
+    queue.enqueue("a1", "https://a.test/1", submitter="alice")
+    queue.enqueue("a2", "https://a.test/2", submitter="alice")
+    queue.enqueue("b1", "https://b.test", submitter="alice")
+    queue.enqueue("c1", "https://c.test", submitter="bob")
+
+    first = queue.claim("w1")
+    assert first.task_id == "a1"
+    # a.test is busy, and bob has nothing running
+    assert queue.claim("w1").task_id == "c1"
+    assert queue.claim("w1").task_id == "b1"
+    assert queue.claim("w1") is None
+
+    queue.complete(first.id)
+    job = queue.claim("w1")
+    assert job.task_id == "a2"
+    assert job.attempts == 1
+
+
+def test_expired_claims_are_requeued(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"), lease_timeout=0.05)
+    queue.enqueue("t1", "https://a.test")
+    assert queue.claim("w1").attempts == 1
+    assert queue.claim("w2") is None
+
+    time.sleep(0.1)
+    job = queue.claim("w2")
+    assert job.task_id == "t1"
+    assert job.attempts == 2
+    queue.close()
+
+
+def test_cancel_and_is_scheduled(queue):
+    queue.enqueue("t1", "https://a.test")
+    assert queue.is_scheduled("t1")
+    assert queue.cancel("t1")
+    assert not queue.is_scheduled("t1")
+    assert queue.info("t1").position is None
+
+    queue.enqueue("t2", "https://a.test")
+    queue.claim("w1")
+    # Claimed jobs keep running
+    assert not queue.cancel("t2")
+    assert queue.is_scheduled("t2")
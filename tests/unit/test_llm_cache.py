@@ -0,0 +1,82 @@
+import time
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.load import dumps
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration
+
+import forge.llm_cache as llm_cache
+from forge.llm_cache import LLMCacheSettings, LLMResponseCache, ScopedLLMCache, cache_key, use_llm_cache
+
+
+def _generations(text):
+    return [ChatGeneration(message=AIMessage(content=text))]
+
+
+def test_cache_key_ignores_volatile_fields():
+    first = [HumanMessage(content="open"), AIMessage(content="ok", id="run-1", response_metadata={"created": 1})]
+    again = [HumanMessage(content="open"), AIMessage(content="ok", id="run-2", response_metadata={"created": 2})]
+    assert cache_key(dumps(first), "gpt") == cache_key(dumps(again), "gpt")
+    assert cache_key(dumps(first), "gpt") != cache_key(dumps(first), "gpt, temperature=1")
+    assert cache_key(dumps([HumanMessage(content="close")]), "gpt") != cache_key(dumps(first), "gpt")
+
+
+def test_chat_model_answers_repeated_calls_from_cache(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "llm.db"))
+    scoped = ScopedLLMCache(cache)
+    model = FakeListChatModel(responses=["first", "second"], cache=scoped)
+
+    assert model.invoke("search").content == "first"
+    assert model.invoke("search").content == "first"
+    assert model.invoke("other").content == "second"
+    # Tool schemas and other call parameters are part of the key
+    assert model.bind(tools=["search"]).invoke("search").content == "first"
+
+    assert (scoped.hits, scoped.misses) == (1, 3)
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.entries) == (1, 3, 3)
+    assert stats.hit_rate == 0.25
+    assert stats.size_bytes > 0
+
+    # The store outlives the process that filled it
+    cache.close()
+    reopened = LLMResponseCache(str(tmp_path / "llm.db"))
+    model = FakeListChatModel(responses=["first", "second"], i=1, cache=reopened)
+    assert model.invoke("search").content == "first"
+    reopened.clear()
+    assert reopened.stats().entries == 0
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "llm.db"), max_entries=2)
+    cache.update("a", "m", _generations("A"))
+    cache.update("b", "m", _generations("B"))
+    assert cache.lookup("a", "m")[0].message.content == "A"
+    cache.update("c", "m", _generations("C"))
+    assert cache.lookup("b", "m") is None
+    assert cache.lookup("a", "m") and cache.lookup("c", "m")
+    assert cache.stats().evictions == 1
+
+    small = LLMResponseCache(str(tmp_path / "small.db"), max_bytes=1)
+    small.update("a", "m", _generations("A"))
+    assert small.stats().entries == 0
+
+
+def test_expires_old_entries(tmp_path, monkeypatch):
+    cache = LLMResponseCache(str(tmp_path / "llm.db"), max_age=60)
+    cache.update("a", "m", _generations("A"))
+    assert cache.lookup("a", "m")
+    now = time.time()
+    monkeypatch.setattr(llm_cache.time, "time", lambda: now + 120)
+    assert cache.lookup("a", "m") is None
+    stats = cache.stats()
+    assert (stats.entries, stats.evictions) == (0, 1)
+
+
+def test_use_llm_cache(monkeypatch):
+    assert use_llm_cache(True, {"llm-cache": False})
+    assert not use_llm_cache(False, {"llm-cache": True})
+    assert use_llm_cache(None, {"llm-cache": True})
+    monkeypatch.setattr(llm_cache, "LLMCacheSettings", lambda: LLMCacheSettings(llm_cache_default=True))
+    assert use_llm_cache(None, {})
+    assert not use_llm_cache(None, {"llm-cache": False})
@@ -0,0 +1,130 @@
+import asyncio
+import json
+
+import httpx
+
+from forge.llm_limiter import (
+    LLMCallStats,
+    LLMRateLimiter,
+    RateLimitedTransport,
+    TokenBucket,
+    estimate_tokens,
+    llm_run_scope,
+    retry_after,
+)
+
+
+def test_token_bucket():
+    bucket = TokenBucket(60)
+    assert bucket.delay(60, bucket.updated) == 0
+    bucket.take(60, bucket.updated)
+    assert bucket.delay(2, bucket.updated) == 2.0
+    # Requests larger than the bucket only wait for it to be full
+    assert bucket.delay(600, bucket.updated) == 60.0
+    bucket.adjust(30)
+    assert bucket.delay(30, bucket.updated) == 0
+
+
+def test_limiter_serves_runs_in_turn():
+    async def scenario():
+        limiter = LLMRateLimiter(max_in_flight=1)
+        await limiter.acquire("x", 1)
+        admitted = []
+
+        async def request(run_id, name):
+            await limiter.acquire(run_id, 1)
+            admitted.append(name)
+            await asyncio.sleep(0)
+            limiter.release(1)
+
+        waiting = [asyncio.create_task(request("a", f"a{i}")) for i in range(3)]
+        waiting.append(asyncio.create_task(request("b", "b0")))
+        await asyncio.sleep(0)
+        assert limiter.queued == 4 and limiter.in_flight == 1
+        limiter.release(1)
+        await asyncio.gather(*waiting)
+        return admitted, limiter
+
+    admitted, limiter = asyncio.run(scenario())
+    assert admitted == ["a0", "b0", "a1", "a2"]
+    assert limiter.in_flight == 0
+
+
+def test_limiter_waits_for_tokens():
+    async def scenario():
+        limiter = LLMRateLimiter(tokens_per_minute=600)  # 10 tokens a second
+        assert await limiter.acquire("a", 600) < 0.1
+        limiter.release(600, 595)  # 5 tokens given back
+        return await limiter.acquire("a", 6)
+
+    assert 0.05 < asyncio.run(scenario()) < 0.5
+
+
+def test_retry_after():
+    assert retry_after(httpx.Response(429, headers={"retry-after": "3"})) == 3
+    assert retry_after(httpx.Response(429, headers={"retry-after-ms": "250", "retry-after": "1"})) == 0.25
+    assert retry_after(httpx.Response(429, headers={"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"})) == 0
+    assert retry_after(httpx.Response(503)) is None
+
+
+def test_estimate_tokens():
+    request = httpx.Request("POST", "http://llm/chat", json={"messages": ["x" * 400], "max_tokens": 100})
+    assert 200 < estimate_tokens(request) < 220
+
+
+def test_transport_retries_and_reports_calls():
+    answers = [
+        httpx.Response(429, headers={"retry-after": "0"}),
+        httpx.Response(502),
+        httpx.Response(200, json={"usage": {"total_tokens": 42}}),
+    ]
+    sent = []
+
+    def handler(request):
+        sent.append(request)
+        return answers[len(sent) - 1]
+
+    async def scenario(max_retries):
+        limiter = LLMRateLimiter(tokens_per_minute=1000, max_in_flight=2)
+        transport = RateLimitedTransport(limiter, httpx.MockTransport(handler), max_retries=max_retries, backoff_base=0)
+        stats = LLMCallStats()
+        async with httpx.AsyncClient(transport=transport) as client:
+            with llm_run_scope("t1", stats):
+                response = await client.post("http://llm/chat", content=json.dumps({"messages": []}))
+        return response, stats, limiter
+
+    response, stats, limiter = asyncio.run(scenario(max_retries=5))
+    assert response.status_code == 200
+    assert (stats.calls, stats.retries) == (3, 2)
+    assert limiter.in_flight == 0
+    # The request is charged what the response says it used, failed attempts nothing
+    assert 1000 - 42 <= limiter.tokens.level < 1000 - 40
+
+    sent.clear()
+    response, stats, _ = asyncio.run(scenario(max_retries=1))
+    assert response.status_code == 502
+    assert (stats.calls, stats.retries) == (2, 1)
+
+
+def test_transport_releases_cancelled_requests():
+    started = asyncio.Event()
+
+    async def handler(request):
+        started.set()
+        await asyncio.sleep(60)
+
+    async def scenario():
+        limiter = LLMRateLimiter(max_in_flight=1)
+        transport = RateLimitedTransport(limiter, httpx.MockTransport(handler))
+        async with httpx.AsyncClient(transport=transport) as client:
+            request = asyncio.create_task(client.post("http://llm/chat", content=b"{}"))
+            await started.wait()
+            assert limiter.in_flight == 1
+            request.cancel()
+            try:
+                await request
+            except asyncio.CancelledError:
+                pass
+        return limiter
+
+    assert asyncio.run(scenario()).in_flight == 0
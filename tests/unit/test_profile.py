@@ -0,0 +1,39 @@
+import pytest
+from forge.model.testcase import BrowserType, TestEnv
+from forge.runtime.profile import build_browser_init_code, get_profile, playwright_profile
+
+def test_playwright_profile_launches_browser():
+    profile = playwright_profile(BrowserType.FIREFOX, headless=True)
+    assert profile.name == "playwright"
+    assert "playwright.firefox.launch(headless=True)" in profile.warmup_code
+    assert "_forge_browser_key = ('firefox', True)" in profile.warmup_code
+
+def test_get_profile():
+    assert get_profile(None) is None
+    assert get_profile("playwright").name == "playwright"
+    with pytest.raises(ValueError):
+        get_profile("unknown")
+
+def test_browser_init_code_uses_test_env():
+    env = TestEnv(base_url="https://example.com", viewport={"width": 800, "height": 600}, timeout=5000, headless=True)
+    code = build_browser_init_code(env)
+
+    # Reuses the pre-launched browser when it matches
+    assert 'globals().get("_forge_browser_key") != (\'chromium\', True)' in code
+    assert "context = await browser.new_context(base_url='https://example.com', viewport={'width': 800, 'height': 600})" in code
+    assert "context.set_default_timeout(5000)" in code
+    assert "await page.goto('https://example.com')" in code
+    compile(code.replace("await ", ""), "<init>", "exec")
+
+def test_browser_init_code_connects_to_ws_endpoint():
+    env = TestEnv(base_url="https://example.com")
+    code = build_browser_init_code(env, ws_endpoint="ws://127.0.0.1:1234/abc")
+
+    assert "browser = await playwright.chromium.connect('ws://127.0.0.1:1234/abc')" in code
+    assert "launch(" not in code
+    assert "context = await browser.new_context(" in code
+
+def test_playwright_driver_profile_does_not_launch():
+    profile = get_profile("playwright-driver")
+    assert "async_playwright().start()" in profile.warmup_code
+    assert "launch(" not in profile.warmup_code
@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+
+import forge.agent.forge_agent as forge_agent
+from forge.agent.replay import ReplayCache, ReplaySettings, step_keys
+from forge.agent.tools import RunPlaywrightCodeToolInput, run_playwright_code
+from forge.model.testcase import TestEnv as Env
+from forge.runtime.inprocess import InProcessKernel
+from forge.runtime.session import JupyterNotebookSession
+
+
+def test_step_keys():
+    env = Env(base_url="https://example.com")
+    testcase = {"steps": [
+        {"content": "open"},
+        {"content": "search", "type": "action"},
+        {"content": "results are shown", "type": "verification"},
+    ]}
+    keys = step_keys(testcase, env)
+    assert keys[0] and keys[1] and keys[0] != keys[1]
+    assert keys[2] is None
+
+    # A step's key depends on the steps before it and the test-env
+    changed = {"steps": [{"content": "open other"}, {"content": "search"}]}
+    assert step_keys(changed, env)[1] != keys[1]
+    assert step_keys(testcase, Env(base_url="https://example.org"))[0] != keys[0]
+    assert step_keys(testcase, env) == keys
+
+
+def test_replay_cache(tmp_path):
+    cache = ReplayCache(str(tmp_path))
+    assert cache.get("k") is None
+    cache.put("k", ["await page.click('#a')"], step="click a")
+    assert cache.get("k") == ["await page.click('#a')"]
+    cache.discard("k")
+    assert cache.get("k") is None
+    cache.discard("k")
+
+    (tmp_path / "bad.json").write_text("{")
+    assert cache.get("bad") is None
+    assert ReplayCache.from_settings(ReplaySettings(replay_enabled=False)) is None
+
+
+class FakeAutomationAgent:
+    """Stands in for the ReAct loop: runs the step's text as a cell through the tool."""
+
+    def __init__(self, task_id, session=None):
+        self.task_id = task_id
+        self.session = session
+        self.recorded_cells = []
+        self.calls = []
+
+    async def ainvoke(self, inputs, model=None, escalate_after=0):
+        code = inputs["messages"][0].content.removeprefix("Execute this step: ")
+        self.calls.append(code)
+        result = await run_playwright_code(RunPlaywrightCodeToolInput(code=code), self.task_id, self.session)
+        if not result.success:
+            raise RuntimeError(result.error)
+        self.recorded_cells.append(code)
+        return {"messages": []}
+
+
+@pytest.fixture
+def make_agent(monkeypatch, tmp_path):
+    monkeypatch.setattr(forge_agent, "AutomationAgent", FakeAutomationAgent)
+    cache = ReplayCache(str(tmp_path / "replay"))
+
+    def make():
+        session = JupyterNotebookSession(kernel=InProcessKernel())
+        session.start()
+        return forge_agent.ForgeAgent("t1", session=session, replay_cache=cache), session
+    return make, cache
+
+
+def test_forge_agent_records_and_replays(make_agent):
+    make, cache = make_agent
+    steps = ["x = 1", "y = x + 1"]
+    keys = ["k1", "k2"]
+
+    agent, _ = make()
+    asyncio.run(agent.run(steps, replay_keys=keys))
+    assert agent.automation_subagent.calls == steps
+    assert agent.replayed_steps == []
+    assert cache.get("k2") == ["y = x + 1"]
+
+    # The next run doesn't involve the agent at all
+    agent, session = make()
+    asyncio.run(agent.run(steps, replay_keys=keys))
+    assert agent.automation_subagent.calls == []
+    assert agent.replayed_steps == [0, 1]
+    assert session.kernel.namespace["y"] == 2
+
+
+def test_forge_agent_falls_back_when_replay_fails(make_agent):
+    make, cache = make_agent
+    cache.put("k1", ["x = 1", "raise ValueError('page changed')"])
+
+    agent, _ = make()
+    asyncio.run(agent.run(["x = 2"], replay_keys=["k1"]))
+    assert agent.automation_subagent.calls == ["x = 2"]
+    assert agent.replayed_steps == []
+    # The cells that replayed fine are kept ahead of the agent's
+    assert cache.get("k1") == ["x = 1", "x = 2"]
+
+    # A step that fails even with the agent drops its recording
+    cache.put("k1", ["raise ValueError('page changed')"])
+    agent, _ = make()
+    with pytest.raises(RuntimeError):
+        asyncio.run(agent.run(["raise ValueError('broken')"], replay_keys=["k1"]))
+    assert cache.get("k1") is None
+
+
+def test_forge_agent_without_keys_never_replays(make_agent):
+    make, cache = make_agent
+    cache.put("k1", ["x = 1"])
+    agent, _ = make()
+    asyncio.run(agent.run(["x = 3"], replay_keys=[None]))
+    assert agent.automation_subagent.calls == ["x = 3"]
@@ -0,0 +1,135 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from forge.api.models import StepState, StepStatus, Task, TaskStatus
+from forge.api.repository import InMemoryTaskRepository, TaskFilter
+from forge.api.sqlite_repository import SQLiteTaskRepository
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def repository(request, tmp_path):
+    if request.param == "memory":
+        repo = InMemoryTaskRepository()
+    else:
+        repo = SQLiteTaskRepository(str(tmp_path / "forge.db"), log_flush_interval=0.05)
+    yield repo
+    repo.close()
+
+
+def make_task(task_id: str, created_at: datetime, steps: int = 0) -> Task:
+    return Task(
+        id=task_id,
+        name=f"Task {task_id}",
+        yaml_content="steps: []",
+        status=TaskStatus.PENDING,
+        created_at=created_at,
+        updated_at=created_at,
+        steps=[StepState(index=i, content=f"step {i}") for i in range(steps)],
+    )
+
+
+def test_task_roundtrip(repository):
+    now = datetime.now()
+    repository.create_task(make_task("a", now, steps=2))
+
+    task = repository.get_task("a")
+    assert task.name == "Task a"
+    assert task.created_at == now
+    assert [s.content for s in task.steps] == ["step 0", "step 1"]
+
+    repository.update_status("a", TaskStatus.RUNNING)
+    step = repository.update_step("a", 1, status=StepStatus.COMPLETED, screenshot="/s.png")
+    assert step.status == StepStatus.COMPLETED
+    assert repository.update_step("a", 5, status=StepStatus.COMPLETED) is None
+
+    task = repository.get_task("a")
+    assert task.status == TaskStatus.RUNNING
+    assert task.steps[1].screenshot == "/s.png"
+
+    assert repository.delete_task("a")
+    assert repository.get_task("a") is None
+    assert not repository.delete_task("a")
+
+
+def test_list_tasks_keyset(repository):
+    start = datetime(2026, 1, 1)
+    for i in range(5):
+        repository.create_task(make_task(f"t{i}", start + timedelta(minutes=i)))
+
+    page = repository.list_tasks(limit=2)
+    assert [t.id for t in page] == ["t4", "t3"]
+    page = repository.list_tasks(limit=2, after=(page[-1].created_at, page[-1].id))
+    assert [t.id for t in page] == ["t2", "t1"]
+    assert [t.id for t in repository.list_tasks(limit=2, skip=4)] == ["t0"]
+
+
+def test_logs_and_cells(repository):
+    repository.create_task(make_task("a", datetime.now()))
+    for i in range(4):
+        assert repository.append_log("a", "INFO", f"log {i}")["seq"] == i + 1
+    assert repository.append_log("missing", "INFO", "x") is None
+
+    assert [log["message"] for log in repository.get_logs("a")] == ["log 0", "log 1", "log 2", "log 3"]
+    assert [log["seq"] for log in repository.get_logs("a", since_seq=1, limit=2)] == [2, 3]
+
+    cells = [{"id": "c1", "status": "success", "code": "1", "output": None}]
+    repository.update_cells("a", cells)
+    assert repository.get_cells("a") == cells
+
+    finished = {"id": "c1", "status": "error", "code": "1", "output": "boom"}
+    repository.update_cell("a", finished)
+    repository.update_cell("a", {"id": "c2", "status": "success", "code": "2", "output": None})
+    assert [c["id"] for c in repository.get_cells("a")] == ["c1", "c2"]
+    assert repository.get_cells("a")[0] == finished
+
+
+def test_sqlite_persists_across_restarts(tmp_path):
+    path = str(tmp_path / "forge.db")
+    repo = SQLiteTaskRepository(path)
+    repo.create_task(make_task("a", datetime.now(), steps=1))
+    repo.append_log("a", "INFO", "first")
+    repo.close()
+
+    repo = SQLiteTaskRepository(path)
+    assert repo.get_task("a").steps[0].content == "step 0"
+    assert [log["message"] for log in repo.get_logs("a")] == ["first"]
+    # Numbering continues after the stored entries
+    assert repo.append_log("a", "INFO", "second")["seq"] == 2
+    repo.flush()
+    assert [log["seq"] for log in repo.get_logs("a")] == [1, 2]
+    repo.close()
+
+
+def test_list_tasks_filters(repository):
+    start = datetime(2026, 1, 1)
+    for i in range(6):
+        task = make_task(f"t{i}", start + timedelta(days=i))
+        task.name = f"{'smoke' if i % 2 else 'login'} {i}"
+        task.testcase_file = "login.yaml" if i < 3 else None
+        task.suite_id = "nightly" if i % 3 == 0 else None
+        task.llm_cache = True if i == 0 else None
+        repository.create_task(task)
+    repository.update_status("t1", TaskStatus.FAILED)
+    repository.update_status("t4", TaskStatus.COMPLETED)
+    repository.update_status("t5", TaskStatus.FAILED)
+
+    def ids(**kw):
+        return [t.id for t in repository.list_tasks(filters=TaskFilter(**kw))]
+
+    assert ids(statuses=[TaskStatus.FAILED]) == ["t5", "t1"]
+    assert ids(statuses=[TaskStatus.FAILED, TaskStatus.COMPLETED]) == ["t5", "t4", "t1"]
+    assert ids(name_prefix="smoke") == ["t5", "t3", "t1"]
+    assert ids(created_after=start + timedelta(days=2), created_before=start + timedelta(days=4)) == ["t3", "t2"]
+    # Aware bounds are compared in the naive local time tasks are created in
+    aware = (start + timedelta(days=2)).astimezone(timezone.utc)
+    assert ids(created_after=aware, created_before=start + timedelta(days=4)) == ["t3", "t2"]
+    assert ids(testcase_file="login.yaml", statuses=[TaskStatus.PENDING]) == ["t2", "t0"]
+    assert repository.count_tasks(TaskFilter(statuses=[TaskStatus.PENDING])) == 3
+    assert repository.count_tasks(TaskFilter(suite_id="nightly", statuses=[TaskStatus.PENDING])) == 2
+    assert repository.count_tasks() == 6
+    assert [repository.get_task(t).llm_cache for t in ("t0", "t1")] == [True, None]
+
+    # The cursor combines with filters
+    page = repository.list_tasks(limit=1, filters=TaskFilter(name_prefix="smoke"))
+    after = (page[0].created_at, page[0].id)
+    assert [t.id for t in repository.list_tasks(after=after, filters=TaskFilter(name_prefix="smoke"))] == ["t3", "t1"]
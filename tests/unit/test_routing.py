@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+import forge.agent.automation_agent as automation_agent
+import forge.agent.forge_agent as forge_agent
+from forge.agent.automation_agent import TOOLS, EscalateStep
+from forge.agent.routing import ModelRoutingSettings, StepRoute, route_steps
+from forge.runtime.inprocess import InProcessKernel
+from forge.runtime.session import JupyterNotebookSession
+
+TESTCASE = {"steps": [
+    {"content": "search", "type": "action"},
+    {"content": "results are shown", "type": "verification"},
+    {"content": "open the first result", "type": "action", "model": "small"},
+    {"content": "fill the form", "type": "action", "model": "gpt-x"},
+]}
+
+
+def test_route_steps_defaults_to_one_model():
+    routes = route_steps(TESTCASE, ModelRoutingSettings())
+    assert [r.model for r in routes[:3]] == [None, None, None]
+    assert routes[3].model == "gpt-x"
+    # Only steps off the large model escalate
+    assert [r.escalate_after for r in routes] == [0, 0, 0, 3]
+
+
+def test_route_steps_by_type_and_override():
+    settings = ModelRoutingSettings(llm_routing_small_model="mini", llm_routing_large_model="big")
+    routes = route_steps(TESTCASE, settings)
+    assert [r.model for r in routes] == ["big", "mini", "mini", "gpt-x"]
+    assert routes[0] == StepRoute(model="big")
+    assert routes[1] == StepRoute(model="mini", escalate_to="big", escalate_after=3)
+
+    never = settings.model_copy(update={"llm_routing_escalate_after": 0})
+    assert all(r.escalate_to is None and r.escalate_after == 0 for r in route_steps(TESTCASE, never))
+
+
+def test_tool_escalates_after_failed_runs():
+    session = JupyterNotebookSession(kernel=InProcessKernel())
+    session.start()
+    run_code = next(tool for tool in TOOLS if tool.name == "run_playwright_code")
+    failed = []
+    config = {"configurable": {"task_id": "t1", "session": session, "failed_runs": failed, "escalate_after": 2}}
+
+    asyncio.run(run_code.ainvoke({"code": "1 / 0"}, config=config))
+    asyncio.run(run_code.ainvoke({"code": "x = 1"}, config=config))
+    with pytest.raises(EscalateStep):
+        asyncio.run(run_code.ainvoke({"code": "1 / 0"}, config=config))
+    assert failed == ["1 / 0", "1 / 0"]
+
+
+class FakeAutomationAgent:
+    """Fails every step on the small model."""
+
+    def __init__(self, task_id, session=None):
+        self.recorded_cells = []
+        self.calls = []
+
+    async def ainvoke(self, inputs, model=None, escalate_after=0):
+        self.calls.append((model, escalate_after))
+        if model == "mini" and escalate_after:
+            raise EscalateStep("3 code runs failed")
+        return {"messages": []}
+
+
+def test_forge_agent_escalates_steps(monkeypatch):
+    monkeypatch.setattr(forge_agent, "AutomationAgent", FakeAutomationAgent)
+    session = JupyterNotebookSession(kernel=InProcessKernel())
+    session.start()
+    agent = forge_agent.ForgeAgent("t1", session=session)
+    routes = [StepRoute(model="big"), StepRoute(model="mini", escalate_to="big", escalate_after=3)]
+
+    asyncio.run(agent.run(["search", "results are shown"], routes=routes))
+    assert agent.escalated_steps == [1]
+    assert agent.automation_subagent.calls == [("big", 0), ("mini", 3), ("big", 0)]
+
+
+class ToolCallingFakeModel(GenericFakeChatModel):
+    """Answers with scripted messages, tool calls included."""
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+def failing_call(n):
+    return AIMessage(content="", tool_calls=[{"name": "run_playwright_code", "args": {"code": "1 / 0"}, "id": f"call-{n}"}])
+
+
+def test_escalation_through_the_compiled_graph(monkeypatch):
+    models = {
+        None: ToolCallingFakeModel(messages=iter([])),
+        "mini": ToolCallingFakeModel(messages=iter([failing_call(1), failing_call(2), AIMessage(content="never reached")])),
+        "big": ToolCallingFakeModel(messages=iter([AIMessage(content="done")])),
+    }
+    monkeypatch.setattr(automation_agent, "get_llm", lambda model=None: models[model])
+    session = JupyterNotebookSession(kernel=InProcessKernel())
+    session.start()
+    agent = forge_agent.ForgeAgent("t1", session=session)
+    routes = [StepRoute(model="mini", escalate_to="big", escalate_after=2)]
+
+    asyncio.run(agent.run(["search"], routes=routes))
+    # EscalateStep from the tool got through ToolNode to the retry on the large model
+    assert agent.escalated_steps == [0]
+    assert next(models["mini"].messages).content == "never reached"
+    assert next(models["big"].messages, None) is None
@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+from forge.api.models import TaskPriority
+from forge.api.scheduler import TaskScheduler, site_of
+
+
+class Runs:
+    """Jobs that block until released, recording the order they started in."""
+
+    def __init__(self):
+        self.started = []
+        self.release = {}
+
+    def job(self, task_id):
+        async def run():
+            self.started.append(task_id)
+            self.release[task_id] = asyncio.Event()
+            await self.release[task_id].wait()
+        return run
+
+    async def finish(self, task_id):
+        self.release[task_id].set()
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+
+
+def submit(scheduler, runs, task_id, base_url="https://a.test", **kw):
+    return asyncio.create_task(scheduler.run(task_id, runs.job(task_id), base_url=base_url, **kw))
+
+
+def test_site_of():
+    assert site_of("https://Example.com/path?q=1") == "https://example.com"
+
+
+@pytest.mark.asyncio
+async def test_concurrency_and_priority():
+    scheduler, runs = TaskScheduler(max_concurrency=1, max_per_base_url=0), Runs()
+    submit(scheduler, runs, "first")
+    await asyncio.sleep(0)
+    submit(scheduler, runs, "low", priority=TaskPriority.LOW)
+    submit(scheduler, runs, "normal")
+    submit(scheduler, runs, "high", priority=TaskPriority.HIGH)
+    await asyncio.sleep(0)
+    assert runs.started == ["first"]
+    assert [scheduler.position(t) for t in ["high", "normal", "low"]] == [1, 2, 3]
+    assert scheduler.info("low").queued == 3
+
+    for task_id in ["first", "high", "normal"]:
+        await runs.finish(task_id)
+    assert runs.started == ["first", "high", "normal", "low"]
+    assert scheduler.info("low").position is None
+    await runs.finish("low")
+    assert scheduler.info("low").running == 0
+
+
+@pytest.mark.asyncio
+async def test_fair_share_between_submitters():
+    scheduler, runs = TaskScheduler(max_concurrency=1, max_per_base_url=0), Runs()
+    submit(scheduler, runs, "a1", submitter="a")
+    await asyncio.sleep(0)
+    submit(scheduler, runs, "a2", submitter="a")
+    submit(scheduler, runs, "a3", submitter="a")
+    submit(scheduler, runs, "b1", submitter="b")
+    await asyncio.sleep(0)
+
+    # b has nothing running, so it goes before a's backlog
+    assert scheduler.position("b1") == 1
+    for task_id in ["a1", "b1", "a2"]:
+        await runs.finish(task_id)
+    assert runs.started == ["a1", "b1", "a2", "a3"]
+    await runs.finish("a3")
+
+
+@pytest.mark.asyncio
+async def test_per_site_limit_does_not_block_other_sites():
+    scheduler, runs = TaskScheduler(max_concurrency=3, max_per_base_url=1), Runs()
+    submit(scheduler, runs, "a1", base_url="https://a.test/x")
+    submit(scheduler, runs, "a2", base_url="https://a.test/y")
+    submit(scheduler, runs, "b1", base_url="https://b.test")
+    await asyncio.sleep(0)
+    assert runs.started == ["a1", "b1"]
+
+    await runs.finish("a1")
+    assert runs.started == ["a1", "b1", "a2"]
+    await runs.finish("a2")
+    await runs.finish("b1")
+
+
+@pytest.mark.asyncio
+async def test_cancel_queued_run():
+    scheduler, runs = TaskScheduler(max_concurrency=1), Runs()
+    submit(scheduler, runs, "first")
+    await asyncio.sleep(0)
+    queued = submit(scheduler, runs, "second")
+    await asyncio.sleep(0)
+
+    assert scheduler.cancel("second")
+    assert await queued is False
+    assert not scheduler.is_scheduled("second")
+    await runs.finish("first")
+    assert runs.started == ["first"]
+
+
+@pytest.mark.asyncio
+async def test_reserved_runs_count_as_scheduled():
+    scheduler, runs = TaskScheduler(max_concurrency=1, max_per_base_url=0), Runs()
+    scheduler.reserve("a")
+    assert scheduler.is_scheduled("a")
+
+    submit(scheduler, runs, "a")
+    await asyncio.sleep(0)
+    assert runs.started == ["a"] and scheduler.is_scheduled("a")
+    await runs.finish("a")
+    assert not scheduler.is_scheduled("a")
+
+    scheduler.reserve("b")
+    scheduler.cancel("b")
+    assert not scheduler.is_scheduled("b")
@@ -0,0 +1,87 @@
+import pytest
+from forge.runtime.inprocess import InProcessKernel
+from forge.runtime.interface import CellStatus
+from forge.runtime.session import JupyterNotebookSession
+
+@pytest.fixture
+def session():
+    s = JupyterNotebookSession(kernel=InProcessKernel())
+    s.start()
+    yield s
+    s.stop()
+
+@pytest.mark.asyncio
+async def test_get_state_since_returns_changed_cells(session):
+    await session.add_cell("1")
+    state = session.get_state()
+    assert len(state.cells) == 1
+    cursor = state.version
+
+    # Nothing changed
+    assert session.get_state(since=cursor).cells == []
+    assert session.get_state(since=cursor).version == cursor
+
+    await session.add_cell("print('two')")
+    state = session.get_state(since=cursor)
+    assert [c.source for c in state.cells] == ["print('two')"]
+    assert state.cells[0].status == CellStatus.SUCCESS
+    assert state.version > cursor
+    assert state.cells[0].revision == state.version
+
+@pytest.mark.asyncio
+async def test_versions_are_monotonic_and_cells_cached(session):
+    await session.add_cell("1")
+    first = session.get_state()
+    await session.add_cell("2")
+    second = session.get_state()
+
+    assert second.version > first.version
+    # The unchanged cell is served from the cache
+    assert second.cells[0] is first.cells[0]
+
+@pytest.mark.asyncio
+async def test_session_events(session):
+    events = []
+    session.on_event = lambda event_type, data: events.append((event_type, data))
+
+    await session.add_cell("print('hi')")
+    await session.add_cell("print('secret')", internal=True)
+
+    types = [t for t, _ in events]
+    assert types[0] == "cell_started"
+    assert types[-3:] == ["cell_finished", "cell_started", "cell_finished"]
+    outputs = [data["output"]["text"] for t, data in events if t == "cell_output"]
+    assert "".join(outputs) == "hi\n"
+    assert events[-3][1]["status"] == CellStatus.SUCCESS
+    assert events[0][1]["cell_id"] == events[-3][1]["cell_id"]
+
+
+@pytest.mark.asyncio
+async def test_session_events_hold_outputs_to_the_cell_budget():
+    session = JupyterNotebookSession(kernel=InProcessKernel(), cell_output_budget=2000)
+    session.start()
+    events = []
+    session.on_event = lambda event_type, data: events.append((event_type, data))
+
+    result = await session.add_cell("for i in range(50): print('x' * 100, flush=True)")
+    pushed = "".join(data["output"]["text"] for t, data in events if t == "cell_output")
+    assert len(pushed) < 3000
+    # The caller still gets every output
+    assert len(result.stdout) == 50 * 101
+    session.stop()
+
+
+@pytest.mark.asyncio
+async def test_session_events_truncate_to_what_is_left_of_the_budget():
+    session = JupyterNotebookSession(kernel=InProcessKernel(), cell_output_budget=1000)
+    session.start()
+    events = []
+    session.on_event = lambda event_type, data: events.append((event_type, data))
+
+    await session.add_cell("print('x' * 500, flush=True); print('y' * 5000, flush=True); print('z', flush=True)")
+    pushed = "".join(data["output"]["text"] for t, data in events if t == "cell_output")
+    # The long output only gets what is left of the budget, less than a summary, and later ones nothing
+    assert pushed.count("x") == 500
+    assert 0 < pushed.count("y") < session.SUMMARY_LIMIT
+    assert "z" not in pushed
+    session.stop()
@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+
+import forge.agent.forge_agent as forge_agent
+from forge.agent.verification import Check, CheckKind, StepCheck, check_code, match_step, parse_assert_block, step_checks
+from forge.model import testcase as testcase_model
+from forge.runtime.inprocess import InProcessKernel
+from forge.runtime.session import JupyterNotebookSession
+
+
+@pytest.mark.parametrize("content, check", [
+    ("检测页面的 title 包含 'Playwright' 关键字", Check(kind=CheckKind.TITLE_CONTAINS, value="Playwright")),
+    ("Verify the page title is \"Example Domain\"", Check(kind=CheckKind.TITLE_EQUALS, value="Example Domain")),
+    ("Check that the URL contains '/search'", Check(kind=CheckKind.URL_CONTAINS, value="/search")),
+    ("元素 '#login' 可见", Check(kind=CheckKind.VISIBLE, selector="#login")),
+    ("The page shows text 'Welcome back'", Check(kind=CheckKind.TEXT, value="Welcome back")),
+    ("页面显示 '登录成功'", Check(kind=CheckKind.TEXT, value="登录成功")),
+    ("There are 10 '.result' elements", Check(kind=CheckKind.COUNT, selector=".result", count=10)),
+    ("至少有 3 个 '.item' 元素", Check(kind=CheckKind.COUNT_AT_LEAST, selector=".item", count=3)),
+])
+def test_match_step(content, check):
+    assert match_step(content) == [check]
+
+
+@pytest.mark.parametrize("content", [
+    "搜索结果与 Playwright 相关",
+    "The title contains 'Playwright' and the first result is the official site",
+    "Check the page looks right",
+])
+def test_match_step_leaves_other_steps_to_the_agent(content):
+    assert match_step(content) == []
+
+
+def test_parse_assert_block():
+    checks = parse_assert_block([
+        {"title_contains": "Playwright", "visible": "#search"},
+        {"count": {"selector": ".result", "at_least": 5}},
+    ])
+    assert [c.kind for c in checks] == [CheckKind.TITLE_CONTAINS, CheckKind.VISIBLE, CheckKind.COUNT_AT_LEAST]
+    assert checks[2].count == 5
+    with pytest.raises(ValueError):
+        parse_assert_block({"looks_nice": True})
+    with pytest.raises(ValueError):
+        parse_assert_block({"count": {"selector": ".result"}})
+    for bad in ({"at_least": 0}, {"equals": -1}, {"equals": "3"}):
+        with pytest.raises(ValueError):
+            parse_assert_block({"count": {"selector": ".result", **bad}})
+
+
+def test_check_code():
+    code = check_code([
+        Check(kind=CheckKind.TITLE_CONTAINS, value="a.b"),
+        Check(kind=CheckKind.COUNT_AT_LEAST, selector="li", count=3),
+    ])
+    assert "await expect(page).to_have_title(re.compile(re.escape('a.b')))" in code
+    assert "await expect(page.locator('li').nth(2)).to_be_attached()" in code
+    # At least 0 always holds and must not become `nth(-1)`, the last match
+    assert "nth" not in check_code([Check(kind=CheckKind.COUNT_AT_LEAST, selector="li", count=0)])
+    compile(f"async def _check():\n" + "\n".join(f"    {line}" for line in code.splitlines()), "<check>", "exec")
+
+
+def test_step_checks():
+    testcase = {"steps": [
+        {"id": 1, "type": "action", "content": "Search for 'Playwright'"},
+        {"id": 2, "type": "verification", "content": "The title contains 'Playwright'"},
+        {"id": 3, "type": "verification", "content": "The results are relevant", "assert": {"url_contains": "wd="}},
+        {"id": 4, "type": "verification", "content": "The results are relevant"},
+    ]}
+    testcase_model.TestCase.model_validate({"name": "t", "test-env": {"base_url": "https://example.com"}, **testcase})
+    checks = step_checks(testcase)
+    assert checks[0] is None and checks[3] is None
+    assert not checks[1].explicit and checks[1].checks[0].kind == CheckKind.TITLE_CONTAINS
+    assert checks[2].explicit and checks[2].checks == [Check(kind=CheckKind.URL_CONTAINS, value="wd=")]
+
+
+class FakeAutomationAgent:
+    def __init__(self, task_id, session=None):
+        self.recorded_cells = []
+        self.steps = []
+
+    async def ainvoke(self, inputs, model=None, escalate_after=0):
+        self.steps.append(inputs["messages"][0].content)
+        return {"messages": []}
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    monkeypatch.setattr(forge_agent, "AutomationAgent", FakeAutomationAgent)
+    session = JupyterNotebookSession(kernel=InProcessKernel())
+    session.start()
+    return forge_agent.ForgeAgent("t1", session=session)
+
+
+def test_forge_agent_runs_checks_without_the_agent(agent):
+    title = Check(kind=CheckKind.TITLE_CONTAINS, value="x")
+    passing = StepCheck(checks=[title], code="assert True")
+    # Without a browser, `page` is undefined and the generated check fails
+    failing = StepCheck(checks=[title], code=check_code([title]))
+
+    asyncio.run(agent.run(["search", "title passes", "title fails"], checks=[None, passing, failing]))
+    assert agent.checked_steps == [1]
+    assert agent.automation_subagent.steps == ["Execute this step: search", "Execute this step: title fails"]
+    assert any(cell.metadata.get("step") == 1 for cell in agent.session.notebook.cells)
+
+
+def test_forge_agent_fails_explicit_checks(agent):
+    title = Check(kind=CheckKind.TITLE_CONTAINS, value="x")
+    failing = StepCheck(checks=[title], code=check_code([title]), explicit=True)
+
+    with pytest.raises(AssertionError):
+        asyncio.run(agent.run(["title fails"], checks=[failing]))
+    assert agent.automation_subagent.steps == []
@@ -16,7 +16,7 @@ export interface Task {
   name: string;
   description?: string;
   yaml_content: string;
-  status: 'pending' | 'running' | 'completed' | 'failed' | 'error';
+  status: 'pending' | 'queued' | 'running' | 'completed' | 'failed' | 'error';
   created_at: string;
   updated_at: string;
   steps?: StepState[];
@@ -36,7 +36,20 @@ export interface TaskCreate {
   testcase_file?: string;
 }
 
+export type TaskPriority = 'high' | 'normal' | 'low';
+
+export interface QueueInfo {
+  task_id: string;
+  priority?: TaskPriority;
+  submitter?: string;
+  position?: number;
+  wait_seconds?: number;
+  running: number;
+  queued: number;
+}
+
 export interface ExecutionLog {
+  seq: number;
   timestamp: string;
   level: string;
   message: string;
@@ -54,8 +67,34 @@ export interface ExecutionState {
   status: Task['status'];
   logs: ExecutionLog[];
   cells: CellExecutionState[];
+  cursor?: number;
+  log_seq: number;
+  has_more: boolean;
+  last_event_id: number;
+}
+
+export type TaskEventType =
+  | 'log'
+  | 'task_status'
+  | 'cell_started'
+  | 'cell_output'
+  | 'cell_finished'
+  | 'step_status'
+  | 'screenshot'
+  | 'end'
+  | 'resync';
+
+export interface TaskEvent {
+  id: number;
+  type: TaskEventType;
+  timestamp: string;
+  data: Record<string, any>;
 }
 
+export const TASK_EVENT_TYPES: TaskEventType[] = [
+  'log', 'task_status', 'cell_started', 'cell_output', 'cell_finished', 'step_status', 'screenshot', 'end', 'resync',
+];
+
 export const tasksApi = {
   list: async () => {
     const { data } = await api.get<TaskSummary[]>('/tasks');
@@ -76,12 +115,21 @@ export const tasksApi = {
     await api.delete(`/tasks/${id}`);
   },
   
-  start: async (id: string) => {
-    await api.post(`/tasks/${id}/start`);
+  start: async (id: string, priority: TaskPriority = 'normal') => {
+    await api.post(`/tasks/${id}/start`, { priority });
+  },
+
+  getQueue: async (id: string) => {
+    const { data } = await api.get<QueueInfo>(`/tasks/${id}/queue`);
+    return data;
   },
   
   getExecution: async (id: string) => {
     const { data } = await api.get<ExecutionState>(`/tasks/${id}/execution`);
     return data;
-  }
+  },
+
+  // Server-Sent Events stream of task updates; reconnects resume via Last-Event-ID
+  events: (id: string, lastEventId = 0) =>
+    new EventSource(`${api.defaults.baseURL}/tasks/${id}/events?last_event_id=${lastEventId}`),
 };
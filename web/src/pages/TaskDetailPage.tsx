@@ -4,39 +4,110 @@ import { ArrowLeft, Terminal, PlayCircle, CheckCircle2, AlertCircle, FileText, L
 import { Link } from "react-router-dom";
 import { Button } from "../components/ui/button";
 import { cn } from "../lib/utils";
-import { tasksApi } from "../lib/api";
-import { useEffect } from "react";
+import { tasksApi, TASK_EVENT_TYPES } from "../lib/api";
+import type { ExecutionState, Task, TaskEvent } from "../lib/api";
+import { useEffect, useRef, useState } from "react";
 
 // Assuming backend URL is http://localhost:8000, but in dev it might be proxied or direct
 const API_BASE_URL = "http://localhost:8000";
 
+// Tasks run by `forge worker` processes publish their events in the worker, so
+// their streams stay silent; after this long without events the page polls instead
+const EVENT_SILENCE_MS = 5000;
+const POLL_INTERVAL_MS = 2000;
+
+const isActiveStatus = (status?: string) => status === 'running' || status === 'pending' || status === 'queued';
+
 export function TaskDetailPage() {
   const { id } = useParams();
   const queryClient = useQueryClient();
+  // Whether the event stream has delivered anything lately
+  const [eventsLive, setEventsLive] = useState(false);
+  const lastEventAt = useRef(0);
 
   const { data: task, isLoading: isTaskLoading } = useQuery({
     queryKey: ['task', id],
     queryFn: () => tasksApi.get(id!),
-    refetchInterval: (query) => {
-      // Also refetch task to update step status
-      // We need to check the data status, not the query status
-      const status = query.state.data?.status;
-      return status === 'running' || status === 'pending' ? 1000 : false;
-    }
+    refetchInterval: (query) => (isActiveStatus(query.state.data?.status) && !eventsLive ? POLL_INTERVAL_MS : false),
   });
 
+  const isActive = isActiveStatus(task?.status);
+
+  // Polls are cheap: unchanged states are answered 304 from the ETag
   const { data: execution, isLoading: isExecutionLoading } = useQuery({
     queryKey: ['execution', id],
     queryFn: () => tasksApi.getExecution(id!),
-    refetchInterval: (query) => {
-      const status = query.state.data?.status;
-      return status === 'running' || status === 'pending' ? 1000 : false;
-    },
-    enabled: !!task
+    enabled: !!task,
+    refetchInterval: isActive && !eventsLive ? POLL_INTERVAL_MS : false,
   });
+  const hasExecution = !!execution;
+
+  // Follow the task's event stream while it runs instead of polling,
+  // starting after the last event reflected in the fetched state
+  useEffect(() => {
+    if (!id || !isActive || !hasExecution) return;
+    const snapshot = queryClient.getQueryData<ExecutionState>(['execution', id]);
+    const source = tasksApi.events(id, snapshot?.last_event_id ?? 0);
+
+    const updateTask = (fn: (task: Task) => Task) =>
+      queryClient.setQueryData<Task>(['task', id], (old) => (old ? fn(old) : old));
+    const updateExecution = (fn: (execution: ExecutionState) => ExecutionState) =>
+      queryClient.setQueryData<ExecutionState>(['execution', id], (old) => (old ? fn(old) : old));
+
+    const silence = setInterval(() => {
+      if (Date.now() - lastEventAt.current > EVENT_SILENCE_MS) setEventsLive(false);
+    }, 1000);
+
+    const onEvent = (message: MessageEvent) => {
+      lastEventAt.current = Date.now();
+      setEventsLive(true);
+      const event: TaskEvent = JSON.parse(message.data);
+      const data = event.data;
+      switch (event.type) {
+        case 'log':
+          updateExecution((e) => ({ ...e, logs: [...e.logs, data as any] }));
+          break;
+        case 'task_status':
+          updateTask((t) => ({ ...t, status: data.status }));
+          updateExecution((e) => ({ ...e, status: data.status }));
+          break;
+        case 'step_status':
+        case 'screenshot':
+          updateTask((t) => ({
+            ...t,
+            steps: t.steps?.map((step) =>
+              step.index !== data.index ? step :
+              event.type === 'step_status' ? { ...step, status: data.status } : { ...step, screenshot: data.url }
+            ),
+          }));
+          break;
+        case 'cell_started':
+          updateExecution((e) => ({
+            ...e,
+            cells: [...e.cells, { id: data.cell_id, status: 'running', code: data.code }],
+          }));
+          break;
+        case 'cell_finished':
+        case 'resync':
+          // Outputs are rendered as the server formats them
+          queryClient.invalidateQueries({ queryKey: ['execution', id] });
+          if (event.type === 'resync') queryClient.invalidateQueries({ queryKey: ['task', id] });
+          break;
+        case 'end':
+          source.close();
+          break;
+      }
+    };
+
+    TASK_EVENT_TYPES.forEach((type) => source.addEventListener(type, onEvent as EventListener));
+    return () => {
+      clearInterval(silence);
+      source.close();
+    };
+  }, [id, isActive, hasExecution, queryClient]);
 
   const startMutation = useMutation({
-    mutationFn: tasksApi.start,
+    mutationFn: (taskId: string) => tasksApi.start(taskId),
     onSuccess: () => {
       queryClient.invalidateQueries({ queryKey: ['task', id] });
       queryClient.invalidateQueries({ queryKey: ['execution', id] });
@@ -46,7 +117,7 @@ export function TaskDetailPage() {
   if (isTaskLoading) return <div>Loading...</div>;
   if (!task) return <div>Task not found</div>;
 
-  const isRunning = task.status === 'running' || task.status === 'pending';
+  const isRunning = isActive;
 
   return (
     <div className="h-screen flex flex-col bg-gray-50">
@@ -239,10 +310,10 @@ function StatusBadge({ status }: { status: string }) {
       </span>
     );
   }
-  if (status === "running" || status === "pending") {
+  if (status === "running" || status === "pending" || status === "queued") {
     return (
       <span className="inline-flex items-center gap-1.5 px-2 py-0.5 rounded-full text-xs font-medium bg-blue-50 text-blue-700 border border-blue-100">
-        <Loader2 className="h-3 w-3 animate-spin" /> {status === 'running' ? 'Running' : 'Pending'}
+        <Loader2 className="h-3 w-3 animate-spin" /> {status === 'running' ? 'Running' : status === 'queued' ? 'Queued' : 'Pending'}
       </span>
     );
   }
@@ -40,7 +40,7 @@ test-env:
   });
 
   const startTaskMutation = useMutation({
-    mutationFn: tasksApi.start,
+    mutationFn: (taskId: string) => tasksApi.start(taskId),
     onSuccess: () => {
       queryClient.invalidateQueries({ queryKey: ['tasks'] });
     }
@@ -224,6 +224,13 @@ function StatusBadge({ status }: { status: string }) {
       </span>
     );
   }
+  if (status === "queued") {
+    return (
+      <span className="inline-flex items-center gap-1.5 px-2.5 py-0.5 rounded-full text-xs font-medium bg-yellow-100 text-yellow-800">
+        <Clock className="h-3 w-3" /> Queued
+      </span>
+    );
+  }
   if (status === "pending") {
     return (
       <span className="inline-flex items-center gap-1.5 px-2.5 py-0.5 rounded-full text-xs font-medium bg-gray-100 text-gray-800">